@@ -1,8 +1,14 @@
 import asyncio
-import io
+import os
+from typing import AsyncIterator, Optional
+
+import aiohttp
 import discord
 from discord.ext import commands
 
+import http_client
+from ai_vote_store import MirrorStore
+
 # ---------- Konfiguration ----------
 SOURCE_CHANNELS = [
     1415769909874524262,
@@ -25,31 +31,79 @@ REACTION_CHANNELS = [
     1416276593709420544   # für REACTIONS[3]
 ]
 
+MONITORED_CHANNELS = set(SOURCE_CHANNELS) | set(REACTION_CHANNELS)
+
+
+def _emoji_slot(emoji: discord.PartialEmoji) -> int | str | None:
+    return emoji.id or emoji.name
+
+
+# Gateway-Emoji → Index in REACTIONS
+REACTION_INDEX = {_emoji_slot(discord.PartialEmoji.from_str(r)): i for i, r in enumerate(REACTIONS)}
+
 # Scan-Parameter
 SCAN_LIMIT = 20
-SCAN_INTERVAL = 30  # alle 30 Sekunden
+# Reaktionen/Nachrichten kommen über Gateway-Events; der History-Scan ist nur
+# noch ein langsamer Abgleich für verpasste Events (z.B. Reconnects).
+SCAN_INTERVAL = int(os.getenv("AI_VOTE_RECONCILE_SEC", "900"))
+# Mehrere Reaktionen kurz hintereinander → nur ein fetch + process pro Nachricht
+EVENT_DEBOUNCE_SEC = 2.0
+# Attachments werden in diesen Häppchen in den Spool geschrieben
+SPOOL_CHUNK = 64 * 1024
 
 
 # ---------- Cog ----------
 class AutoReactCog(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, repo: MirrorStore, http: http_client.HttpClientCog):
         self.bot = bot
+        self.repo = repo
+        self.http = http
 
-        # Runtime-Store:
+        # Runtime-Store (Spiegel von data/ai_vote.sqlite3; Attachments liegen im Spool):
         # key = original message id (die id der Original-Nachricht vor dem Löschen)
         # value = {
         #   "origin_channel": int,
         #   "orig_msg_id": int,
         #   "content": str,
-        #   "attachments": [ {"filename": str, "bytes": bytes}, ... ],
         #   "mirrored": { reaction_channel_id: mirrored_message_id, ... },
         #   "origin_deleted": bool
         # }
         self.store: dict[int, dict] = {}
-
-        # Tasks
-        self.bot.loop.create_task(self.initial_scan())
-        self.bot.loop.create_task(self.background_monitor())
+        # Reverse-Index: mirrored message id -> original id
+        self._by_mirror: dict[int, int] = {}
+        # Reaktionszähler (Index wie REACTIONS) pro Kopie – Mirrors und noch
+        # vorhandene Originale. Einmal per fetch/History gesetzt, danach über
+        # die Reaction-Events mitgezählt.
+        self._counts: dict[int, list[int]] = {}
+
+        # Alle Verschiebe-Entscheidungen laufen nacheinander (Events + Abgleich)
+        self._process_lock = asyncio.Lock()
+        # message_id -> geplanter Debounce-Task
+        self._pending: dict[int, asyncio.Task] = {}
+        # Von uns selbst wiederhergestellte Posts (on_message soll sie ignorieren)
+        self._own_posts: set[int] = set()
+        self._tasks: list[asyncio.Task] = []
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def cog_load(self):
+        # Eigene Session auf dem gemeinsamen Connector-Pool (http_client)
+        self.session = self.http.session(aiohttp.ClientTimeout(total=120))
+        self.store = await self.repo.load_records()
+        self._by_mirror = {
+            mid: orig for orig, rec in self.store.items() for mid in rec["mirrored"].values()
+        }
+        print(f"🗂️ ai_vote: {len(self.store)} gespiegelte Nachricht(en) aus der DB geladen")
+        self._tasks = [
+            asyncio.create_task(self.initial_scan()),
+            asyncio.create_task(self.background_monitor()),
+        ]
+
+    async def cog_unload(self):
+        for t in self._tasks + list(self._pending.values()):
+            t.cancel()
+        self._pending.clear()
+        if self.session and not self.session.closed:
+            await self.session.close()
 
     # ---------------- Helpers ----------------
     async def _get_channel(self, channel_id: int) -> discord.TextChannel | None:
@@ -64,6 +118,25 @@ class AutoReactCog(commands.Cog):
             return None
         return None
 
+    async def _iter_url(self, url: str) -> AsyncIterator[bytes]:
+        async with self.session.get(url) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(SPOOL_CHUNK):
+                yield chunk
+
+    async def _spool_attachment(self, att: discord.Attachment) -> str | None:
+        """Attachment → Spool (gestreamt), liefert den sha256 oder None."""
+        try:
+            return await self.repo.spool_stream(self._iter_url(att.url))
+        except Exception:
+            pass
+        try:
+            # Fallback über discord.py (z.B. wenn die CDN-URL abgelaufen ist)
+            return await self.repo.spool_bytes(await att.read())
+        except Exception as e:
+            print(f"⚠️ Fehler beim Lesen Attachment {att.url}: {e}")
+            return None
+
     async def _snapshot_message(self, msg: discord.Message) -> dict:
         """Snapshot (content + attachments) einer Nachricht aufnehmen."""
         snapshot = {
@@ -73,28 +146,101 @@ class AutoReactCog(commands.Cog):
             "attachments": []
         }
         for att in msg.attachments:
-            try:
-                data = await att.read()
-                snapshot["attachments"].append({"filename": att.filename or "file", "bytes": data})
-                await asyncio.sleep(0.03)
-            except Exception as e:
-                print(f"⚠️ Fehler beim Lesen Attachment {att.url}: {e}")
+            sha = await self._spool_attachment(att)
+            if sha:
+                snapshot["attachments"].append({"filename": att.filename or "file", "sha256": sha})
+            await asyncio.sleep(0.03)
         return snapshot
 
-    def _files_from_snapshot(self, snapshot: dict) -> list:
+    async def _load_attachments(self, orig_id: int, record: dict) -> list:
+        """Spool-Einträge eines Records; verdrängte Dateien werden von einer
+        noch existierenden Kopie (Mirror oder Original) neu eingelesen."""
+        atts = await self.repo.attachments(orig_id)
+        if all(a["path"] for a in atts):
+            return atts
+        copies = list(record.get("mirrored", {}).items())
+        if not record.get("origin_deleted"):
+            copies.append((record.get("origin_channel"), orig_id))
+        for ch_id, mid in copies:
+            ch = await self._get_channel(ch_id)
+            if not ch:
+                continue
+            try:
+                m = await ch.fetch_message(mid)
+            except Exception:
+                continue
+            if len(m.attachments) != len(atts):
+                continue
+            fresh = []
+            for a, att in zip(atts, m.attachments):
+                sha = a["sha256"] if a["path"] else await self._spool_attachment(att)
+                if not sha:
+                    break
+                fresh.append({"filename": a["filename"], "sha256": sha})
+            else:
+                await self._persist(orig_id, fresh)
+                return await self.repo.attachments(orig_id)
+        return [a for a in atts if a["path"]]
+
+    async def _send_snapshot(self, channel, content: str, attachments: list) -> discord.Message:
+        # discord.File öffnet die Datei schon im Konstruktor: erst direkt vor dem Senden bauen, danach immer schließen
         files = []
-        for a in snapshot.get("attachments", []):
-            bio = io.BytesIO(a["bytes"])
-            bio.seek(0)
-            files.append(discord.File(bio, filename=a["filename"]))
-        return files
+        try:
+            for a in attachments:
+                if a.get("path"):
+                    files.append(discord.File(str(a["path"]), filename=a["filename"]))
+            return await channel.send(content=content, files=files)
+        finally:
+            for f in files:
+                f.close()
+
+    async def _persist(self, orig_id: int, attachments: Optional[list] = None):
+        """Schreibt den Record (oder dessen Löschung) nach SQLite."""
+        try:
+            rec = self.store.get(orig_id)
+            if rec is None:
+                await self.repo.delete_record(orig_id)
+            else:
+                await self.repo.put_record(orig_id, rec, attachments)
+        except Exception as e:
+            print(f"⚠️ Konnte ai_vote-Record {orig_id} nicht speichern: {e}")
 
     def _find_store_by_mirrored_id(self, mirrored_msg_id: int) -> int | None:
-        for orig_id, rec in self.store.items():
-            for mid in rec.get("mirrored", {}).values():
-                if mid == mirrored_msg_id:
-                    return orig_id
-        return None
+        return self._by_mirror.get(mirrored_msg_id)
+
+    def _set_mirror(self, orig_id: int, record: dict, channel_id: int, message_id: int):
+        record["mirrored"][channel_id] = message_id
+        self._by_mirror[message_id] = orig_id
+        # Frisch gepostet: die eigenen Start-Reaktionen kommen als Events hinterher
+        self._counts[message_id] = [0] * len(REACTIONS)
+
+    def _drop_mirror(self, record: dict, channel_id: int) -> int | None:
+        mid = record["mirrored"].pop(channel_id, None)
+        if mid is not None:
+            self._by_mirror.pop(mid, None)
+            self._counts.pop(mid, None)
+        return mid
+
+    def _drop_record(self, orig_id: int):
+        rec = self.store.pop(orig_id, None)
+        if rec:
+            for ch_id in list(rec["mirrored"]):
+                self._drop_mirror(rec, ch_id)
+        self._counts.pop(orig_id, None)
+
+    @staticmethod
+    def _counts_of(msg: discord.Message) -> list:
+        counts = []
+        for r in REACTIONS:
+            react = discord.utils.get(msg.reactions, emoji=discord.PartialEmoji.from_str(r))
+            counts.append(react.count if react else 0)
+        return counts
+
+    def _bump_count(self, message_id: int, emoji: discord.PartialEmoji, delta: int):
+        counts = self._counts.get(message_id)
+        i = REACTION_INDEX.get(_emoji_slot(emoji))
+        if counts is not None and i is not None:
+            counts[i] = max(counts[i] + delta, 0)
 
     async def ensure_reactions_on_msg(self, msg: discord.Message):
         """Stellt sicher, dass die 4 REACTIONS an einer Nachricht hängen (falls möglich)."""
@@ -124,17 +270,18 @@ class AutoReactCog(commands.Cog):
                 async for msg in ch.history(limit=SCAN_LIMIT):
                     if not msg.attachments:
                         continue
-                    await self.ensure_reactions_on_msg(msg)
-                    # Führt einmal die Logik aus, sodass beim Start alles korrekt steht
-                    await self.process_message(msg)
+                    async with self._process_lock:
+                        await self.ensure_reactions_on_msg(msg)
+                        # Führt einmal die Logik aus, sodass beim Start alles korrekt steht
+                        await self.process_message(msg)
                     await asyncio.sleep(0.12)
             except Exception as e:
                 print(f"⚠️ Fehler beim Initial-Scan von {ch_id}: {e}")
 
-    # -------- background monitor (alle 30s) --------
+    # -------- background monitor (langsamer Abgleich) --------
     async def background_monitor(self):
         await self.bot.wait_until_ready()
-        print("⏱️ Background monitor gestartet (überwacht SOURCE + REACTION channels)")
+        print(f"⏱️ Background monitor gestartet (Abgleich alle {SCAN_INTERVAL}s, sonst Gateway-Events)")
         monitored = SOURCE_CHANNELS + REACTION_CHANNELS
         while True:
             try:
@@ -145,47 +292,166 @@ class AutoReactCog(commands.Cog):
                     async for msg in ch.history(limit=SCAN_LIMIT):
                         if not msg.attachments:
                             continue
-                        # ensure reactions only for source messages (so each source has the 4 emojis)
-                        if msg.channel.id in SOURCE_CHANNELS:
-                            await self.ensure_reactions_on_msg(msg)
-                        await self.process_message(msg)
+                        async with self._process_lock:
+                            # ensure reactions only for source messages (so each source has the 4 emojis)
+                            if msg.channel.id in SOURCE_CHANNELS:
+                                await self.ensure_reactions_on_msg(msg)
+                            await self.process_message(msg)
                         await asyncio.sleep(0.08)
             except Exception as e:
                 print(f"⚠️ Fehler im Background Monitor: {e}")
+            try:
+                # Unter dem Prozess-Lock: frisch gespoolte Dateien sind dann schon per put_record referenziert
+                async with self._process_lock:
+                    await self.repo.evict_spool()
+            except Exception as e:
+                print(f"⚠️ Fehler beim Aufräumen des Attachment-Spools: {e}")
             await asyncio.sleep(SCAN_INTERVAL)
 
+    # -------- Gateway-Events --------
+    def _schedule(self, channel_id: int, message_id: int):
+        """Debounced: ein fetch + process pro Nachricht, egal wie viele Events."""
+        if channel_id not in MONITORED_CHANNELS or message_id in self._pending:
+            return
+        self._pending[message_id] = asyncio.create_task(
+            self._process_later(channel_id, message_id))
+
+    async def _process_later(self, channel_id: int, message_id: int):
+        try:
+            await asyncio.sleep(EVENT_DEBOUNCE_SEC)
+        finally:
+            self._pending.pop(message_id, None)
+        if message_id in self._by_mirror and message_id in self._counts:
+            # Bekannter Mirror mit gepflegtem Zähler → kein fetch nötig
+            try:
+                async with self._process_lock:
+                    orig = self._by_mirror.get(message_id)
+                    if orig is not None:
+                        await self._process_record(orig)
+            except Exception as e:
+                print(f"⚠️ Fehler beim Verarbeiten von {message_id}: {e}")
+            return
+        ch = await self._get_channel(channel_id)
+        if not ch:
+            return
+        try:
+            msg = await ch.fetch_message(message_id)
+        except discord.NotFound:
+            return
+        except Exception as e:
+            print(f"⚠️ Konnte Nachricht {message_id} nicht laden: {e}")
+            return
+        try:
+            async with self._process_lock:
+                await self.process_message(msg)
+        except Exception as e:
+            print(f"⚠️ Fehler beim Verarbeiten von {message_id}: {e}")
+
+    def _is_own(self, user_id: Optional[int]) -> bool:
+        return self.bot.user is not None and user_id == self.bot.user.id
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        self._bump_count(payload.message_id, payload.emoji, +1)
+        # Unsere eigenen Start-Reaktionen zählen mit, lösen aber nichts aus
+        if not self._is_own(payload.user_id):
+            self._schedule(payload.channel_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        self._bump_count(payload.message_id, payload.emoji, -1)
+        if not self._is_own(payload.user_id):
+            self._schedule(payload.channel_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear(self, payload: discord.RawReactionClearEvent):
+        if payload.message_id in self._counts:
+            self._counts[payload.message_id] = [0] * len(REACTIONS)
+        self._schedule(payload.channel_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear_emoji(self, payload: discord.RawReactionClearEmojiEvent):
+        counts = self._counts.get(payload.message_id)
+        i = REACTION_INDEX.get(_emoji_slot(payload.emoji))
+        if counts is not None and i is not None:
+            counts[i] = 0
+        self._schedule(payload.channel_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_message(self, msg: discord.Message):
+        # Neue Posts in den SOURCE_CHANNELS bekommen sofort die 4 Reaktionen
+        if msg.channel.id not in SOURCE_CHANNELS or not msg.attachments:
+            return
+        async with self._process_lock:
+            if msg.id in self._own_posts:
+                self._own_posts.discard(msg.id)
+                return
+            await self.ensure_reactions_on_msg(msg)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.channel_id in MONITORED_CHANNELS:
+            await self._forget_messages({payload.message_id})
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if payload.channel_id in MONITORED_CHANNELS:
+            await self._forget_messages(set(payload.message_ids))
+
+    async def _forget_messages(self, message_ids: set[int]):
+        """Von Hand gelöschte Originale/Kopien aus dem Store austragen."""
+        async with self._process_lock:
+            touched = set()
+            for mid in message_ids:
+                orig_id = self._by_mirror.get(mid)
+                if orig_id is not None:
+                    rec = self.store[orig_id]
+                    for ch_id, m in list(rec["mirrored"].items()):
+                        if m == mid:
+                            self._drop_mirror(rec, ch_id)
+                    touched.add(orig_id)
+                elif mid in self.store and not self.store[mid].get("origin_deleted"):
+                    self.store[mid]["origin_deleted"] = True
+                    self._counts.pop(mid, None)
+                    touched.add(mid)
+            for orig_id in touched:
+                rec = self.store.get(orig_id)
+                if rec is not None and not rec["mirrored"] and rec.get("origin_deleted"):
+                    # Keine Kopie mehr übrig → nichts mehr zu verfolgen
+                    self._drop_record(orig_id)
+                await self._persist(orig_id)
+
     # -------- Aggregation helper --------
+    async def _copy_counts(self, channel_id: int, message_id: int) -> list | None:
+        """Gecachter Zähler einer Kopie; nur beim ersten Mal (z.B. nach Neustart) ein fetch."""
+        cached = self._counts.get(message_id)
+        if cached is not None:
+            return cached
+        try:
+            ch = await self._get_channel(channel_id)
+            if not ch:
+                return None
+            m = await ch.fetch_message(message_id)
+        except Exception:
+            # not found or no permission
+            return None
+        self._counts[message_id] = self._counts_of(m)
+        return self._counts[message_id]
+
     async def _aggregate_counts_for_record(self, orig_id: int, record: dict) -> list:
         """Aggregiert Reaktionen über alle existierenden Kopien (mirrors + ggf. origin)."""
         counts = [0] * len(REACTIONS)
 
+        copies = list(record.get("mirrored", {}).items())
         # origin message (falls noch vorhanden)
         if not record.get("origin_deleted", False) and record.get("orig_msg_id") and record.get("origin_channel"):
-            try:
-                origin_ch = await self._get_channel(record["origin_channel"])
-                if origin_ch:
-                    origin_msg = await origin_ch.fetch_message(record["orig_msg_id"])
-                    for i, r in enumerate(REACTIONS):
-                        react = discord.utils.get(origin_msg.reactions, emoji=discord.PartialEmoji.from_str(r))
-                        if react:
-                            counts[i] += react.count
-            except Exception:
-                # not found or no permission
-                pass
+            copies.append((record["origin_channel"], record["orig_msg_id"]))
 
-        # mirrored messages
-        for ch_id, m_id in record.get("mirrored", {}).items():
-            try:
-                ch = await self._get_channel(ch_id)
-                if not ch:
-                    continue
-                m = await ch.fetch_message(m_id)
-                for i, r in enumerate(REACTIONS):
-                    react = discord.utils.get(m.reactions, emoji=discord.PartialEmoji.from_str(r))
-                    if react:
-                        counts[i] += react.count
-            except Exception:
-                pass
+        for ch_id, m_id in copies:
+            c = await self._copy_counts(ch_id, m_id)
+            if c:
+                for i, n in enumerate(c):
+                    counts[i] += n
 
         return counts
 
@@ -197,10 +463,7 @@ class AutoReactCog(commands.Cog):
             return
 
         # Bestimme counts für diese einzelne Nachricht (Schnelles Signal)
-        counts_local = []
-        for r in REACTIONS:
-            react = discord.utils.get(msg.reactions, emoji=discord.PartialEmoji.from_str(r))
-            counts_local.append(react.count if react else 0)
+        counts_local = self._counts_of(msg)
 
         # Quick-check: if this is a source message and has no relevant reactions
         if msg.channel.id in SOURCE_CHANNELS:
@@ -212,6 +475,8 @@ class AutoReactCog(commands.Cog):
                 if msg.id in self.store:
                     await self._delete_all_mirrored(msg.id)
                     # leave original in place
+                    self._drop_record(msg.id)
+                    await self._persist(msg.id)
                 return
 
             # local_max >= 2 -> move from source to reaction channels according to local counts
@@ -221,20 +486,30 @@ class AutoReactCog(commands.Cog):
             # Snapshot original
             orig_id = msg.id
             snapshot = await self._snapshot_message(msg)
-            snapshot["mirrored"] = {}
+            attachments = snapshot.pop("attachments")
+            if len(attachments) != len(msg.attachments):
+                # Ohne vollständigen Snapshot könnten wir das Original nie wiederherstellen
+                print(f"⚠️ Snapshot von {orig_id} unvollständig – Nachricht bleibt liegen")
+                return
+            # Kopien aus einem früheren, nicht ganz abgeschlossenen Verschieben weiterverwenden
+            snapshot["mirrored"] = dict(self.store.get(orig_id, {}).get("mirrored", {}))
             snapshot["origin_deleted"] = False
+            # Snapshot liegt auf Platte, bevor irgendetwas gelöscht wird
+            self.store[orig_id] = snapshot
+            await self._persist(orig_id, attachments)
+            attachments = await self._load_attachments(orig_id, snapshot)
 
             # Post copies into target channels
-            for t_id in target_channel_ids:
+            for t_id in target_channel_ids - set(snapshot["mirrored"]):
                 t_ch = await self._get_channel(t_id)
                 if not t_ch:
                     continue
                 try:
-                    files = self._files_from_snapshot(snapshot)
-                    mirrored_msg = await t_ch.send(content=snapshot["content"], files=files)
+                    mirrored_msg = await self._send_snapshot(t_ch, snapshot["content"], attachments)
+                    self._set_mirror(orig_id, snapshot, t_id, mirrored_msg.id)
                     # ensure reactions on the mirror
                     await self.ensure_reactions_on_msg(mirrored_msg)
-                    snapshot["mirrored"][t_id] = mirrored_msg.id
+                    await self._persist(orig_id)
                     await asyncio.sleep(0.08)
                 except Exception as e:
                     print(f"⚠️ Fehler beim Senden in Reaction-Channel {t_id}: {e}")
@@ -245,8 +520,10 @@ class AutoReactCog(commands.Cog):
                 snapshot["origin_deleted"] = True
             except Exception as e:
                 print(f"⚠️ Konnte Original-Nachricht {orig_id} nicht löschen: {e}")
+                # Original bleibt eine Kopie, deren Reaktionen mitzählen
+                self._counts[orig_id] = counts_local
 
-            self.store[orig_id] = snapshot
+            await self._persist(orig_id)
             return
 
         # If message is inside a reaction channel:
@@ -260,83 +537,91 @@ class AutoReactCog(commands.Cog):
                 await self._ensure_unique_for_orphan(msg)
                 return
 
-            record = self.store.get(orig)
-            if not record:
-                return
+            # Frisch geladene Nachricht → Cache korrigieren (fängt verpasste Events ab)
+            self._counts[msg.id] = counts_local
+            await self._process_record(orig)
 
-            # Aggregate counts across all copies (mirrors + origin if present)
-            agg_counts = await self._aggregate_counts_for_record(orig, record)
-            max_count = max(agg_counts)
-            if max_count <= 1:
-                # restore to origin (if we have snapshot) and delete mirrors
-                origin_ch = await self._get_channel(record.get("origin_channel")) or await self._get_channel(SOURCE_CHANNELS[0])
-                if origin_ch:
-                    try:
-                        files = self._files_from_snapshot(record)
-                        new_msg = await origin_ch.send(content=record.get("content", ""), files=files)
-                        await self.ensure_reactions_on_msg(new_msg)
-                        # cleanup
-                        await self._delete_all_mirrored(orig)
-                        if orig in self.store:
-                            del self.store[orig]
-                        await asyncio.sleep(0.08)
-                    except Exception as e:
-                        print(f"⚠️ Fehler beim Wiederherstellen Nachricht in {origin_ch.id}: {e}")
-                else:
-                    # fallback: just delete mirrors
+    async def _process_record(self, orig: int):
+        """Verteilt einen bereits verschobenen Post anhand der Summe über alle Kopien neu."""
+        record = self.store.get(orig)
+        if not record:
+            return
+
+        # Aggregate counts across all copies (mirrors + origin if present)
+        agg_counts = await self._aggregate_counts_for_record(orig, record)
+        max_count = max(agg_counts)
+        if max_count <= 1:
+            # restore to origin (if we have snapshot) and delete mirrors
+            origin_ch = await self._get_channel(record.get("origin_channel")) or await self._get_channel(SOURCE_CHANNELS[0])
+            if origin_ch:
+                try:
+                    new_msg = await self._send_snapshot(origin_ch, record.get("content", ""), await self._load_attachments(orig, record))
+                    self._own_posts.add(new_msg.id)
+                    await self.ensure_reactions_on_msg(new_msg)
+                    # cleanup
                     await self._delete_all_mirrored(orig)
-                    if orig in self.store:
-                        del self.store[orig]
-                return
+                    self._drop_record(orig)
+                    await self._persist(orig)
+                    await asyncio.sleep(0.08)
+                except Exception as e:
+                    print(f"⚠️ Fehler beim Wiederherstellen Nachricht in {origin_ch.id}: {e}")
+            else:
+                # fallback: just delete mirrors
+                await self._delete_all_mirrored(orig)
+                self._drop_record(orig)
+                await self._persist(orig)
+            return
 
-            # Otherwise max_count >= 2 -> ensure mirrors in exactly the channels for highest reactions
-            selected_indices = [i for i, c in enumerate(agg_counts) if c == max_count]
-            target_channel_ids = {REACTION_CHANNELS[i] for i in selected_indices}
+        # Otherwise max_count >= 2 -> ensure mirrors in exactly the channels for highest reactions
+        selected_indices = [i for i, c in enumerate(agg_counts) if c == max_count]
+        target_channel_ids = {REACTION_CHANNELS[i] for i in selected_indices}
 
-            existing_channels = set(record.get("mirrored", {}).keys())
+        existing_channels = set(record.get("mirrored", {}).keys())
 
-            # create missing mirrors
-            for t_id in target_channel_ids - existing_channels:
-                t_ch = await self._get_channel(t_id)
-                if not t_ch:
-                    continue
+        # create missing mirrors
+        attachments = None
+        for t_id in target_channel_ids - existing_channels:
+            t_ch = await self._get_channel(t_id)
+            if not t_ch:
+                continue
+            try:
+                if attachments is None:
+                    attachments = await self._load_attachments(orig, record)
+                new_m = await self._send_snapshot(t_ch, record.get("content", ""), attachments)
+                self._set_mirror(orig, record, t_id, new_m.id)
+                await self.ensure_reactions_on_msg(new_m)
+                await asyncio.sleep(0.08)
+            except Exception as e:
+                print(f"⚠️ Fehler beim Erstellen Kopie in {t_id}: {e}")
+
+        # delete mirrors that are no longer needed
+        for t_id in existing_channels - target_channel_ids:
+            mid = record["mirrored"].get(t_id)
+            if not mid:
+                continue
+            ch = await self._get_channel(t_id)
+            if ch:
                 try:
-                    files = self._files_from_snapshot(record)
-                    new_m = await t_ch.send(content=record.get("content", ""), files=files)
-                    await self.ensure_reactions_on_msg(new_m)
-                    record["mirrored"][t_id] = new_m.id
-                    await asyncio.sleep(0.08)
-                except Exception as e:
-                    print(f"⚠️ Fehler beim Erstellen Kopie in {t_id}: {e}")
+                    await ch.get_partial_message(mid).delete()
+                except Exception:
+                    pass
+            self._drop_mirror(record, t_id)
 
-            # delete mirrors that are no longer needed
-            for t_id in existing_channels - target_channel_ids:
-                mid = record["mirrored"].get(t_id)
-                if not mid:
-                    continue
-                ch = await self._get_channel(t_id)
-                if ch:
-                    try:
-                        m = await ch.fetch_message(mid)
-                        await m.delete()
-                    except Exception:
-                        pass
-                record["mirrored"].pop(t_id, None)
-
-            # ensure origin is deleted (we moved before)
-            if not record.get("origin_deleted", True):
-                origin_ch = await self._get_channel(record.get("origin_channel"))
-                if origin_ch:
-                    try:
-                        om = await origin_ch.fetch_message(record.get("orig_msg_id"))
-                        await om.delete()
-                    except Exception:
-                        pass
-                    record["origin_deleted"] = True
-
-            # persist record in store
-            self.store[orig] = record
-            return
+        # ensure origin is deleted (we moved before)
+        if not record.get("origin_deleted", True):
+            origin_ch = await self._get_channel(record.get("origin_channel"))
+            if origin_ch:
+                try:
+                    await origin_ch.get_partial_message(record.get("orig_msg_id")).delete()
+                except Exception:
+                    pass
+                record["origin_deleted"] = True
+                self._counts.pop(orig, None)
+
+        # persist record in store
+        self.store[orig] = record
+        await self._persist(orig)
+        return
 
     # ---------- Orphan helper ----------
     async def _ensure_unique_for_orphan(self, msg: discord.Message):
@@ -388,14 +673,33 @@ class AutoReactCog(commands.Cog):
             if not ch:
                 continue
             try:
-                m = await ch.fetch_message(mid)
-                await m.delete()
+                await ch.get_partial_message(mid).delete()
                 await asyncio.sleep(0.05)
             except Exception:
                 pass
-        rec["mirrored"].clear()
+        for ch_id in list(rec["mirrored"]):
+            self._drop_mirror(rec, ch_id)
 
 
 # ---------- setup ----------
+_repo: Optional[MirrorStore] = None
+
+
 async def setup(bot: commands.Bot):
-    await bot.add_cog(AutoReactCog(bot))
+    global _repo
+    http = await http_client.ensure_loaded(bot)
+    repo = MirrorStore()
+    await repo.start()
+    try:
+        await bot.add_cog(AutoReactCog(bot, repo, http))
+    except Exception:
+        await repo.close()
+        raise
+    _repo = repo
+
+
+async def teardown(bot: commands.Bot):
+    global _repo
+    if _repo is not None:
+        await _repo.close()
+        _repo = None
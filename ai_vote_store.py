@@ -0,0 +1,332 @@
+# ai_vote_store.py
+"""
+Persistent mirror state for ai_vote.AutoReactCog: which source post was moved
+into which reaction channel(s), and the snapshot (content + attachments) needed
+to re-post it once it drops back below the vote threshold. Survives restarts,
+so the cog never has to rediscover its own mirrors from channel history.
+
+Attachment bytes never sit in RAM or in the DB: they are streamed into a
+content-addressed spool directory (one file per sha256, shared by every record
+and reaction channel that uses the same image) with a size cap and LRU/age
+eviction.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterable, Optional
+
+import aiosqlite
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger("ai_vote_store")
+
+DB_PATH = (os.getenv("AI_VOTE_DB_PATH") or "data/ai_vote.sqlite3").strip()
+SPOOL_DIR = (os.getenv("AI_VOTE_SPOOL_DIR") or "data/ai_vote_spool").strip()
+
+# Unreferenced blobs (record restored/deleted) go after SPOOL_MAX_AGE_DAYS.
+# Over SPOOL_MAX_MB the least recently used go first, unreferenced before
+# referenced; a referenced blob that was evicted is re-read from a live copy.
+SPOOL_MAX_MB = int(os.getenv("AI_VOTE_SPOOL_MAX_MB", "1024"))
+SPOOL_MAX_AGE_DAYS = int(os.getenv("AI_VOTE_SPOOL_MAX_AGE_DAYS", "30"))
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class MirrorStore:
+    """Same single-connection / one-lock contract as RiddleRepo and ReactionStore."""
+
+    def __init__(self, db_path: str = DB_PATH, spool_dir: str = SPOOL_DIR,
+                 spool_max_bytes: int = SPOOL_MAX_MB * 1024 * 1024,
+                 spool_max_age_days: int = SPOOL_MAX_AGE_DAYS):
+        self.db_path = db_path
+        self.spool_dir = Path(spool_dir)
+        self.spool_max_bytes = spool_max_bytes
+        self.spool_max_age = timedelta(days=spool_max_age_days)
+        self.db: Optional[aiosqlite.Connection] = None
+        self.lock = asyncio.Lock()
+
+    # ---------------------------------------------------------------- lifecycle
+    async def start(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Halbfertige Downloads vom letzten Lauf wegräumen
+        shutil.rmtree(self.spool_dir / "tmp", ignore_errors=True)
+        (self.spool_dir / "tmp").mkdir(parents=True, exist_ok=True)
+        self.db = await aiosqlite.connect(self.db_path, isolation_level=None)
+        self.db.row_factory = aiosqlite.Row
+        await self.db.execute("PRAGMA journal_mode=WAL;")
+        await self.db.execute("PRAGMA foreign_keys=ON;")
+        await self.db.execute("PRAGMA busy_timeout=5000;")
+        await self.db.execute("PRAGMA synchronous=NORMAL;")
+        await self._init_db()
+        logger.info("MirrorStore ready (db=%s)", self.db_path)
+
+    async def close(self):
+        if self.db:
+            with contextlib.suppress(Exception):
+                await self.db.close()
+            self.db = None
+
+    async def _init_db(self):
+        assert self.db is not None
+        schema = """
+        -- One row per original (source channel) message that has been mirrored.
+        CREATE TABLE IF NOT EXISTS mirror_records (
+            orig_id INTEGER PRIMARY KEY,
+            origin_channel INTEGER NOT NULL,
+            content TEXT NOT NULL DEFAULT '',
+            origin_deleted INTEGER NOT NULL DEFAULT 0 CHECK(origin_deleted IN (0,1)),
+            created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now'))
+        );
+
+        -- Attachments of a record, by content hash (file lives in the spool).
+        CREATE TABLE IF NOT EXISTS mirror_files (
+            orig_id INTEGER NOT NULL,
+            idx INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            PRIMARY KEY(orig_id, idx),
+            FOREIGN KEY(orig_id) REFERENCES mirror_records(orig_id) ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS idx_mirror_files_sha ON mirror_files(sha256);
+
+        CREATE TABLE IF NOT EXISTS spool_blobs (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            last_used TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS mirror_copies (
+            message_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            orig_id INTEGER NOT NULL,
+            UNIQUE(orig_id, channel_id),
+            FOREIGN KEY(orig_id) REFERENCES mirror_records(orig_id) ON DELETE CASCADE
+        );
+        """
+        async with self.lock:
+            await self.db.executescript(schema)
+            await self._migrate_blob_attachments()
+
+    async def _migrate_blob_attachments(self):
+        """Caller holds the lock. Older DBs kept attachment bytes in mirror_attachments."""
+        assert self.db is not None
+        cur = await self.db.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='mirror_attachments'")
+        exists = await cur.fetchone()
+        await cur.close()
+        if not exists:
+            return
+        cur = await self.db.execute(
+            "SELECT orig_id, idx, filename, data FROM mirror_attachments")
+        rows = await cur.fetchall()
+        await cur.close()
+        await self.db.execute("BEGIN IMMEDIATE")
+        try:
+            for r in rows:
+                sha, size = self._write_blob(bytes(r["data"]))
+                await self._register_blob(sha, size)
+                await self.db.execute(
+                    "INSERT OR REPLACE INTO mirror_files (orig_id, idx, filename, sha256) "
+                    "VALUES (?, ?, ?, ?)", (r["orig_id"], r["idx"], r["filename"], sha))
+            await self.db.execute("DROP TABLE mirror_attachments")
+            await self.db.execute("COMMIT")
+        except Exception:
+            await self.db.execute("ROLLBACK")
+            raise
+        logger.info("Migration: moved %d attachment(s) into the spool", len(rows))
+
+    # ------------------------------------------------------------------ reads
+    async def load_records(self) -> dict[int, dict]:
+        """All records in the cog's in-memory shape (without attachment bytes)."""
+        out: dict[int, dict] = {}
+        if self.db is None:
+            return out
+        async with self.lock:
+            cur = await self.db.execute(
+                "SELECT orig_id, origin_channel, content, origin_deleted FROM mirror_records")
+            for r in await cur.fetchall():
+                out[r["orig_id"]] = {
+                    "origin_channel": r["origin_channel"],
+                    "orig_msg_id": r["orig_id"],
+                    "content": r["content"],
+                    "mirrored": {},
+                    "origin_deleted": bool(r["origin_deleted"]),
+                }
+            await cur.close()
+            cur = await self.db.execute(
+                "SELECT orig_id, channel_id, message_id FROM mirror_copies")
+            for r in await cur.fetchall():
+                rec = out.get(r["orig_id"])
+                if rec is not None:
+                    rec["mirrored"][r["channel_id"]] = r["message_id"]
+            await cur.close()
+        return out
+
+    async def attachments(self, orig_id: int) -> list[dict]:
+        """[{"filename", "sha256", "path"}, ...] in original order; "path" is None
+        when the blob was evicted from the spool. Counts as a use for LRU."""
+        if self.db is None:
+            return []
+        async with self.lock:
+            cur = await self.db.execute(
+                "SELECT filename, sha256 FROM mirror_files WHERE orig_id=? ORDER BY idx",
+                (orig_id,))
+            rows = await cur.fetchall()
+            await cur.close()
+            await self.db.executemany(
+                "UPDATE spool_blobs SET last_used=? WHERE sha256=?",
+                [(_now_iso(), r["sha256"]) for r in rows])
+        out = []
+        for r in rows:
+            path = self.blob_path(r["sha256"])
+            out.append({"filename": r["filename"], "sha256": r["sha256"],
+                        "path": path if path.exists() else None})
+        return out
+
+    # ------------------------------------------------------------------ spool
+    def blob_path(self, sha: str) -> Path:
+        return self.spool_dir / sha[:2] / sha
+
+    def _write_blob(self, data: bytes) -> tuple[str, int]:
+        """Worker thread: hash + write a whole blob."""
+        sha = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(sha)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.spool_dir / "tmp" / uuid.uuid4().hex
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return sha, len(data)
+
+    def _commit_tmp(self, tmp: Path, sha: str):
+        """Worker thread: move a finished temp file to its blob path (or drop
+        it if that content is already spooled)."""
+        path = self.blob_path(sha)
+        if path.exists():
+            tmp.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, path)
+
+    async def _register_blob(self, sha: str, size: int):
+        """Caller holds the lock."""
+        assert self.db is not None
+        await self.db.execute(
+            "INSERT INTO spool_blobs (sha256, size, last_used) VALUES (?, ?, ?) "
+            "ON CONFLICT(sha256) DO UPDATE SET size=excluded.size, last_used=excluded.last_used",
+            (sha, size, _now_iso()))
+
+    async def spool_stream(self, chunks: AsyncIterable[bytes]) -> str:
+        """Streams chunks into the spool and returns their sha256. Identical
+        content (same image in another record/channel) ends up in one file.
+        File I/O runs in worker threads so large images never block the loop."""
+        tmp = self.spool_dir / "tmp" / uuid.uuid4().hex
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            fh = await asyncio.to_thread(open, tmp, "wb")
+            try:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    await asyncio.to_thread(fh.write, chunk)
+                    size += len(chunk)
+            finally:
+                await asyncio.to_thread(fh.close)
+            sha = digest.hexdigest()
+            await asyncio.to_thread(self._commit_tmp, tmp, sha)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                await asyncio.to_thread(tmp.unlink, True)
+            raise
+        if self.db is not None:
+            async with self.lock:
+                await self._register_blob(sha, size)
+        return sha
+
+    async def spool_bytes(self, data: bytes) -> str:
+        sha, size = await asyncio.to_thread(self._write_blob, data)
+        if self.db is not None:
+            async with self.lock:
+                await self._register_blob(sha, size)
+        return sha
+
+    async def evict_spool(self) -> tuple[int, int]:
+        """Age + size-cap eviction. Returns (files removed, bytes freed)."""
+        if self.db is None:
+            return 0, 0
+        cutoff = (datetime.now(timezone.utc) - self.spool_max_age).strftime("%Y-%m-%dT%H:%M:%SZ")
+        async with self.lock:
+            cur = await self.db.execute(
+                "SELECT b.sha256, b.size, b.last_used, "
+                "EXISTS(SELECT 1 FROM mirror_files f WHERE f.sha256=b.sha256) AS referenced "
+                "FROM spool_blobs b ORDER BY referenced, last_used")
+            rows = await cur.fetchall()
+            await cur.close()
+            total = sum(r["size"] for r in rows)
+            victims = []
+            for r in rows:
+                expired = not r["referenced"] and r["last_used"] < cutoff
+                if expired or total > self.spool_max_bytes:
+                    victims.append(r["sha256"])
+                    total -= r["size"]
+            if not victims:
+                return 0, 0
+            await self.db.executemany(
+                "DELETE FROM spool_blobs WHERE sha256=?", [(v,) for v in victims])
+        freed = 0
+        for sha in victims:
+            with contextlib.suppress(OSError):
+                path = self.blob_path(sha)
+                freed += path.stat().st_size
+                path.unlink()
+        logger.info("Spool eviction: %d file(s), %.1f MB", len(victims), freed / 1048576)
+        return len(victims), freed
+
+    # ----------------------------------------------------------------- writes
+    async def put_record(self, orig_id: int, record: dict, attachments: Optional[list[dict]] = None):
+        """Upsert a record and its mirror map; attachments ([{"filename", "sha256"}])
+        only when given."""
+        if self.db is None:
+            return
+        async with self.lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                await self.db.execute(
+                    "INSERT INTO mirror_records (orig_id, origin_channel, content, origin_deleted) "
+                    "VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(orig_id) DO UPDATE SET origin_channel=excluded.origin_channel, "
+                    "content=excluded.content, origin_deleted=excluded.origin_deleted",
+                    (orig_id, record.get("origin_channel") or 0, record.get("content") or "",
+                     int(bool(record.get("origin_deleted")))))
+                await self.db.execute("DELETE FROM mirror_copies WHERE orig_id=?", (orig_id,))
+                await self.db.executemany(
+                    "INSERT OR REPLACE INTO mirror_copies (message_id, channel_id, orig_id) "
+                    "VALUES (?, ?, ?)",
+                    [(mid, ch_id, orig_id) for ch_id, mid in record.get("mirrored", {}).items()])
+                if attachments is not None:
+                    await self.db.execute("DELETE FROM mirror_files WHERE orig_id=?", (orig_id,))
+                    await self.db.executemany(
+                        "INSERT INTO mirror_files (orig_id, idx, filename, sha256) "
+                        "VALUES (?, ?, ?, ?)",
+                        [(orig_id, i, a["filename"], a["sha256"]) for i, a in enumerate(attachments)])
+                await self.db.execute("COMMIT")
+            except Exception:
+                await self.db.execute("ROLLBACK")
+                raise
+
+    async def delete_record(self, orig_id: int):
+        if self.db is None:
+            return
+        async with self.lock:
+            await self.db.execute("DELETE FROM mirror_records WHERE orig_id=?", (orig_id,))
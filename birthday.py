@@ -14,6 +14,8 @@ from discord import app_commands, Interaction
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
 
+import http_client
+
 load_dotenv()
 log = logging.getLogger("birthday_cog")
 logging.basicConfig(level=logging.INFO)
@@ -100,13 +102,14 @@ def birthday_admin_required():
 # COG
 # =========================
 class BirthdayCog(commands.GroupCog, name="birthday", description="Birthday management"):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, http: http_client.HttpClientCog):
         self.bot = bot
+        self.http = http
         self.session: Optional[aiohttp.ClientSession] = None
         self._data_lock = asyncio.Lock()
 
     async def cog_load(self):
-        self.session = aiohttp.ClientSession()
+        self.session = self.http.session()
         self.birthday_worker.start()
         log.info("BirthdayCog loaded.")
 
@@ -585,4 +588,5 @@ class BirthdayCog(commands.GroupCog, name="birthday", description="Birthday mana
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(BirthdayCog(bot))
\ No newline at end of file
+    http = await http_client.ensure_loaded(bot)
+    await bot.add_cog(BirthdayCog(bot, http))
\ No newline at end of file
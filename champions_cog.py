@@ -1,8 +1,9 @@
 import os
 import re
+import hashlib
 import logging
 from collections import defaultdict
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, time, timedelta, timezone
 from typing import Optional, Tuple
 
 import discord
@@ -11,6 +12,9 @@ from discord.ext import commands, tasks
 from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 
+from champions_store import ChampionsStore
+from reaction_store import PostRecord, ReactionStoreCog, ensure_loaded, interaction_progress
+
 load_dotenv()
 logger = logging.getLogger("champions_cog")
 
@@ -34,25 +38,6 @@ def parse_str_list(value: str) -> list[str]:
     return [x.strip() for x in (value or "").split(",") if x.strip()]
 
 
-def first_mention_id(content: str) -> Optional[int]:
-    if not content:
-        return None
-    m = re.search(r"<@!?(\d+)>", content)
-    if not m:
-        return None
-    try:
-        return int(m.group(1))
-    except ValueError:
-        return None
-
-
-def is_image_attachment(att: discord.Attachment) -> bool:
-    if att.content_type and att.content_type.startswith("image/"):
-        return True
-    name = (att.filename or "").lower()
-    return name.endswith((".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"))
-
-
 def is_date_only_input(raw: str) -> bool:
     s = (raw or "").strip()
     if re.fullmatch(r"\d{4}-\d{2}-\d{2}", s):
@@ -67,8 +52,10 @@ class ChampionsCog(
     group_name="champions",
     group_description="Champions Reports"
 ):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, events: ReactionStoreCog, champions_store: ChampionsStore):
         self.bot = bot
+        self.events = events
+        self.champions_store = champions_store
 
         # ===== Defaults prefilled with your values =====
         default_channels = "1415769909874524262,1415769966573260970,1416267309399670917,1416267383160442901,1416468498305126522"
@@ -118,6 +105,15 @@ class ChampionsCog(
             REQUIRED_ROLE_ID
         )
 
+    async def cog_load(self):
+        # Posts + voter ledger come from the shared reaction store; an empty
+        # channel list ("all text channels") is tracked lazily per guild.
+        if self.channel_ids:
+            self.events.track(self.channel_ids, author_ids=self._source_authors(), voters=True)
+
+    def _source_authors(self) -> Optional[list[int]]:
+        return [self.source_bot_id] if self.source_bot_id > 0 else None
+
     def cog_unload(self):
         if self.weekly_champions_task.is_running():
             self.weekly_champions_task.cancel()
@@ -176,84 +172,199 @@ class ChampionsCog(
         return start_dt, end_dt
 
     # ---------- Post detection ----------
-    def is_candidate_image_post(self, msg: discord.Message) -> bool:
+    def is_candidate_image_post(self, post: PostRecord) -> bool:
         # strict: only from source bot if set
-        if self.source_bot_id > 0 and msg.author.id != self.source_bot_id:
+        if self.source_bot_id > 0 and post.author_id != self.source_bot_id:
             return False
 
-        has_image_attachment = any(is_image_attachment(a) for a in msg.attachments)
-        has_image_embed = any((e.image is not None) or (e.thumbnail is not None) for e in msg.embeds)
-        return has_image_attachment or has_image_embed
+        # image attachment or image/thumbnail embed, classified at ingest time
+        return post.has_image
 
-    def extract_creator_id(self, msg: discord.Message) -> Optional[int]:
+    def extract_creator_id(self, post: PostRecord) -> Optional[int]:
         if self.source_mode == "bot_mention":
-            return first_mention_id(msg.content or "")
+            return post.content_mention_id
 
         if self.source_mode == "message_author":
-            return msg.author.id
+            return post.author_id
 
         # auto
-        mention_id = first_mention_id(msg.content or "")
-        if msg.author.bot and mention_id is not None:
+        mention_id = post.content_mention_id
+        if post.author_is_bot and mention_id is not None:
             return mention_id
-        return msg.author.id
+        return post.author_id
 
     # ---------- Stats calculation ----------
+    def _fingerprint(self, channel_ids: list[int]) -> str:
+        """Identifies the counting rules a daily bucket was computed under."""
+        raw = "|".join([
+            ",".join(str(c) for c in sorted(channel_ids)),
+            self.source_mode,
+            str(self.source_bot_id),
+            ",".join(sorted(self.vote_emoji_set)),
+            str(self.count_self_votes),
+            str(self.ignore_bot_voters),
+            str(self.max_one_vote_per_message),
+        ])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _tally(
+        self,
+        posts: list[PostRecord],
+        ledger: dict[int, dict[str, list[tuple[int, bool]]]],
+        image_counts: dict[int, int],
+        vote_counts: dict[int, int],
+    ) -> int:
+        """Apply the counting rules to `posts`; returns the number of image posts."""
+        scanned_posts = 0
+        for post in posts:
+            if not self.is_candidate_image_post(post):
+                continue
+
+            creator_id = self.extract_creator_id(post)
+            if creator_id is None:
+                continue
+
+            scanned_posts += 1
+            image_counts[creator_id] += 1
+
+            seen_voters_for_message: set[int] = set()
+
+            for key, voters in ledger.get(post.id, {}).items():
+                rc = post.reactions.get(key)
+                if rc is None or rc.text not in self.vote_emoji_set:
+                    continue
+
+                for voter_id, voter_is_bot in voters:
+                    if self.ignore_bot_voters and voter_is_bot:
+                        continue
+                    if (not self.count_self_votes) and voter_id == creator_id:
+                        continue
+
+                    if self.max_one_vote_per_message:
+                        if voter_id in seen_voters_for_message:
+                            continue
+                        seen_voters_for_message.add(voter_id)
+
+                    vote_counts[voter_id] += 1
+        return scanned_posts
+
+    async def _tally_window(
+        self, channel_ids: list[int], start_utc: datetime, end_utc: datetime,
+        image_counts: dict[int, int], vote_counts: dict[int, int],
+    ) -> int:
+        if end_utc <= start_utc:
+            return 0
+        per_channel = await self.events.store.posts_in_window(
+            channel_ids, start_utc, end_utc, author_id=self._source_author_id()
+        )
+        posts = [p for ps in per_channel.values() for p in ps]
+        ledger = await self.events.store.voters_for_posts(p.id for p in posts)
+        return self._tally(posts, ledger, image_counts, vote_counts)
+
+    async def _refresh_buckets(self, fingerprint: str, channel_ids: list[int], days: list[date]):
+        """Recompute the daily buckets whose store revision moved since they were built."""
+        keys = [d.isoformat() for d in days]
+        # Revisions are read BEFORE the posts: a change racing the recompute
+        # leaves the bucket behind the store and it is rebuilt next time.
+        revs = await self.events.store.day_revisions(channel_ids, keys)
+        built = await self.champions_store.bucket_revisions(fingerprint, keys)
+        stale = [d for d, k in zip(days, keys) if k not in built or revs.get(k, 0) > built[k]]
+        if not stale:
+            return
+
+        start = datetime.combine(stale[0], time.min, tzinfo=timezone.utc)
+        end = datetime.combine(stale[-1] + timedelta(days=1), time.min, tzinfo=timezone.utc)
+        per_channel = await self.events.store.posts_in_window(
+            channel_ids, start, end, author_id=self._source_author_id()
+        )
+        by_day: dict[date, list[PostRecord]] = defaultdict(list)
+        for ps in per_channel.values():
+            for p in ps:
+                by_day[p.created_at.astimezone(timezone.utc).date()].append(p)
+        ledger = await self.events.store.voters_for_posts(
+            p.id for d in stale for p in by_day.get(d, [])
+        )
+
+        for d in stale:
+            images: dict[int, int] = defaultdict(int)
+            votes: dict[int, int] = defaultdict(int)
+            posts = self._tally(by_day.get(d, []), ledger, images, votes)
+            await self.champions_store.replace_day(
+                fingerprint, d.isoformat(), revs.get(d.isoformat(), 0), posts, images, votes
+            )
+        logger.info("Champions buckets rebuilt for %s day(s)", len(stale))
+
+    def _source_author_id(self) -> Optional[int]:
+        return self.source_bot_id if self.source_bot_id > 0 else None
+
     async def collect_stats(
         self,
         guild: discord.Guild,
         start_utc: datetime,
-        end_utc: datetime
+        end_utc: datetime,
+        interaction: Optional[discord.Interaction] = None
     ) -> tuple[dict[int, int], dict[int, int], int]:
+        """
+        Whole UTC days inside the range are summed from pre-aggregated daily
+        buckets; only the partial days at either edge are tallied live from
+        the reaction store.
+        """
         image_counts: dict[int, int] = defaultdict(int)
         vote_counts: dict[int, int] = defaultdict(int)
         scanned_posts = 0
 
-        channels: list[discord.TextChannel] = []
+        channel_ids: list[int] = []
         if self.channel_ids:
             for cid in self.channel_ids:
                 ch = guild.get_channel(cid)
                 if isinstance(ch, discord.TextChannel):
-                    channels.append(ch)
+                    channel_ids.append(cid)
         else:
-            channels = list(guild.text_channels)
-
-        for channel in channels:
-            try:
-                async for msg in channel.history(limit=None, after=start_utc, before=end_utc, oldest_first=False):
-                    if not self.is_candidate_image_post(msg):
-                        continue
-
-                    creator_id = self.extract_creator_id(msg)
-                    if creator_id is None:
-                        continue
-
-                    scanned_posts += 1
-                    image_counts[creator_id] += 1
+            channel_ids = [ch.id for ch in guild.text_channels]
+            self.events.track(channel_ids, author_ids=self._source_authors(), voters=True)
 
-                    seen_voters_for_message: set[int] = set()
-
-                    for reaction in msg.reactions:
-                        if str(reaction.emoji) not in self.vote_emoji_set:
-                            continue
+        try:
+            await self.events.prepare(
+                channel_ids, start_utc, author_id=self._source_author_id(), voters=True,
+                progress=interaction_progress(interaction, "Indexing channel history")
+                if interaction else None,
+            )
 
-                        try:
-                            async for voter in reaction.users(limit=None):
-                                if self.ignore_bot_voters and voter.bot:
-                                    continue
-                                if (not self.count_self_votes) and voter.id == creator_id:
-                                    continue
+            # [start, first_midnight) live | full days from buckets | [last_midnight, end) live
+            first_day = start_utc.date() if start_utc.timetz() == time.min.replace(tzinfo=timezone.utc) \
+                else start_utc.date() + timedelta(days=1)
+            end_day = end_utc.date()  # exclusive
+            if first_day >= end_day:
+                scanned_posts += await self._tally_window(
+                    channel_ids, start_utc, end_utc, image_counts, vote_counts
+                )
+                return image_counts, vote_counts, scanned_posts
+
+            first_midnight = datetime.combine(first_day, time.min, tzinfo=timezone.utc)
+            last_midnight = datetime.combine(end_day, time.min, tzinfo=timezone.utc)
+            scanned_posts += await self._tally_window(
+                channel_ids, start_utc, first_midnight, image_counts, vote_counts
+            )
+            scanned_posts += await self._tally_window(
+                channel_ids, last_midnight, end_utc, image_counts, vote_counts
+            )
 
-                                if self.max_one_vote_per_message:
-                                    if voter.id in seen_voters_for_message:
-                                        continue
-                                    seen_voters_for_message.add(voter.id)
+            fingerprint = self._fingerprint(channel_ids)
+            await self.champions_store.drop_other_fingerprints(fingerprint)
+            days = [first_day + timedelta(days=i) for i in range((end_day - first_day).days)]
+            await self._refresh_buckets(fingerprint, channel_ids, days)
+            images, votes, posts = await self.champions_store.sum_days(
+                fingerprint, days[0].isoformat(), days[-1].isoformat()
+            )
+        except Exception as e:
+            logger.warning("Reaction store query failed: %s", e)
+            return image_counts, vote_counts, scanned_posts
 
-                                vote_counts[voter.id] += 1
-                        except Exception as e:
-                            logger.warning("Could not read reaction users (msg=%s): %s", msg.id, e)
-            except Exception as e:
-                logger.warning("History scan failed (channel=%s): %s", channel.id, e)
+        for uid, n in images.items():
+            image_counts[uid] += n
+        for uid, n in votes.items():
+            vote_counts[uid] += n
+        scanned_posts += posts
 
         return image_counts, vote_counts, scanned_posts
 
@@ -281,12 +392,15 @@ class ChampionsCog(
         guild: discord.Guild,
         start_local: datetime,
         end_local: datetime,
-        title: str
+        title: str,
+        interaction: Optional[discord.Interaction] = None
     ) -> discord.Embed:
         start_utc = start_local.astimezone(timezone.utc)
         end_utc = end_local.astimezone(timezone.utc)
 
-        image_counts, vote_counts, scanned_posts = await self.collect_stats(guild, start_utc, end_utc)
+        image_counts, vote_counts, scanned_posts = await self.collect_stats(
+            guild, start_utc, end_utc, interaction
+        )
 
         total_xp: dict[int, int] = defaultdict(int)
         for uid, c in image_counts.items():
@@ -384,6 +498,7 @@ class ChampionsCog(
             start_local=start_local,
             end_local=now_local,
             title=f"🏆 Champions (Last {days} Days)",
+            interaction=interaction,
         )
         await interaction.followup.send(embed=embed)
 
@@ -403,6 +518,7 @@ class ChampionsCog(
             start_local=start_local,
             end_local=now_local,
             title="🏆 Champions (Last 7 Days)",
+            interaction=interaction,
         )
         await interaction.followup.send(embed=embed)
 
@@ -422,6 +538,7 @@ class ChampionsCog(
             start_local=start_local,
             end_local=now_local,
             title="🏆 Champions (Last 30 Days)",
+            interaction=interaction,
         )
         await interaction.followup.send(embed=embed)
 
@@ -465,6 +582,7 @@ class ChampionsCog(
             start_local=start_local,
             end_local=end_local,
             title="🏆 Champions (Custom Range)",
+            interaction=interaction,
         )
         await interaction.followup.send(embed=embed)
 
@@ -494,6 +612,7 @@ class ChampionsCog(
             start_local=start_local,
             end_local=now_local,
             title="🏆 Weekly Champions (Manual Trigger)",
+            interaction=interaction,
         )
         await channel.send(embed=embed)
         await interaction.followup.send("✅ Weekly report posted.", ephemeral=True)
@@ -542,5 +661,24 @@ class ChampionsCog(
         await self._send_interaction_msg(interaction, f"Error: `{original}`", ephemeral=True)
 
 
+_champions_store: Optional[ChampionsStore] = None
+
+
 async def setup(bot: commands.Bot):
-    await bot.add_cog(ChampionsCog(bot))
\ No newline at end of file
+    global _champions_store
+    events = await ensure_loaded(bot)
+    store = ChampionsStore()
+    await store.start()
+    try:
+        await bot.add_cog(ChampionsCog(bot, events, store))
+    except Exception:
+        await store.close()
+        raise
+    _champions_store = store
+
+
+async def teardown(bot: commands.Bot):
+    global _champions_store
+    if _champions_store is not None:
+        await _champions_store.close()
+        _champions_store = None
@@ -0,0 +1,148 @@
+# champions_store.py
+"""
+Per-day champions buckets (images per creator, votes per voter) derived from
+the shared reaction store. A bucket remembers the reaction-store day revision
+it was computed at; reports sum fresh buckets and only recompute days whose
+revision moved since.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+import aiosqlite
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger("champions_store")
+
+DB_PATH = (os.getenv("CHAMPIONS_DB_PATH") or "data/champions.sqlite3").strip()
+
+
+class ChampionsStore:
+    """Same single-connection / one-lock contract as RiddleRepo and ReactionStore."""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self.db: Optional[aiosqlite.Connection] = None
+        self.lock = asyncio.Lock()
+
+    # ---------------------------------------------------------------- lifecycle
+    async def start(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = await aiosqlite.connect(self.db_path, isolation_level=None)
+        self.db.row_factory = aiosqlite.Row
+        await self.db.execute("PRAGMA journal_mode=WAL;")
+        await self.db.execute("PRAGMA foreign_keys=ON;")
+        await self.db.execute("PRAGMA busy_timeout=5000;")
+        await self.db.execute("PRAGMA synchronous=NORMAL;")
+        await self._init_db()
+        logger.info("ChampionsStore ready (db=%s)", self.db_path)
+
+    async def close(self):
+        if self.db:
+            with contextlib.suppress(Exception):
+                await self.db.close()
+            self.db = None
+
+    async def _init_db(self):
+        assert self.db is not None
+        schema = """
+        -- `fingerprint` identifies the counting rules (channels, source, vote
+        -- emojis, self/bot/one-per-message flags) a bucket was computed under.
+        CREATE TABLE IF NOT EXISTS champions_days (
+            fingerprint TEXT NOT NULL,
+            day TEXT NOT NULL,
+            rev INTEGER NOT NULL,
+            posts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(fingerprint, day)
+        );
+
+        CREATE TABLE IF NOT EXISTS champions_daily (
+            fingerprint TEXT NOT NULL,
+            day TEXT NOT NULL,
+            kind TEXT NOT NULL CHECK(kind IN ('image','vote')),
+            user_id INTEGER NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY(fingerprint, day, kind, user_id),
+            FOREIGN KEY(fingerprint, day) REFERENCES champions_days(fingerprint, day)
+                ON DELETE CASCADE
+        );
+        """
+        async with self.lock:
+            await self.db.executescript(schema)
+
+    # ------------------------------------------------------------------- API
+    async def bucket_revisions(self, fingerprint: str, days: Iterable[str]) -> dict[str, int]:
+        wanted = list(days)
+        if self.db is None or not wanted:
+            return {}
+        out: dict[str, int] = {}
+        async with self.lock:
+            for i in range(0, len(wanted), 500):
+                chunk = wanted[i:i + 500]
+                cur = await self.db.execute(
+                    f"SELECT day, rev FROM champions_days WHERE fingerprint=? "
+                    f"AND day IN ({','.join('?' for _ in chunk)})", (fingerprint, *chunk))
+                out.update({r["day"]: r["rev"] for r in await cur.fetchall()})
+                await cur.close()
+        return out
+
+    async def replace_day(self, fingerprint: str, day: str, rev: int, posts: int,
+                          images: dict[int, int], votes: dict[int, int]):
+        if self.db is None:
+            return
+        rows = [(fingerprint, day, "image", uid, n) for uid, n in images.items() if n] + \
+               [(fingerprint, day, "vote", uid, n) for uid, n in votes.items() if n]
+        async with self.lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                await self.db.execute(
+                    "DELETE FROM champions_days WHERE fingerprint=? AND day=?",
+                    (fingerprint, day))
+                await self.db.execute(
+                    "INSERT INTO champions_days (fingerprint, day, rev, posts) "
+                    "VALUES (?, ?, ?, ?)", (fingerprint, day, rev, posts))
+                await self.db.executemany(
+                    "INSERT INTO champions_daily (fingerprint, day, kind, user_id, n) "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+                await self.db.execute("COMMIT")
+            except Exception:
+                await self.db.execute("ROLLBACK")
+                raise
+
+    async def sum_days(
+        self, fingerprint: str, first_day: str, last_day: str,
+    ) -> tuple[dict[int, int], dict[int, int], int]:
+        """(images per creator, votes per voter, posts) over [first_day, last_day]."""
+        images: dict[int, int] = {}
+        votes: dict[int, int] = {}
+        if self.db is None:
+            return images, votes, 0
+        async with self.lock:
+            cur = await self.db.execute(
+                "SELECT kind, user_id, SUM(n) AS n FROM champions_daily "
+                "WHERE fingerprint=? AND day>=? AND day<=? GROUP BY kind, user_id",
+                (fingerprint, first_day, last_day))
+            for r in await cur.fetchall():
+                (images if r["kind"] == "image" else votes)[r["user_id"]] = r["n"]
+            await cur.close()
+            cur = await self.db.execute(
+                "SELECT COALESCE(SUM(posts), 0) AS posts FROM champions_days "
+                "WHERE fingerprint=? AND day>=? AND day<=?",
+                (fingerprint, first_day, last_day))
+            posts = (await cur.fetchone())["posts"]
+            await cur.close()
+        return images, votes, posts
+
+    async def drop_other_fingerprints(self, fingerprint: str):
+        """Buckets of a previous config can never be read again."""
+        if self.db is None:
+            return
+        async with self.lock:
+            await self.db.execute("DELETE FROM champions_days WHERE fingerprint<>?",
+                                  (fingerprint,))
@@ -0,0 +1,116 @@
+# http_client.py
+"""
+One bot-wide HTTP connection pool. Every cog that talks to Venice, the
+Discord CDN or other web APIs gets its aiohttp sessions from here, so TLS
+connections to api.venice.ai / cdn.discordapp.com are kept alive and reused
+across features instead of each cog paying its own handshakes.
+
+Sessions handed out by `HttpClientCog.session()` share one TCPConnector
+(connector_owner=False): each cog keeps its own default timeout and closes
+its own session in cog_unload as before; the connector lives as long as this
+extension.
+
+Load it with `await http_client.ensure_loaded(bot)` from a cog's setup().
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import sys
+from typing import Optional
+
+import aiohttp
+from discord.ext import commands
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger("http_client")
+
+HTTP_LIMIT = int(os.getenv("HTTP_LIMIT", "100"))
+# Per host: enough for parallel renders/uploads without starving other features.
+HTTP_LIMIT_PER_HOST = int(os.getenv("HTTP_LIMIT_PER_HOST", "32"))
+HTTP_KEEPALIVE_SEC = float(os.getenv("HTTP_KEEPALIVE_SEC", "60"))
+HTTP_DNS_TTL_SEC = int(os.getenv("HTTP_DNS_TTL_SEC", "300"))
+
+
+def _make_connector() -> aiohttp.TCPConnector:
+    return aiohttp.TCPConnector(
+        limit=HTTP_LIMIT,
+        limit_per_host=HTTP_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_SEC,
+        ttl_dns_cache=HTTP_DNS_TTL_SEC,
+        enable_cleanup_closed=True,
+    )
+
+
+class HttpClientCog(commands.Cog):
+    """Owns the shared connector; hands out sessions bound to it."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.connector = _make_connector()
+
+    def session(self, timeout: Optional[aiohttp.ClientTimeout] = None) -> aiohttp.ClientSession:
+        """New session on the shared pool. The caller closes it; the pool stays."""
+        if self.connector.closed:
+            self.connector = _make_connector()
+        return aiohttp.ClientSession(
+            connector=self.connector,
+            connector_owner=False,
+            timeout=timeout or aiohttp.ClientTimeout(total=300),
+        )
+
+    async def close(self):
+        with contextlib.suppress(Exception):
+            await self.connector.close()
+
+
+# =============================================================================
+# EXTENSION ENTRY POINTS
+# =============================================================================
+_cog: Optional[HttpClientCog] = None
+
+
+def client_session(timeout: Optional[aiohttp.ClientTimeout] = None) -> aiohttp.ClientSession:
+    """
+    For module-level helpers without a bot handle. Uses the loaded extension's
+    pool (looked up through sys.modules, since load_extension() executes a
+    fresh module object), or a standalone session if it is not loaded.
+    """
+    live = getattr(sys.modules.get(__name__), "_cog", None)
+    if live is not None:
+        return live.session(timeout)
+    return aiohttp.ClientSession(timeout=timeout or aiohttp.ClientTimeout(total=300))
+
+
+async def ensure_loaded(bot: commands.Bot) -> HttpClientCog:
+    """For setup(): load this extension once, return its cog."""
+    if __name__ not in bot.extensions:
+        await bot.load_extension(__name__)
+    cog = bot.get_cog("HttpClientCog")
+    if cog is None:
+        raise RuntimeError("http_client extension is loaded but its cog is missing")
+    return cog
+
+
+async def setup(bot: commands.Bot):
+    global _cog
+    cog = HttpClientCog(bot)
+    try:
+        await bot.add_cog(cog)
+    except Exception:
+        await cog.close()
+        raise
+    _cog = cog
+    logger.info(
+        "HTTP pool ready (limit=%d, per host=%d, keepalive=%.0fs)",
+        HTTP_LIMIT, HTTP_LIMIT_PER_HOST, HTTP_KEEPALIVE_SEC,
+    )
+
+
+async def teardown(bot: commands.Bot):
+    global _cog
+    if _cog is not None:
+        await _cog.close()
+        _cog = None
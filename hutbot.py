@@ -109,6 +109,7 @@ async def on_ready():
 async def main():
     async with bot:
         extensions = [
+            "http_client",
             "pepper",
             "hutmember",
             "anti-mommy",
@@ -117,6 +118,7 @@ async def main():
             "hut_dm_app",
             "venice_cog",
             "video_cog",
+            "reaction_store",
             "hutvote",
             "riddle",
             "venice_face_cog",
@@ -2,7 +2,9 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import re
+from datetime import datetime, timezone
+
+from reaction_store import EmojiCount, PostRecord, ReactionStoreCog, ensure_loaded
 
 SEARCH_BOT_ID = 1339242900906836090  # Bot, dessen Posts durchsucht werden
 SCAN_BOT_ID = 1379906834588106883    # Dein Bot, der scannt
@@ -30,8 +32,12 @@ REACTION_CAPTIONS = {
 
 
 class HutThreadVoteLegacy(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, events: ReactionStoreCog):
         self.bot = bot
+        self.events = events
+
+    async def cog_load(self):
+        self.events.track([int(c.value) for c in THREAD_CHOICES], author_ids=[SEARCH_BOT_ID])
 
     @app_commands.command(
         name="legacy_vote",
@@ -84,13 +90,16 @@ class HutThreadVoteLegacy(commands.Cog):
 
         await interaction.response.defer(thinking=True, ephemeral=ephemeral_flag)
 
-        # Alle Posts vom SEARCH_BOT_ID im Thread sammeln
-        matched_msgs = []
+        # Alle Posts vom SEARCH_BOT_ID im Thread sammeln (aus dem Reaction-Store)
+        matched_msgs: list[PostRecord] = []
         try:
-            async for msg in thread_obj.history(limit=None, oldest_first=True):
-                if msg.author.id != SEARCH_BOT_ID:
-                    continue
-                matched_msgs.append(msg)
+            per_ch = await self.events.load_posts(
+                [thread_obj.id],
+                discord.utils.snowflake_time(thread_obj.id),
+                datetime.now(timezone.utc),
+                author_id=SEARCH_BOT_ID,
+            )
+            matched_msgs = per_ch.get(thread_obj.id, [])
         except Exception:
             pass
 
@@ -102,8 +111,8 @@ class HutThreadVoteLegacy(commands.Cog):
             return
 
         # Sortieren nach Top-Reaktionen
-        def sort_key(msg: discord.Message):
-            sorted_reacts = sorted(msg.reactions, key=lambda r: r.count, reverse=True)
+        def sort_key(msg: PostRecord):
+            sorted_reacts = sorted(msg.reactions.values(), key=lambda r: r.count, reverse=True)
             top5_sum = sum(r.count for r in sorted_reacts[:5])
             extra_sum = sum(r.count for r in sorted_reacts[5:])
             return (top5_sum, extra_sum, msg.created_at)
@@ -125,51 +134,46 @@ class HutThreadVoteLegacy(commands.Cog):
 
         # Sub-Embeds
         for idx, msg in enumerate(top_msgs, start=1):
-            sorted_reacts = sorted(msg.reactions, key=lambda r: r.count, reverse=True)
+            sorted_reacts: list[EmojiCount] = sorted(
+                msg.reactions.values(), key=lambda r: r.count, reverse=True
+            )
 
             # Top-Emojis
             reaction_parts = []
             used_emojis = set()
             for emoji_key in REACTION_CAPTIONS:
-                r = next(
-                    (r for r in sorted_reacts if (
-                        str(r.emoji) if not isinstance(r.emoji, discord.Emoji)
-                        else f"<:{r.emoji.name}:{r.emoji.id}>"
-                    ) == emoji_key),
-                    None
-                )
+                r = next((r for r in sorted_reacts if r.text == emoji_key), None)
                 if r:
                     count = r.count - 1
                     if count > 0:
-                        used_emojis.add(r.emoji)
-                        reaction_parts.append(f"{str(r.emoji)} {count}")
+                        used_emojis.add(r.text)
+                        reaction_parts.append(f"{r.text} {count}")
 
             reaction_line = " ".join(reaction_parts) if reaction_parts else ""
 
             # Extra-Emojis
             extra_parts = []
-            extra_reacts = [r for r in sorted_reacts if r.emoji not in used_emojis]
+            extra_reacts = [r for r in sorted_reacts if r.text not in used_emojis]
             for r in extra_reacts:
                 count = r.count
                 if r.me:
                     count -= 1
                 if count > 0:
-                    extra_parts.append(f"{str(r.emoji)} {count}")
+                    extra_parts.append(f"{r.text} {count}")
             extra_text = " ".join(extra_parts) if extra_parts else ""
 
             # Creator aus Embed
-            creator_mention = None
-            creator_name = msg.author.display_name
-            creator_avatar = msg.author.display_avatar.url
-
-            if msg.embeds:
-                for e in msg.embeds:
-                    if e.description and "🎨 Generated by:" in e.description:
-                        match = re.search(r"🎨 Generated by:\s*(<@!?\d+>)", e.description)
-                        if match:
-                            creator_mention = match.group(1)
-                            creator_name = creator_mention
-                        break
+            author = guild.get_member(msg.author_id) or self.bot.get_user(msg.author_id)
+            if author is None:
+                try:
+                    author = await self.bot.fetch_user(msg.author_id)
+                except Exception:
+                    author = None
+            creator_name = author.display_name if author else f"<@{msg.author_id}>"
+            creator_avatar = author.display_avatar.url if author else None
+
+            if msg.embed_creator_id:
+                creator_name = f"<@{msg.embed_creator_id}>"
 
             title = f"#{idx} by {creator_name}\n{'─'*14}"
 
@@ -182,26 +186,17 @@ class HutThreadVoteLegacy(commands.Cog):
             description_text += f"[◀️ Jump / Vote 📈]({msg.jump_url})"
 
             # Bild
-            img_url = None
-            if msg.attachments:
-                img_url = msg.attachments[0].url
-            elif msg.embeds:
-                for e in msg.embeds:
-                    if e.image:
-                        img_url = e.image.url
-                        break
-                    elif e.thumbnail:
-                        img_url = e.thumbnail.url
-                        break
+            img_url = msg.image_url
 
             embed = discord.Embed(
                 title=title,
                 description=description_text,
                 color=discord.Color.green()
             )
-            embed.set_thumbnail(url=creator_avatar)
+            if creator_avatar:
+                embed.set_thumbnail(url=creator_avatar)
             embed.set_footer(
-                text=f"{thread_obj.name} | #{msg.channel.name}",
+                text=f"{thread_obj.name} | #{thread_obj.name}",
                 icon_url=guild.icon.url if guild.icon else discord.Embed.Empty
             )
             if img_url:
@@ -218,4 +213,5 @@ class HutThreadVoteLegacy(commands.Cog):
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(HutThreadVoteLegacy(bot))
+    events = await ensure_loaded(bot)
+    await bot.add_cog(HutThreadVoteLegacy(bot, events))
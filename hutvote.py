@@ -2,13 +2,15 @@
 import asyncio
 import logging
 import calendar
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from typing import Optional
 
 import discord
 from discord.ext import commands
 from discord import app_commands
 
+from reaction_store import PostRecord, ReactionStoreCog, ensure_loaded
+
 logger = logging.getLogger(__name__)
 
 # =====================
@@ -55,8 +57,6 @@ VOTERS_TITLE_TOP3   = "🗳️ Top 3 Voters 🗳️"
 VOTERS_TITLE_TOP5   = "🗳️ Top 5 Voters 🗳️"
 
 # Performance — extra gentle against Discord's rate limiter
-VOTER_FETCH_CONCURRENCY   = 3
-VOTER_INTRA_MSG_DELAY_SEC = 0.25
 DETAIL_EMBEDS_PER_MSG     = 5
 FOLLOWUP_DELAY_SEC        = 0.3
 
@@ -87,49 +87,22 @@ MONTH_CHOICES = [
 ]
 
 
-# =========================================================
-# POST DETECTOR — only edit if video post format changes
-# =========================================================
-class VideoPostDetector:
-    VIDEO_EXTENSIONS = (".mp4", ".webm", ".mov", ".mkv", ".m4v")
-    CONTENT_MARKERS  = ("🎬",)
-    CONTENT_HINTS    = ("click to play", "video")
-
-    @classmethod
-    def is_video_post(cls, msg: discord.Message) -> bool:
-        for att in msg.attachments:
-            if att.content_type and att.content_type.startswith("video/"):
-                return True
-            if (att.filename or "").lower().endswith(cls.VIDEO_EXTENSIONS):
-                return True
-        if not msg.attachments:
-            return False
-        content = msg.content or ""
-        cl = content.lower()
-        return (
-            any(m in content for m in cls.CONTENT_MARKERS)
-            and any(h in cl for h in cls.CONTENT_HINTS)
-        )
-
-
 # =====================
 # HELPERS
 # =====================
-def normalize_emoji(reaction: discord.Reaction):
-    if isinstance(reaction.emoji, (discord.PartialEmoji, discord.Emoji)):
-        return reaction.emoji.id
-    return str(reaction.emoji)
+def points_key(key: str):
+    """Index emoji key → EMOJI_POINTS key (custom emoji ids are ints there)."""
+    return int(key) if key.isdigit() else key
 
 
-def calc_ai_points(msg: discord.Message):
+def calc_ai_points(post: PostRecord):
     breakdown = {}
     score = 0
     emoji_total = 0
-    for reaction in msg.reactions:
-        key = normalize_emoji(reaction)
+    for k, (_txt, votes, _me) in post.reactions.items():
+        key = points_key(k)
         if str(key) == str(STARBOARD_IGNORE_ID):
             continue
-        votes = reaction.count
         if key in EMOJI_POINTS:
             extra = max(votes - 1, 0)
             if extra <= 0:
@@ -156,37 +129,18 @@ def get_month_utc_range(year: int, month: int):
     return start, end
 
 
-def get_target_user(msg: discord.Message):
-    return msg.mentions[0] if msg.mentions else msg.author
-
-
-def get_image_url_from_post(msg: discord.Message) -> Optional[str]:
-    if msg.attachments:
-        att = msg.attachments[0]
-        is_video = (
-            (att.content_type and att.content_type.startswith("video/"))
-            or (att.filename or "").lower().endswith(VideoPostDetector.VIDEO_EXTENSIONS)
-        )
-        if not is_video:
-            return att.url
-    for e in msg.embeds:
-        if e.image and e.image.url:
-            return e.image.url
-    return None
-
-
 def build_position_maps(
-    per_channel: dict[int, list[discord.Message]],
-) -> tuple[dict[int, list[discord.Message]], dict[int, discord.Message]]:
+    per_channel: dict[int, list[PostRecord]],
+) -> tuple[dict[int, list[PostRecord]], dict[int, PostRecord]]:
     """All videos between two image posts belong to the preceding image
     (same channel, chronological)."""
-    img_to_videos: dict[int, list[discord.Message]] = {}
-    video_to_img: dict[int, discord.Message] = {}
+    img_to_videos: dict[int, list[PostRecord]] = {}
+    video_to_img: dict[int, PostRecord] = {}
     for _cid, msgs in per_channel.items():
         msgs_sorted = sorted(msgs, key=lambda m: m.created_at)
-        current_img: Optional[discord.Message] = None
+        current_img: Optional[PostRecord] = None
         for m in msgs_sorted:
-            if VideoPostDetector.is_video_post(m):
+            if m.is_video:
                 if current_img is not None:
                     img_to_videos.setdefault(current_img.id, []).append(m)
                     video_to_img[m.id] = current_img
@@ -196,21 +150,22 @@ def build_position_maps(
 
 
 def top_unique_users(
-    msgs: list[discord.Message],
+    msgs: list[PostRecord],
     stats: dict[int, tuple[int, dict, int]],
+    users: dict[int, discord.abc.User],
     max_count: int,
-) -> list[discord.Message]:
-    """Return top-N messages by score, one per unique user."""
+) -> list[PostRecord]:
+    """Return top-N posts by score, one per unique user."""
     ranked = sorted(
         msgs,
         key=lambda m: (stats[m.id][0], stats[m.id][2], m.created_at),
         reverse=True,
     )
-    result: list[discord.Message] = []
+    result: list[PostRecord] = []
     seen: set[int] = set()
     for m in ranked:
-        u = get_target_user(m)
-        if u.id in IGNORE_IDS or u.name == "Deleted User":
+        u = users.get(m.creator_id)
+        if u is None or u.id in IGNORE_IDS or u.name == "Deleted User":
             continue
         if u.id in seen:
             continue
@@ -221,61 +176,18 @@ def top_unique_users(
     return result
 
 
-async def collect_voter_counts(
-    msgs: list[discord.Message],
-    guild: discord.Guild,
-) -> dict[int, int]:
-    """Count EVERY reaction click as 1 point (per-click). Throttled."""
-    counts: dict[int, int] = {}
-    excluded_cache: dict[int, bool] = {}
-
-    def is_excluded(uid: int) -> bool:
-        if uid in excluded_cache:
-            return excluded_cache[uid]
+def filter_excluded_voters(counts: dict[int, int], guild: discord.Guild) -> dict[int, int]:
+    """Excluded-role filter, applied at query time so role changes take
+    effect immediately without touching the ledger."""
+    out: dict[int, int] = {}
+    for uid, c in counts.items():
         if uid in IGNORE_IDS:
-            excluded_cache[uid] = True
-            return True
+            continue
         member = guild.get_member(uid) if guild else None
         if member and any(r.id == VOTER_EXCLUDED_ROLE_ID for r in member.roles):
-            excluded_cache[uid] = True
-            return True
-        excluded_cache[uid] = False
-        return False
-
-    sem = asyncio.Semaphore(VOTER_FETCH_CONCURRENCY)
-
-    async def clicks_of_msg(msg: discord.Message) -> dict[int, int]:
-        local: dict[int, int] = {}
-        async with sem:
-            first = True
-            for reaction in msg.reactions:
-                key = normalize_emoji(reaction)
-                if str(key) == str(STARBOARD_IGNORE_ID):
-                    continue
-                if key in EMOJI_POINTS and reaction.count <= 1:
-                    continue
-                if not first:
-                    await asyncio.sleep(VOTER_INTRA_MSG_DELAY_SEC)
-                first = False
-                try:
-                    async for user in reaction.users():
-                        if user.bot:
-                            continue
-                        if is_excluded(user.id):
-                            continue
-                        local[user.id] = local.get(user.id, 0) + 1
-                except Exception:
-                    logger.exception("Error in reaction.users()")
-        return local
-
-    results = await asyncio.gather(
-        *(clicks_of_msg(m) for m in msgs), return_exceptions=True
-    )
-    for r in results:
-        if isinstance(r, dict):
-            for uid, c in r.items():
-                counts[uid] = counts.get(uid, 0) + c
-    return counts
+            continue
+        out[uid] = c
+    return out
 
 
 def compute_voter_ranks(
@@ -323,59 +235,64 @@ async def resolve_user_object(
     except Exception:
         return None
 
+
+async def resolve_creators(
+    posts: list[PostRecord], guild: discord.Guild, bot: commands.Bot
+) -> dict[int, discord.abc.User]:
+    """creator_id → user object; unresolvable ids are simply missing."""
+    users: dict[int, discord.abc.User] = {}
+    for uid in {p.creator_id for p in posts}:
+        u = await resolve_user_object(uid, guild, bot)
+        if u is not None:
+            users[uid] = u
+    return users
+
 # hut_vote_cog.py — Part 2/2 (append to Part 1)
 
 # =====================
 # COG
 # =====================
 class HutVote(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, events: ReactionStoreCog):
         self.bot = bot
+        self.events = events
 
-    async def _safe_text_channel(self, guild: discord.Guild, channel_id: int):
-        channel = guild.get_channel(channel_id)
-        if channel is None:
-            try:
-                channel = await guild.fetch_channel(channel_id)
-            except Exception:
-                logger.exception("Could not load channel %s.", channel_id)
-                return None
-        return channel if isinstance(channel, discord.TextChannel) else None
-
-    async def _scan_bot_messages(
-        self,
-        channel: discord.TextChannel,
-        start: Optional[datetime] = None,
-        end_exclusive: Optional[datetime] = None,
-    ) -> list[discord.Message]:
-        matched: list[discord.Message] = []
-        after_dt = (start - timedelta(seconds=1)) if start else None
-        try:
-            async for msg in channel.history(after=after_dt, before=end_exclusive, limit=None):
-                if msg.author.id != BOT_ID:
-                    continue
-                if start and end_exclusive and not (start <= msg.created_at < end_exclusive):
-                    continue
-                matched.append(msg)
-        except Exception:
-            logger.exception("Error reading #%s (%s)", channel.name, channel.id)
-        return matched
-
-    async def _scan_multi(self, guild, channel_ids, start=None, end_exclusive=None):
-        async def scan_one(cid):
-            ch = await self._safe_text_channel(guild, cid)
-            if ch is None:
-                return cid, []
-            msgs = await self._scan_bot_messages(ch, start, end_exclusive)
-            return cid, msgs
-        results = await asyncio.gather(*(scan_one(cid) for cid in channel_ids))
-        return {cid: msgs for cid, msgs in results}
+    # =====================================================
+    # LIFECYCLE
+    # =====================================================
+    async def cog_load(self):
+        # The shared store keeps these posts and their voters current.
+        self.events.track(SCAN_CHANNEL_IDS, author_ids=[BOT_ID], voters=True)
 
+    # =====================================================
+    # DATA
+    # =====================================================
+    async def _load_posts(
+        self, start: datetime, end_exclusive: datetime
+    ) -> dict[int, list[PostRecord]]:
+        return await self.events.load_posts(
+            SCAN_CHANNEL_IDS, start, end_exclusive, author_id=BOT_ID, voters=True
+        )
+
+    async def _voter_counts(
+        self, guild: discord.Guild, start: datetime, end_exclusive: datetime
+    ) -> dict[int, int]:
+        """Every reaction click counts 1 point — one aggregate over the ledger."""
+        counts = await self.events.store.voter_counts(
+            SCAN_CHANNEL_IDS, start, end_exclusive, author_id=BOT_ID,
+            ignore_emoji_keys=[str(STARBOARD_IGNORE_ID)],
+            seeded_emoji_keys=[str(k) for k in EMOJI_POINTS],
+        )
+        return filter_excluded_voters(counts, guild)
+
+    # =====================================================
+    # HELPERS
+    # =====================================================
     @staticmethod
     def _split_by_type(msgs):
         images, videos = [], []
         for m in msgs:
-            (videos if VideoPostDetector.is_video_post(m) else images).append(m)
+            (videos if m.is_video else images).append(m)
         return images, videos
 
     async def _paced_send(self, interaction: discord.Interaction, **kwargs):
@@ -411,17 +328,19 @@ class HutVote(commands.Cog):
             return await interaction.followup.send("Server-only.", ephemeral=True)
 
         start_dt, end_ex = get_month_utc_range(int(year.value), int(month.value))
-        per_ch = await self._scan_multi(interaction.guild, SCAN_CHANNEL_IDS, start_dt, end_ex)
+        per_ch = await self._load_posts(start_dt, end_ex)
         all_msgs = [m for msgs in per_ch.values() for m in msgs]
         image_msgs, _ = self._split_by_type(all_msgs)
+        users = await resolve_creators(image_msgs, interaction.guild, self.bot)
+        image_msgs = [m for m in image_msgs if m.creator_id in users]
         if not image_msgs:
             return await interaction.followup.send("No AI posts found.", ephemeral=ephemeral_flag)
 
         img_to_videos, video_to_img = build_position_maps(per_ch)
-        voter_counts = await collect_voter_counts(all_msgs, interaction.guild)
+        voter_counts = await self._voter_counts(interaction.guild, start_dt, end_ex)
 
         await self._render_ranking(
-            interaction=interaction, msgs=image_msgs,
+            interaction=interaction, msgs=image_msgs, users=users,
             title=f"🤖 AI Top — {calendar.month_name[int(month.value)]} {year.value}",
             ephemeral=ephemeral_flag,
             limit=int(topuser.value) if topuser else 5,
@@ -457,17 +376,19 @@ class HutVote(commands.Cog):
             return await interaction.followup.send("Server-only.", ephemeral=True)
 
         start_dt, end_ex = get_month_utc_range(int(year.value), int(month.value))
-        per_ch = await self._scan_multi(interaction.guild, SCAN_CHANNEL_IDS, start_dt, end_ex)
+        per_ch = await self._load_posts(start_dt, end_ex)
         all_msgs = [m for msgs in per_ch.values() for m in msgs]
         _, video_msgs = self._split_by_type(all_msgs)
+        users = await resolve_creators(video_msgs, interaction.guild, self.bot)
+        video_msgs = [m for m in video_msgs if m.creator_id in users]
         if not video_msgs:
             return await interaction.followup.send("No AI video posts found.", ephemeral=ephemeral_flag)
 
         img_to_videos, video_to_img = build_position_maps(per_ch)
-        voter_counts = await collect_voter_counts(all_msgs, interaction.guild)
+        voter_counts = await self._voter_counts(interaction.guild, start_dt, end_ex)
 
         await self._render_ranking(
-            interaction=interaction, msgs=video_msgs,
+            interaction=interaction, msgs=video_msgs, users=users,
             title=f"🎬 AI Video Top — {calendar.month_name[int(month.value)]} {year.value}",
             ephemeral=ephemeral_flag,
             limit=int(topuser.value) if topuser else 5,
@@ -517,9 +438,7 @@ class HutVote(commands.Cog):
         want_artists = kind.value in ("artists", "both")
         want_voters  = kind.value in ("voters",  "both")
 
-        per_ch = await self._scan_multi(
-            interaction.guild, SCAN_CHANNEL_IDS, start_dt, end_ex
-        )
+        per_ch = await self._load_posts(start_dt, end_ex)
         all_msgs = [m for msgs in per_ch.values() for m in msgs]
         image_msgs, _ = self._split_by_type(all_msgs)
 
@@ -527,17 +446,18 @@ class HutVote(commands.Cog):
         # entries: list of (user_obj, score, xp, idx)
         top_artists: list[tuple[discord.abc.User, int, int, int]] = []
         if want_artists:
+            users = await resolve_creators(image_msgs, interaction.guild, self.bot)
             stats = {m.id: calc_ai_points(m) for m in image_msgs}
-            top_msgs = top_unique_users(image_msgs, stats, max_count=5)
+            top_msgs = top_unique_users(image_msgs, stats, users, max_count=5)
             for i, m in enumerate(top_msgs):
-                u = get_target_user(m)
+                u = users[m.creator_id]
                 top_artists.append((u, stats[m.id][0], WINNER_XP.get(i, 0), i))
 
         # ---- Top 5 Voters ----
         # entries: list of (user_obj, count, xp, rank)
         top_voters: list[tuple[discord.abc.User, int, int, int]] = []
         if want_voters:
-            voter_counts = await collect_voter_counts(all_msgs, interaction.guild)
+            voter_counts = await self._voter_counts(interaction.guild, start_dt, end_ex)
             for rank, uid, cnt in compute_voter_ranks(voter_counts, max_ranks=5):
                 u = await resolve_user_object(uid, interaction.guild, self.bot)
                 if u is None:
@@ -669,13 +589,15 @@ class HutVote(commands.Cog):
     # =====================================================
     async def _render_ranking(
         self, interaction: discord.Interaction,
-        msgs: list[discord.Message], title: str,
+        msgs: list[PostRecord], title: str,
         ephemeral: bool, limit: int, sort_order: str,
         kind: str,   # "image" | "video"
-        img_to_videos: dict[int, list[discord.Message]],
-        video_to_img: dict[int, discord.Message],
+        img_to_videos: dict[int, list[PostRecord]],
+        video_to_img: dict[int, PostRecord],
         voter_counts: dict[int, int],
+        users: dict[int, discord.abc.User],
     ):
+        """`users` must hold a resolved user for every post creator in `msgs`."""
         guild = interaction.guild
         is_public = not ephemeral
 
@@ -710,13 +632,13 @@ class HutVote(commands.Cog):
         display_msgs = top_msgs if sort_order == "asc" else list(reversed(top_msgs))
 
         # Top 3 unique winners
-        top_unique = top_unique_users(msgs, stats, max_count=3)
+        top_unique = top_unique_users(msgs, stats, users, max_count=3)
 
         winners_title = WINNERS_TITLE_IMAGE if kind == "image" else WINNERS_TITLE_VIDEO
 
         winners_txt = ""
         for i, m in enumerate(top_unique):
-            u = get_target_user(m)
+            u = users[m.creator_id]
             xp = WINNER_XP.get(i, 0)
             sparkle = WINNER_SPARKLE[i]
             winners_txt += (
@@ -751,7 +673,7 @@ class HutVote(commands.Cog):
         intro.set_footer(text=f"Updated: {now_str} UTC")
         await self._paced_send(interaction, embed=intro, ephemeral=ephemeral)
 
-        top_user_ids = [get_target_user(m).id for m in top_unique]
+        top_user_ids = [m.creator_id for m in top_unique]
 
         # Detail embeds batched
         detail_batch: list[discord.Embed] = []
@@ -764,7 +686,7 @@ class HutVote(commands.Cog):
                 detail_batch.clear()
 
         for m in display_msgs:
-            u = get_target_user(m)
+            u = users[m.creator_id]
             score, breakdown, emoji_total = stats[m.id]
             rank_number = rank_map[m.id]
 
@@ -802,11 +724,11 @@ class HutVote(commands.Cog):
 
             image_url = None
             if kind == "image":
-                image_url = get_image_url_from_post(m)
+                image_url = m.image_url
             else:
                 src = video_to_img.get(m.id)
                 if src:
-                    image_url = get_image_url_from_post(src)
+                    image_url = src.image_url
             if image_url:
                 embed.set_image(url=image_url)
 
@@ -822,7 +744,7 @@ class HutVote(commands.Cog):
             if top_unique:
                 final_desc_lines.append(f"**{winners_title}**")
                 for i, m in enumerate(top_unique):
-                    u = get_target_user(m)
+                    u = users[m.creator_id]
                     score, _, emoji_total = stats[m.id]
                     tie_suffix = f" ({emoji_total} 📊)" if (score, emoji_total) in tied_keys else ""
                     xp = WINNER_XP.get(i, 0)
@@ -847,7 +769,7 @@ class HutVote(commands.Cog):
             winner_uids: set[int] = set()
             winner_mentions: list[str] = []
             for m in top_unique:
-                u = get_target_user(m)
+                u = users[m.creator_id]
                 winner_uids.add(u.id)
                 winner_mentions.append(u.mention)
 
@@ -901,4 +823,5 @@ class HutVote(commands.Cog):
 # SETUP
 # =====================
 async def setup(bot: commands.Bot):
-    await bot.add_cog(HutVote(bot))
\ No newline at end of file
+    events = await ensure_loaded(bot)
+    await bot.add_cog(HutVote(bot, events))
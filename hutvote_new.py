@@ -5,6 +5,8 @@ from datetime import datetime, timezone
 import calendar
 import traceback
 
+from reaction_store import PostRecord, ReactionStoreCog, ensure_loaded, interaction_progress
+
 # =====================
 # KONFIG
 # =====================
@@ -51,17 +53,16 @@ EMOJI_POINTS = {
 # =====================
 # HELPER
 # =====================
-def normalize_emoji(r):
-    if isinstance(r.emoji, (discord.PartialEmoji, discord.Emoji)):
-        return r.emoji.id
-    return str(r.emoji)
+def normalize_emoji(key: str):
+    # Store keys: custom emoji → "id", unicode → the emoji itself
+    return int(key) if key.isdigit() else key
 
-def calc_ai_points(msg: discord.Message):
+def calc_ai_points(post: PostRecord):
     breakdown = {}
     score = 0
 
-    for r in msg.reactions:
-        key = normalize_emoji(r)
+    for k, r in post.reactions.items():
+        key = normalize_emoji(k)
         if key == STARBOARD_IGNORE_ID:
             continue
 
@@ -86,8 +87,25 @@ def calc_ai_points(msg: discord.Message):
 # COG
 # =====================
 class HutVote(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, events: ReactionStoreCog):
         self.bot = bot
+        self.events = events
+
+    async def cog_load(self):
+        self.events.track(SCAN_CHANNEL_IDS, author_ids=[BOT_ID])
+
+    async def _resolve_users(self, guild, posts):
+        """creator_id → Member/User; falls back to the API for users who left."""
+        users = {}
+        for uid in {p.creator_id for p in posts}:
+            u = guild.get_member(uid) if guild else None
+            if u is None:
+                try:
+                    u = await self.bot.fetch_user(uid)
+                except Exception:
+                    continue
+            users[uid] = u
+        return users
 
     # =====================
     # /ai_vote
@@ -117,26 +135,20 @@ class HutVote(commands.Cog):
         year_v = int(year.value)
         month_v = int(month.value)
         start_dt = datetime(year_v, month_v, 1, tzinfo=timezone.utc)
-        end_dt = datetime(
-            year_v, month_v,
-            calendar.monthrange(year_v, month_v)[1],
-            23, 59, 59,
-            tzinfo=timezone.utc
+        end_dt = (
+            datetime(year_v + 1, 1, 1, tzinfo=timezone.utc) if month_v == 12
+            else datetime(year_v, month_v + 1, 1, tzinfo=timezone.utc)
         )
 
         matched_msgs = []
-        guild = interaction.guild
-
-        for cid in SCAN_CHANNEL_IDS:
-            channel = guild.get_channel(cid)
-            if not isinstance(channel, discord.TextChannel):
-                continue
-            try:
-                async for msg in channel.history(after=start_dt, before=end_dt, limit=None):
-                    if msg.author.id == BOT_ID:
-                        matched_msgs.append(msg)
-            except Exception:
-                traceback.print_exc()
+        try:
+            per_ch = await self.events.load_posts(
+                SCAN_CHANNEL_IDS, start_dt, end_dt, author_id=BOT_ID,
+                progress=interaction_progress(interaction, "Scanning AI channels"),
+            )
+            matched_msgs = [m for msgs in per_ch.values() for m in msgs]
+        except Exception:
+            traceback.print_exc()
 
         if not matched_msgs:
             return await interaction.followup.send("No AI posts found.", ephemeral=ephemeral_flag)
@@ -180,9 +192,15 @@ class HutVote(commands.Cog):
 
         matched_msgs = []
         try:
-            async for msg in target_channel.history(limit=None):
-                if msg.author.id == BOT_ID:
-                    matched_msgs.append(msg)
+            # Whole channel lifetime; the store backfills it once, later calls are local.
+            per_ch = await self.events.load_posts(
+                [target_channel.id],
+                discord.utils.snowflake_time(target_channel.id),
+                datetime.now(timezone.utc),
+                author_id=BOT_ID,
+                progress=interaction_progress(interaction, f"Scanning #{target_channel.name}"),
+            )
+            matched_msgs = per_ch.get(target_channel.id, [])
         except Exception:
             traceback.print_exc()
 
@@ -204,6 +222,8 @@ class HutVote(commands.Cog):
         guild = interaction.guild
         medals = ["🥇", "🥈", "🥉"]
 
+        users = await self._resolve_users(guild, msgs)
+        msgs = [m for m in msgs if m.creator_id in users]
         msgs_sorted = sorted(
             msgs,
             key=lambda m: (calc_ai_points(m)[0], m.created_at),
@@ -213,7 +233,7 @@ class HutVote(commands.Cog):
         top_unique = []
         seen = set()
         for m in msgs_sorted:
-            u = m.mentions[0] if m.mentions else m.author
+            u = users[m.creator_id]
             if u.id not in seen:
                 top_unique.append(m)
                 seen.add(u.id)
@@ -225,7 +245,7 @@ class HutVote(commands.Cog):
         # ---------------------------
         intro = ""
         for i, m in enumerate(top_unique):
-            u = m.mentions[0] if m.mentions else m.author
+            u = users[m.creator_id]
             intro += f"{medals[i]} {u.display_name}\n"
 
         now_str = datetime.utcnow().strftime("%Y/%m/%d %H:%M")  # YYYY/MM/DD HH:MM UTC
@@ -242,7 +262,7 @@ class HutVote(commands.Cog):
         # ---------------------------
         for idx, m in enumerate(msgs_sorted[:limit], start=1):
             score, breakdown, _ = calc_ai_points(m)
-            u = m.mentions[0] if m.mentions else m.author
+            u = users[m.creator_id]
 
             lines = []
             for k, d in breakdown.items():
@@ -256,20 +276,9 @@ class HutVote(commands.Cog):
             )
             embed.set_thumbnail(url=u.display_avatar.url)
 
-            # Bild Handling
-            img_url = None
-            if m.attachments:
-                img_url = m.attachments[0].url
-            else:
-                for e in m.embeds:
-                    if e.image and e.image.url:
-                        img_url = e.image.url
-                        break
-                    if e.thumbnail and e.thumbnail.url:
-                        img_url = e.thumbnail.url
-                        break
-            if img_url:
-                embed.set_image(url=img_url)
+            # Bild Handling (preview URL captured when the post was indexed)
+            if m.image_url:
+                embed.set_image(url=m.image_url)
 
             post_time_str = m.created_at.strftime("%Y/%m/%d %H:%M")
             embed.set_footer(text=f"Posted: {post_time_str} UTC")
@@ -281,7 +290,7 @@ class HutVote(commands.Cog):
         mentions = []
         final_lines = []
         for i, m in enumerate(top_unique):
-            u = m.mentions[0] if m.mentions else m.author
+            u = users[m.creator_id]
             s, _, _ = calc_ai_points(m)
             mentions.append(u.mention)
             final_lines.append(f"{medals[i]} {u.display_name} — {s} pts")
@@ -301,4 +310,5 @@ class HutVote(commands.Cog):
 # SETUP
 # =====================
 async def setup(bot: commands.Bot):
-    await bot.add_cog(HutVote(bot))
+    events = await ensure_loaded(bot)
+    await bot.add_cog(HutVote(bot, events))
@@ -3,7 +3,9 @@ from discord.ext import commands
 from discord import app_commands
 import asyncio
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timezone
+
+from reaction_store import ReactionStoreCog, ensure_loaded
 
 ALLOWED_CHANNELS = [
     1378018756843933767,
@@ -20,14 +22,22 @@ REACTION_POINTS = {
     "<:011:1346549711817146400>": 5,
 }
 
+# Pro Kanal werden (wie früher mit history(limit=100)) nur die ersten
+# 100 Nachrichten ab dem Stichtag gewertet
+MESSAGES_PER_CHANNEL = 100
+
 # Für später können hier weitere Datumsoptionen ergänzt werden
 DATE_CHOICES = [
     app_commands.Choice(name="07.09.2025", value="2025-09-07")
 ]
 
 class PepperPicCog(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, events: ReactionStoreCog):
         self.bot = bot
+        self.events = events
+
+    async def cog_load(self):
+        self.events.track(ALLOWED_CHANNELS)
 
     @app_commands.command(
         name="pepperpic",
@@ -61,37 +71,29 @@ class PepperPicCog(commands.Cog):
         message_scores = []
 
         # Ausgewähltes Datum
-        since_date = datetime.strptime(since.value, "%Y-%m-%d")
+        since_date = datetime.strptime(since.value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
         current_date_str = datetime.utcnow().strftime("%Y-%m-%d")
 
+        # Posts + Reaktionen kommen aus dem Reaction-Store, nicht aus channel.history()
+        per_channel = await self.events.load_posts(
+            ALLOWED_CHANNELS, since_date, datetime.now(timezone.utc)
+        )
+
         for channel_id in ALLOWED_CHANNELS:
-            channel = self.bot.get_channel(channel_id)
-            if not channel:
-                continue
-
-            try:
-                async for msg in channel.history(limit=100, after=since_date):
-                    if not msg.attachments:
-                        continue  # nur Nachrichten mit Bildern
-
-                    total_points = 0
-                    for reaction in msg.reactions:
-                        # Custom Emoji vs Unicode Emoji korrekt erkennen
-                        if isinstance(reaction.emoji, str):
-                            emoji_key = reaction.emoji
-                        else:
-                            emoji_key = f"<:{reaction.emoji.name}:{reaction.emoji.id}>"
-
-                        if emoji_key in REACTION_POINTS:
-                            # Dummy-Reaktion abziehen
-                            actual_count = max(reaction.count - 1, 0)
-                            total_points += actual_count * REACTION_POINTS[emoji_key]
-
-                    if total_points > 0:
-                        message_scores.append((msg, total_points))
-
-            except (discord.Forbidden, discord.NotFound):
-                continue
+            for msg in per_channel.get(channel_id, [])[:MESSAGES_PER_CHANNEL]:
+                if not msg.has_attachment:
+                    continue  # nur Nachrichten mit Bildern
+
+                total_points = 0
+                for reaction in msg.reactions.values():
+                    # reaction.text ist "<:name:id>" bzw. das Unicode-Emoji
+                    if reaction.text in REACTION_POINTS:
+                        # Dummy-Reaktion abziehen
+                        actual_count = max(reaction.count - 1, 0)
+                        total_points += actual_count * REACTION_POINTS[reaction.text]
+
+                if total_points > 0:
+                    message_scores.append((msg, total_points))
 
         if not message_scores:
             await interaction.followup.send("No messages with reactions found.", ephemeral=not post)
@@ -104,7 +106,7 @@ class PepperPicCog(commands.Cog):
         embeds = []
 
         for rank, (msg, points) in enumerate(top_msgs, start=1):
-            user_id = msg.mentions[0].id if msg.mentions else None
+            user_id = msg.mention_id
             mention_text = "Unknown User"
             if user_id:
                 member = interaction.guild.get_member(user_id)
@@ -120,7 +122,8 @@ class PepperPicCog(commands.Cog):
                 description=f"Generated by {mention_text}\n[Jump to Message]({msg.jump_url})",
                 color=color
             )
-            embed.set_image(url=msg.attachments[0].url)
+            if msg.image_url:
+                embed.set_image(url=msg.image_url)
             embeds.append(embed)
 
         # Alle Top-N Nachrichten posten
@@ -131,8 +134,8 @@ class PepperPicCog(commands.Cog):
         # --- Pings der Top 3 User ---
         top_user_ids = []
         for msg, _ in top_msgs[:3]:
-            if msg.mentions:
-                user_id = msg.mentions[0].id
+            if msg.mention_id:
+                user_id = msg.mention_id
                 if user_id not in top_user_ids:
                     top_user_ids.append(user_id)
 
@@ -146,7 +149,7 @@ class PepperPicCog(commands.Cog):
         leader_text = "Unknown"
         if top_msgs:
             leader_msg, _ = top_msgs[0]
-            user_id = leader_msg.mentions[0].id if leader_msg.mentions else None
+            user_id = leader_msg.mention_id
             if user_id:
                 member = interaction.guild.get_member(user_id)
                 if member:
@@ -164,4 +167,5 @@ class PepperPicCog(commands.Cog):
 
 
 async def setup(bot):
-    await bot.add_cog(PepperPicCog(bot))
+    events = await ensure_loaded(bot)
+    await bot.add_cog(PepperPicCog(bot, events))
@@ -9,6 +9,8 @@ import time
 import uuid
 from datetime import datetime
 from dotenv import load_dotenv
+import http_client
+from venice_shared import venice_scheduler
 
 load_dotenv()
 VENICE_API_KEY = os.getenv("VENICE_API_KEY")
@@ -247,7 +249,8 @@ class AspectRatioView(discord.ui.View):
                 await progress_msg.edit(content=progress_text)
             except: pass
 
-        img_bytes = await venice_generate(
+        img_bytes = await venice_scheduler.call(
+            self.variant["model"], interaction.user, venice_generate,
             self.session, self.prompt_text + self.poppy_prompt, self.variant, width, height,
             steps=steps, cfg_scale=cfg,
             negative_prompt=self.variant.get("negative_prompt")
@@ -433,9 +436,9 @@ class VeniceView(discord.ui.View):
 
 # ---------------- Cog ----------------
 class VeniceCog(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, http: http_client.HttpClientCog):
         self.bot = bot
-        self.session = aiohttp.ClientSession()
+        self.session = http.session()
 
     def cog_unload(self):
         asyncio.create_task(self.session.close())
@@ -466,4 +469,5 @@ class VeniceCog(commands.Cog):
 
 # ---------------- Setup ----------------
 async def setup(bot: commands.Bot):
-    await bot.add_cog(VeniceCog(bot))
+    http = await http_client.ensure_loaded(bot)
+    await bot.add_cog(VeniceCog(bot, http))
@@ -0,0 +1,1343 @@
+# reaction_store.py
+"""
+Shared, gateway-fed store of leaderboard posts, their reaction counts and
+their voters. Every leaderboard cog (hutvote, hutvote_new, hutthreadvote,
+champions_cog, pepperpic) reads from here instead of walking
+channel.history() on its own; each of them only registers which channels and
+authors it cares about via `ReactionStoreCog.track()`.
+
+Load it with `await reaction_store.ensure_loaded(bot)` from a cog's setup().
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import time
+from typing import Awaitable, Callable, Iterable, Iterator, NamedTuple, Optional, Union
+
+import aiosqlite
+import discord
+from discord.ext import commands
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger("reaction_store")
+
+# Lives next to the riddle DB (data/riddle.sqlite3) by default.
+DB_PATH = (os.getenv("REACTION_STORE_DB_PATH") or "data/reactions.sqlite3").strip()
+
+# On every start (and the first time a channel is tracked in a session) the
+# last RECONCILE_DAYS are re-read once, so reactions and deletions that
+# happened while the bot was offline are picked up. Older ranges are
+# backfilled lazily the first time somebody asks for them.
+RECONCILE_DAYS = int(os.getenv("REACTION_STORE_RECONCILE_DAYS", "35"))
+
+# Ledger backfill — extra gentle against Discord's rate limiter.
+VOTER_FETCH_CONCURRENCY = 3
+VOTER_INTRA_MSG_DELAY_SEC = 0.25
+
+# History scans (session sync + backfills): how many channels are walked at
+# once, and a global token bucket over history pages (one page = one GET of
+# up to 100 messages). discord.py still honours the per-route buckets and
+# 429s on top of this; the bucket keeps parallel scans from ever getting there.
+SCAN_CONCURRENCY = int(os.getenv("REACTION_STORE_SCAN_CONCURRENCY", "4"))
+SCAN_PAGES_PER_SEC = float(os.getenv("REACTION_STORE_SCAN_PAGES_PER_SEC", "4"))
+SCAN_PAGE_BURST = 8
+HISTORY_PAGE_SIZE = 100
+PROGRESS_EDIT_SEC = 3.0
+
+# Bump when the post classification below changes: every channel whose stored
+# scope tag differs is re-indexed on the next start.
+SCOPE_VERSION = "v2"
+
+_SQL_IDENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_MENTION_RE = re.compile(r"<@!?(\d+)>")
+_GENERATED_BY_RE = re.compile(r"🎨 Generated by:\s*<@!?(\d+)>")
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+EmojiLike = Union[discord.PartialEmoji, discord.Emoji, str]
+
+
+def emoji_key(emoji: EmojiLike) -> str:
+    """Stable storage key: custom emoji → str(id), unicode → the emoji itself."""
+    if isinstance(emoji, (discord.PartialEmoji, discord.Emoji)):
+        if emoji.id:
+            return str(emoji.id)
+        return emoji.name or ""
+    return str(emoji)
+
+
+def emoji_text(emoji: EmojiLike) -> str:
+    """Display / API form: '<:name:id>' for custom emoji, the character otherwise."""
+    return str(emoji)
+
+
+def iso_utc(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).isoformat()
+
+
+def snowflake_floor(ts: datetime) -> int:
+    """Smallest message id that can have been created at or after `ts`."""
+    return discord.utils.time_snowflake(ts, high=False)
+
+
+def first_mention_id(content: Optional[str]) -> Optional[int]:
+    m = _MENTION_RE.search(content or "")
+    return int(m.group(1)) if m else None
+
+
+# =============================================================================
+# POST CLASSIFICATION — only edit if the bot's post format changes
+# =============================================================================
+class VideoPostDetector:
+    VIDEO_EXTENSIONS = (".mp4", ".webm", ".mov", ".mkv", ".m4v")
+    CONTENT_MARKERS  = ("🎬",)
+    CONTENT_HINTS    = ("click to play", "video")
+
+    @classmethod
+    def is_video_attachment(cls, att: discord.Attachment) -> bool:
+        if att.content_type and att.content_type.startswith("video/"):
+            return True
+        return (att.filename or "").lower().endswith(cls.VIDEO_EXTENSIONS)
+
+    @classmethod
+    def is_video_post(cls, msg: discord.Message) -> bool:
+        if any(cls.is_video_attachment(att) for att in msg.attachments):
+            return True
+        if not msg.attachments:
+            return False
+        content = msg.content or ""
+        cl = content.lower()
+        return (
+            any(m in content for m in cls.CONTENT_MARKERS)
+            and any(h in cl for h in cls.CONTENT_HINTS)
+        )
+
+
+def is_image_attachment(att: discord.Attachment) -> bool:
+    if att.content_type and att.content_type.startswith("image/"):
+        return True
+    name = (att.filename or "").lower()
+    return name.endswith((".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"))
+
+
+def preview_image_url(msg: discord.Message) -> Optional[str]:
+    """First non-video attachment, else the first embed image/thumbnail."""
+    if msg.attachments and not VideoPostDetector.is_video_attachment(msg.attachments[0]):
+        return msg.attachments[0].url
+    for e in msg.embeds:
+        if e.image and e.image.url:
+            return e.image.url
+    for e in msg.embeds:
+        if e.thumbnail and e.thumbnail.url:
+            return e.thumbnail.url
+    return None
+
+
+def embed_creator_id(msg: discord.Message) -> Optional[int]:
+    """Creator named in a '🎨 Generated by: <@id>' embed line (external bots)."""
+    for e in msg.embeds:
+        if e.description and "🎨 Generated by:" in e.description:
+            m = _GENERATED_BY_RE.search(e.description)
+            return int(m.group(1)) if m else None
+    return None
+
+
+# =============================================================================
+# RECORDS
+# =============================================================================
+class EmojiCount(NamedTuple):
+    text: str    # '<:name:id>' or the unicode emoji
+    count: int   # normal + burst, same as discord.Reaction.count
+    me: bool     # this bot is one of the reactors
+
+
+@dataclass
+class PostRecord:
+    """
+    Local mirror of one tracked post. Quacks like the bits of discord.Message
+    the leaderboards used (`id`, `jump_url`, `created_at`), so ranking code
+    does not need a live message object any more.
+    """
+    message_id: int
+    guild_id: int
+    channel_id: int
+    author_id: int
+    mention_id: Optional[int]
+    created_at: datetime
+    is_video: bool = False
+    image_url: Optional[str] = None
+    author_is_bot: bool = False
+    content_mention_id: Optional[int] = None
+    embed_creator_id: Optional[int] = None
+    has_attachment: bool = False
+    has_image: bool = False
+    # emoji_key -> EmojiCount, in Discord's display order
+    reactions: dict[str, EmojiCount] = field(default_factory=dict)
+
+    @property
+    def id(self) -> int:
+        return self.message_id
+
+    @property
+    def creator_id(self) -> int:
+        """The bot posts on behalf of the first mentioned user."""
+        return self.mention_id or self.author_id
+
+    @property
+    def jump_url(self) -> str:
+        return (f"https://discord.com/channels/"
+                f"{self.guild_id}/{self.channel_id}/{self.message_id}")
+
+    def count_of(self, emoji: str) -> int:
+        """Count by storage key or by display text ('<:name:id>', '1️⃣')."""
+        rc = self.reactions.get(emoji)
+        if rc is not None:
+            return rc.count
+        return next((rc.count for rc in self.reactions.values() if rc.text == emoji), 0)
+
+
+def record_from_message(msg: discord.Message) -> PostRecord:
+    """Snapshot of a live message for the store."""
+    reactions: dict[str, EmojiCount] = {}
+    for r in msg.reactions:
+        reactions[emoji_key(r.emoji)] = EmojiCount(emoji_text(r.emoji), r.count, bool(r.me))
+    return PostRecord(
+        message_id=msg.id,
+        guild_id=msg.guild.id if msg.guild else 0,
+        channel_id=msg.channel.id,
+        author_id=msg.author.id,
+        author_is_bot=bool(msg.author.bot),
+        mention_id=msg.mentions[0].id if msg.mentions else None,
+        content_mention_id=first_mention_id(msg.content),
+        embed_creator_id=embed_creator_id(msg),
+        created_at=msg.created_at,
+        is_video=VideoPostDetector.is_video_post(msg),
+        has_attachment=bool(msg.attachments),
+        has_image=(any(is_image_attachment(a) for a in msg.attachments)
+                   or any((e.image is not None and e.image.url is not None)
+                          or (e.thumbnail is not None and e.thumbnail.url is not None)
+                          for e in msg.embeds)),
+        image_url=preview_image_url(msg),
+        reactions=reactions,
+    )
+
+
+def reaction_handle(channel: Optional[discord.abc.Messageable], post: PostRecord,
+                    rc: EmojiCount) -> Optional[discord.Reaction]:
+    """Minimal Reaction bound to a PartialMessage, just enough for .users()."""
+    if channel is None or not hasattr(channel, "get_partial_message"):
+        return None
+    emoji = discord.PartialEmoji.from_str(rc.text) if rc.text.startswith("<") else rc.text
+    return discord.Reaction(
+        message=channel.get_partial_message(post.message_id),
+        data={"count": rc.count, "me": rc.me},
+        emoji=emoji,
+    )
+
+
+async def fetch_post_voters(
+    channel: Optional[discord.abc.Messageable], post: PostRecord,
+) -> Optional[dict[str, list[tuple[int, bool]]]]:
+    """Full voter list of one post from the API, for the ledger backfill.
+    Returns None if it could not be read completely."""
+    voters: dict[str, list[tuple[int, bool]]] = {}
+    first = True
+    for k, rc in post.reactions.items():
+        reaction = reaction_handle(channel, post, rc)
+        if reaction is None:
+            return None
+        if not first:
+            await asyncio.sleep(VOTER_INTRA_MSG_DELAY_SEC)
+        first = False
+        try:
+            voters[k] = [(user.id, user.bot) async for user in reaction.users()]
+        except Exception:
+            logger.exception("Error in reaction.users() (msg=%s)", post.id)
+            return None
+    return voters
+
+
+# =============================================================================
+# SCAN SCHEDULING
+# =============================================================================
+class TokenBucket:
+    """Plain token bucket: `rate` tokens/s, at most `capacity` saved up."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = max(rate, 0.1)
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:  # FIFO: waiters are served in arrival order
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class ScanProgress:
+    """Shared by all channel scans of one request; handed to the callback."""
+    channels_total: int = 0
+    channels_done: int = 0
+    messages: int = 0
+    callback: Optional[Callable[["ScanProgress"], Awaitable[None]]] = None
+
+    async def report(self):
+        if self.callback is None:
+            return
+        try:
+            await self.callback(self)
+        except Exception:
+            logger.debug("Progress callback failed", exc_info=True)
+
+
+def interaction_progress(interaction: discord.Interaction, label: str):
+    """Progress callback that edits the deferred response, at most every
+    PROGRESS_EDIT_SEC seconds (plus once when the last channel finished)."""
+    last = 0.0
+
+    async def _update(p: ScanProgress):
+        nonlocal last
+        now = time.monotonic()
+        finished = p.channels_done >= p.channels_total
+        if not finished and now - last < PROGRESS_EDIT_SEC:
+            return
+        last = now
+        icon = "✅" if finished else "⏳"
+        await interaction.edit_original_response(
+            content=(f"{icon} {label}: {p.channels_done}/{p.channels_total} channel(s) scanned, "
+                     f"{p.messages} message(s) read")
+        )
+
+    return _update
+
+
+# =============================================================================
+# DB REPO
+# =============================================================================
+class ReactionStore:
+    """
+    Same transaction contract as RiddleRepo: one aiosqlite connection in
+    AUTOCOMMIT mode, multi-statement writes wrapped in BEGIN IMMEDIATE, and
+    `self.lock` serialising everything (reads included) because a single
+    connection gains nothing from unlocked reads except dirty ones.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self.db: Optional[aiosqlite.Connection] = None
+        self.lock = asyncio.Lock()
+        # Live-event bookkeeping for history scans (see live_scan)
+        self._live_seq = 0
+        self._live_touched: dict[int, int] = {}
+        self._open_scans = 0
+
+    # ---------------------------------------------------------------- lifecycle
+    async def start(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = await aiosqlite.connect(self.db_path, isolation_level=None)
+        self.db.row_factory = aiosqlite.Row
+        await self.db.execute("PRAGMA journal_mode=WAL;")
+        await self.db.execute("PRAGMA foreign_keys=ON;")
+        await self.db.execute("PRAGMA busy_timeout=5000;")
+        await self.db.execute("PRAGMA synchronous=NORMAL;")
+        await self._init_db()
+        logger.info("ReactionStore ready (db=%s)", self.db_path)
+
+    async def close(self):
+        if self.db:
+            with contextlib.suppress(Exception):
+                await self.db.close()
+            self.db = None
+
+    async def _init_db(self):
+        assert self.db is not None
+        schema = """
+        CREATE TABLE IF NOT EXISTS posts (
+            message_id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            author_id INTEGER NOT NULL,
+            mention_id INTEGER,
+            created_at TEXT NOT NULL,
+            is_video INTEGER NOT NULL DEFAULT 0 CHECK(is_video IN (0,1)),
+            image_url TEXT,
+            voters_synced INTEGER NOT NULL DEFAULT 0 CHECK(voters_synced IN (0,1))
+        );
+        CREATE INDEX IF NOT EXISTS idx_posts_channel_msg ON posts(channel_id, message_id);
+
+        CREATE TABLE IF NOT EXISTS post_reactions (
+            message_id INTEGER NOT NULL,
+            emoji_key TEXT NOT NULL,
+            emoji_text TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(message_id, emoji_key),
+            FOREIGN KEY(message_id) REFERENCES posts(message_id) ON DELETE CASCADE
+        );
+
+        -- Voter ledger: one row per (post, emoji, user) click. Normal reactions
+        -- only, matching what reaction.users() returns by default.
+        CREATE TABLE IF NOT EXISTS reaction_users (
+            message_id INTEGER NOT NULL,
+            emoji_key TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            is_bot INTEGER NOT NULL DEFAULT 0 CHECK(is_bot IN (0,1)),
+            PRIMARY KEY(message_id, emoji_key, user_id),
+            FOREIGN KEY(message_id) REFERENCES posts(message_id) ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS idx_reaction_users_user ON reaction_users(user_id);
+
+        CREATE TABLE IF NOT EXISTS channel_watermarks (
+            channel_id INTEGER PRIMARY KEY,
+            newest_message_id INTEGER,
+            covered_from TEXT,
+            updated_at TEXT NOT NULL
+        );
+
+        -- Change counter per (channel, UTC day of post creation). Every write
+        -- that changes a post, its reactions or its voters bumps the day to a
+        -- new global maximum, so derived per-day aggregates can tell whether
+        -- they are stale by comparing a single number.
+        CREATE TABLE IF NOT EXISTS day_revisions (
+            channel_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            rev INTEGER NOT NULL,
+            PRIMARY KEY(channel_id, day)
+        );
+        """
+        async with self.lock:
+            await self.db.executescript(schema)
+            await self._add_col_if_missing(
+                "posts", "voters_synced",
+                "voters_synced INTEGER NOT NULL DEFAULT 0 CHECK(voters_synced IN (0,1))")
+            await self._add_col_if_missing(
+                "posts", "author_is_bot",
+                "author_is_bot INTEGER NOT NULL DEFAULT 0 CHECK(author_is_bot IN (0,1))")
+            await self._add_col_if_missing("posts", "content_mention_id",
+                                           "content_mention_id INTEGER")
+            await self._add_col_if_missing("posts", "embed_creator_id",
+                                           "embed_creator_id INTEGER")
+            await self._add_col_if_missing(
+                "posts", "has_attachment",
+                "has_attachment INTEGER NOT NULL DEFAULT 0 CHECK(has_attachment IN (0,1))")
+            await self._add_col_if_missing(
+                "posts", "has_image",
+                "has_image INTEGER NOT NULL DEFAULT 0 CHECK(has_image IN (0,1))")
+            await self._add_col_if_missing(
+                "post_reactions", "me", "me INTEGER NOT NULL DEFAULT 0 CHECK(me IN (0,1))")
+            # Which (version, authors) a channel was indexed for – see SCOPE_VERSION.
+            await self._add_col_if_missing("channel_watermarks", "scope", "scope TEXT")
+            await self.db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_posts_voters_pending "
+                "ON posts(channel_id, message_id) WHERE voters_synced=0")
+
+    async def _add_col_if_missing(self, table: str, col_name: str, col_def: str):
+        """Caller holds the lock. Identifiers are hard-coded, guarded anyway."""
+        assert self.db is not None
+        for n in (table, col_name):
+            if not _SQL_IDENT_RE.match(n):
+                raise ValueError(f"Refusing to interpolate unsafe SQL identifier: {n!r}")
+        cur = await self.db.execute(f"PRAGMA table_info({table})")
+        cols = [r["name"] for r in await cur.fetchall()]
+        await cur.close()
+        if col_name not in cols:
+            await self.db.execute(f"ALTER TABLE {table} ADD COLUMN {col_def}")
+            logger.info("Migration: added %s.%s", table, col_name)
+
+    # ------------------------------------------------------------------ writes
+    @staticmethod
+    def _post_params(p: PostRecord) -> tuple:
+        return (p.message_id, p.guild_id, p.channel_id, p.author_id,
+                1 if p.author_is_bot else 0, p.mention_id, p.content_mention_id,
+                p.embed_creator_id, iso_utc(p.created_at), 1 if p.is_video else 0,
+                1 if p.has_attachment else 0, 1 if p.has_image else 0, p.image_url)
+
+    async def _bump_days(self, message_ids: Iterable[int]):
+        """Caller holds the lock and an open transaction. Must run BEFORE a
+        post is deleted (its channel/day are read from the row)."""
+        assert self.db is not None
+        ids = [int(i) for i in message_ids]
+        if not ids:
+            return
+        cur = await self.db.execute("SELECT COALESCE(MAX(rev), 0) AS rev FROM day_revisions")
+        rev = (await cur.fetchone())["rev"] + 1
+        await cur.close()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cur = await self.db.execute(
+                f"SELECT DISTINCT channel_id, substr(created_at, 1, 10) AS day FROM posts "
+                f"WHERE message_id IN ({','.join('?' for _ in chunk)})", tuple(chunk))
+            days = [(r["channel_id"], r["day"], rev) for r in await cur.fetchall()]
+            await cur.close()
+            await self.db.executemany(
+                "INSERT INTO day_revisions (channel_id, day, rev) VALUES (?, ?, ?) "
+                "ON CONFLICT(channel_id, day) DO UPDATE SET rev=excluded.rev", days)
+
+    async def _write_post(self, p: PostRecord, *, replace_reactions: bool):
+        """Caller holds the lock and an open transaction."""
+        assert self.db is not None
+        cur = await self.db.execute(
+            "SELECT message_id, guild_id, channel_id, author_id, author_is_bot, mention_id, "
+            "content_mention_id, embed_creator_id, created_at, is_video, has_attachment, "
+            "has_image, image_url FROM posts WHERE message_id=?", (p.message_id,))
+        old = await cur.fetchone()
+        await cur.close()
+        # Only the columns the upsert below actually overwrites count as a change.
+        changed = old is None or tuple(old)[5:8] + tuple(old)[9:] != \
+            self._post_params(p)[5:8] + self._post_params(p)[9:]
+        await self.db.execute(
+            "INSERT INTO posts (message_id, guild_id, channel_id, author_id, author_is_bot, "
+            "mention_id, content_mention_id, embed_creator_id, created_at, is_video, "
+            "has_attachment, has_image, image_url) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(message_id) DO UPDATE SET mention_id=excluded.mention_id, "
+            "content_mention_id=excluded.content_mention_id, "
+            "embed_creator_id=excluded.embed_creator_id, is_video=excluded.is_video, "
+            "has_attachment=excluded.has_attachment, has_image=excluded.has_image, "
+            "image_url=excluded.image_url",
+            self._post_params(p))
+        if not replace_reactions:
+            if changed:
+                await self._bump_days([p.message_id])
+            return
+        cur = await self.db.execute(
+            "SELECT emoji_key, count FROM post_reactions WHERE message_id=?", (p.message_id,))
+        before = {r["emoji_key"]: r["count"] for r in await cur.fetchall()}
+        await cur.close()
+        after = {k: rc.count for k, rc in p.reactions.items() if rc.count > 0}
+        await self.db.execute("DELETE FROM post_reactions WHERE message_id=?",
+                              (p.message_id,))
+        await self.db.executemany(
+            "INSERT INTO post_reactions (message_id, emoji_key, emoji_text, count, me) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(p.message_id, k, rc.text, rc.count, 1 if rc.me else 0)
+             for k, rc in p.reactions.items() if rc.count > 0])
+        if not after:
+            # Nobody reacted: the (empty) ledger is trivially complete.
+            await self.db.execute("DELETE FROM reaction_users WHERE message_id=?",
+                                  (p.message_id,))
+            await self.db.execute("UPDATE posts SET voters_synced=1 WHERE message_id=?",
+                                  (p.message_id,))
+        elif after != before:
+            # Counts moved while we were not listening – the ledger for this
+            # post can no longer be trusted until it is re-read.
+            await self.db.execute("UPDATE posts SET voters_synced=0 WHERE message_id=?",
+                                  (p.message_id,))
+        if changed or after != before:
+            await self._bump_days([p.message_id])
+
+    async def upsert_post(self, post: PostRecord, *, replace_reactions: bool = True):
+        """
+        `replace_reactions=False` is for edits: the MESSAGE_UPDATE payload is
+        not guaranteed to carry reactions, so the counters are left alone.
+        """
+        if self.db is None:
+            return
+        async with self.lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                await self._write_post(post, replace_reactions=replace_reactions)
+                await self.db.execute("COMMIT")
+            except Exception:
+                await self.db.execute("ROLLBACK")
+                raise
+
+    async def replace_window(self, channel_id: int, start: datetime,
+                             end_exclusive: datetime, posts: list[PostRecord],
+                             scan: Optional[int] = None):
+        """
+        Authoritative snapshot of [start, end_exclusive) for one channel, as
+        read from history: upserts everything seen and drops indexed posts in
+        that window that no longer exist (deleted while the bot was offline).
+        For an open-ended scan pass the time the scan STARTED as end – posts
+        that arrive via gateway while history is paging must not be pruned.
+        Pass the mark from live_scan as scan: posts whose reactions changed
+        through live events while history was paging keep their counts.
+        """
+        if self.db is None:
+            return
+        lo, hi = snowflake_floor(start), snowflake_floor(end_exclusive)
+        seen = {p.message_id for p in posts}
+        async with self.lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                for p in posts:
+                    # Live events during the scan are newer than its snapshot
+                    fresh = scan is None or self._live_touched.get(p.message_id, 0) <= scan
+                    await self._write_post(p, replace_reactions=fresh)
+                cur = await self.db.execute(
+                    "SELECT message_id FROM posts WHERE channel_id=? "
+                    "AND message_id>=? AND message_id<?", (channel_id, lo, hi))
+                stale = [(r["message_id"],) for r in await cur.fetchall()
+                         if r["message_id"] not in seen]
+                await cur.close()
+                if stale:
+                    await self._bump_days(i for (i,) in stale)
+                    await self.db.executemany("DELETE FROM posts WHERE message_id=?", stale)
+                await self.db.execute("COMMIT")
+            except Exception:
+                await self.db.execute("ROLLBACK")
+                raise
+
+    async def delete_posts(self, message_ids: Iterable[int]):
+        if self.db is None:
+            return
+        ids = [(int(i),) for i in message_ids]
+        if not ids:
+            return
+        async with self.lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                await self._bump_days(i for (i,) in ids)
+                await self.db.executemany("DELETE FROM posts WHERE message_id=?", ids)
+                await self.db.execute("COMMIT")
+            except Exception:
+                await self.db.execute("ROLLBACK")
+                raise
+
+    @contextlib.contextmanager
+    def live_scan(self) -> Iterator[int]:
+        """
+        Bracket a history scan. Yields a sequence mark to pass to
+        replace_window: posts whose reactions changed through live events
+        after the mark keep their stored counts instead of the scan's
+        (possibly stale) snapshot.
+        """
+        self._open_scans += 1
+        try:
+            yield self._live_seq
+        finally:
+            self._open_scans -= 1
+            if not self._open_scans:
+                self._live_touched.clear()
+
+    def _touch_live(self, message_id: int):
+        self._live_seq += 1
+        if self._open_scans:
+            self._live_touched[message_id] = self._live_seq
+
+    async def adjust_reaction(self, message_id: int, emoji: EmojiLike, delta: int, *,
+                              user_id: Optional[int] = None, is_bot: bool = False,
+                              is_me: bool = False, burst: bool = False) -> bool:
+        """
+        Apply one gateway reaction add (+1) / remove (-1) to the counters and,
+        for normal reactions with a known user, to the voter ledger. Only posts
+        already in the store are touched; returns False when not tracked.
+        """
+        if self.db is None:
+            return False
+        key, txt = emoji_key(emoji), emoji_text(emoji)
+        async with self.lock:
+            cur = await self.db.execute(
+                "SELECT 1 FROM posts WHERE message_id=? LIMIT 1", (message_id,))
+            tracked = await cur.fetchone() is not None
+            await cur.close()
+            if not tracked:
+                return False
+            self._touch_live(message_id)
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                await self.db.execute(
+                    "INSERT INTO post_reactions (message_id, emoji_key, emoji_text, count) "
+                    "VALUES (?, ?, ?, MAX(?, 0)) ON CONFLICT(message_id, emoji_key) "
+                    "DO UPDATE SET count=MAX(count + ?, 0)",
+                    (message_id, key, txt, delta, delta))
+                if is_me:
+                    await self.db.execute(
+                        "UPDATE post_reactions SET me=? WHERE message_id=? AND emoji_key=?",
+                        (1 if delta > 0 else 0, message_id, key))
+                await self.db.execute(
+                    "DELETE FROM post_reactions WHERE message_id=? AND emoji_key=? "
+                    "AND count<=0", (message_id, key))
+                if user_id is not None and not burst:
+                    if delta > 0:
+                        await self.db.execute(
+                            "INSERT INTO reaction_users (message_id, emoji_key, user_id, "
+                            "is_bot) VALUES (?, ?, ?, ?) ON CONFLICT DO NOTHING",
+                            (message_id, key, user_id, 1 if is_bot else 0))
+                    else:
+                        await self.db.execute(
+                            "DELETE FROM reaction_users WHERE message_id=? AND emoji_key=? "
+                            "AND user_id=?", (message_id, key, user_id))
+                await self._bump_days([message_id])
+                await self.db.execute("COMMIT")
+            except Exception:
+                await self.db.execute("ROLLBACK")
+                raise
+        return True
+
+    async def clear_reactions(self, message_id: int, emoji: Optional[EmojiLike] = None):
+        self._touch_live(message_id)
+        if self.db is None:
+            return
+        async with self.lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                if emoji is None:
+                    await self.db.execute("DELETE FROM post_reactions WHERE message_id=?",
+                                          (message_id,))
+                    await self.db.execute("DELETE FROM reaction_users WHERE message_id=?",
+                                          (message_id,))
+                else:
+                    key = emoji_key(emoji)
+                    await self.db.execute(
+                        "DELETE FROM post_reactions WHERE message_id=? AND emoji_key=?",
+                        (message_id, key))
+                    await self.db.execute(
+                        "DELETE FROM reaction_users WHERE message_id=? AND emoji_key=?",
+                        (message_id, key))
+                await self._bump_days([message_id])
+                await self.db.execute("COMMIT")
+            except Exception:
+                await self.db.execute("ROLLBACK")
+                raise
+
+    # ------------------------------------------------------------ voter ledger
+    async def posts_pending_voters(self, channel_ids: Iterable[int],
+                                   limit: int = 200) -> list[PostRecord]:
+        """Posts whose ledger still has to be (re)read from the API."""
+        cids = [int(c) for c in channel_ids]
+        if self.db is None or not cids:
+            return []
+        marks = ",".join("?" for _ in cids)
+        async with self.lock:
+            cur = await self.db.execute(
+                f"SELECT * FROM posts WHERE voters_synced=0 AND channel_id IN ({marks}) "
+                f"ORDER BY message_id DESC LIMIT ?", (*cids, limit))
+            rows = await cur.fetchall()
+            await cur.close()
+            posts = [self._record_from_row(r) for r in rows]
+            for p in posts:
+                await self._load_reactions(p)
+        return posts
+
+    async def replace_voters(self, message_id: int,
+                             voters: dict[str, list[tuple[int, bool]]]):
+        """Authoritative ledger for one post: emoji_key → [(user_id, is_bot)]."""
+        if self.db is None:
+            return
+        rows = [(message_id, k, uid, 1 if is_bot else 0)
+                for k, users in voters.items() for uid, is_bot in users]
+        async with self.lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                await self.db.execute("DELETE FROM reaction_users WHERE message_id=?",
+                                      (message_id,))
+                await self.db.executemany(
+                    "INSERT OR IGNORE INTO reaction_users (message_id, emoji_key, user_id, "
+                    "is_bot) VALUES (?, ?, ?, ?)", rows)
+                await self.db.execute("UPDATE posts SET voters_synced=1 WHERE message_id=?",
+                                      (message_id,))
+                await self._bump_days([message_id])
+                await self.db.execute("COMMIT")
+            except Exception:
+                await self.db.execute("ROLLBACK")
+                raise
+
+    async def voter_counts(
+        self,
+        channel_ids: Iterable[int],
+        start: datetime,
+        end_exclusive: datetime,
+        *,
+        author_id: Optional[int] = None,
+        ignore_emoji_keys: Iterable[str] = (),
+        seeded_emoji_keys: Iterable[str] = (),
+    ) -> dict[int, int]:
+        """
+        Clicks per human voter on posts created in [start, end_exclusive).
+        `seeded_emoji_keys` are the emojis the bot pre-reacts with: on those a
+        total count of 1 is only the seed, so such rows are skipped entirely.
+        """
+        cids = [int(c) for c in channel_ids]
+        if self.db is None or not cids:
+            return {}
+        ignore = [str(k) for k in ignore_emoji_keys]
+        seeded = [str(k) for k in seeded_emoji_keys]
+        sql = (
+            "SELECT ru.user_id AS user_id, COUNT(*) AS clicks FROM reaction_users ru "
+            "JOIN posts p ON p.message_id = ru.message_id "
+            "JOIN post_reactions pr ON pr.message_id = ru.message_id "
+            "  AND pr.emoji_key = ru.emoji_key "
+            f"WHERE p.channel_id IN ({','.join('?' for _ in cids)}) "
+            "AND p.message_id>=? AND p.message_id<? AND ru.is_bot=0"
+        )
+        params: list = [*cids, snowflake_floor(start), snowflake_floor(end_exclusive)]
+        if author_id is not None:
+            sql += " AND p.author_id=?"
+            params.append(author_id)
+        if ignore:
+            sql += f" AND ru.emoji_key NOT IN ({','.join('?' for _ in ignore)})"
+            params.extend(ignore)
+        if seeded:
+            sql += (f" AND NOT (ru.emoji_key IN ({','.join('?' for _ in seeded)}) "
+                    "AND pr.count <= 1)")
+            params.extend(seeded)
+        sql += " GROUP BY ru.user_id"
+        async with self.lock:
+            cur = await self.db.execute(sql, tuple(params))
+            rows = await cur.fetchall()
+            await cur.close()
+        return {r["user_id"]: r["clicks"] for r in rows}
+
+    async def voters_for_posts(
+        self, message_ids: Iterable[int],
+    ) -> dict[int, dict[str, list[tuple[int, bool]]]]:
+        """message_id → emoji_key → [(user_id, is_bot)] straight from the ledger."""
+        ids = [int(i) for i in message_ids]
+        out: dict[int, dict[str, list[tuple[int, bool]]]] = {i: {} for i in ids}
+        if self.db is None or not ids:
+            return out
+        async with self.lock:
+            # Chunked: SQLite caps bound parameters per statement.
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                cur = await self.db.execute(
+                    f"SELECT message_id, emoji_key, user_id, is_bot FROM reaction_users "
+                    f"WHERE message_id IN ({','.join('?' for _ in chunk)})", tuple(chunk))
+                for r in await cur.fetchall():
+                    out[r["message_id"]].setdefault(r["emoji_key"], []).append(
+                        (r["user_id"], bool(r["is_bot"])))
+                await cur.close()
+        return out
+
+    async def day_revisions(self, channel_ids: Iterable[int],
+                            days: Iterable[str]) -> dict[str, int]:
+        """'YYYY-MM-DD' (UTC) → newest revision across the channels; days
+        nothing was ever written for are missing (= revision 0)."""
+        cids = [int(c) for c in channel_ids]
+        wanted = list(days)
+        if self.db is None or not cids or not wanted:
+            return {}
+        out: dict[str, int] = {}
+        async with self.lock:
+            for i in range(0, len(wanted), 200):
+                chunk = wanted[i:i + 200]
+                cur = await self.db.execute(
+                    f"SELECT day, MAX(rev) AS rev FROM day_revisions "
+                    f"WHERE channel_id IN ({','.join('?' for _ in cids)}) "
+                    f"AND day IN ({','.join('?' for _ in chunk)}) GROUP BY day",
+                    (*cids, *chunk))
+                out.update({r["day"]: r["rev"] for r in await cur.fetchall()})
+                await cur.close()
+        return out
+
+    # -------------------------------------------------------------- watermarks
+    async def get_watermark(self, channel_id: int) -> Optional[dict]:
+        if self.db is None:
+            return None
+        async with self.lock:
+            cur = await self.db.execute(
+                "SELECT * FROM channel_watermarks WHERE channel_id=? LIMIT 1", (channel_id,))
+            row = await cur.fetchone()
+            await cur.close()
+        return dict(row) if row else None
+
+    async def set_watermark(self, channel_id: int, *,
+                            newest_message_id: Optional[int] = None,
+                            covered_from: Optional[datetime] = None,
+                            scope: Optional[str] = None):
+        """
+        `newest_message_id` only ever moves forward, `covered_from` only ever
+        moves back – a stale caller can never shrink what the store covers.
+        """
+        if self.db is None:
+            return
+        cov = iso_utc(covered_from) if covered_from else None
+        async with self.lock:
+            await self.db.execute(
+                "INSERT INTO channel_watermarks (channel_id, newest_message_id, covered_from, "
+                "scope, updated_at) VALUES (?, ?, ?, ?, ?) ON CONFLICT(channel_id) DO UPDATE SET "
+                "newest_message_id=CASE WHEN excluded.newest_message_id IS NULL "
+                "  THEN newest_message_id "
+                "  ELSE MAX(COALESCE(newest_message_id, 0), excluded.newest_message_id) END, "
+                "covered_from=CASE WHEN excluded.covered_from IS NULL THEN covered_from "
+                "  WHEN covered_from IS NULL THEN excluded.covered_from "
+                "  ELSE MIN(covered_from, excluded.covered_from) END, "
+                "scope=COALESCE(excluded.scope, scope), "
+                "updated_at=excluded.updated_at",
+                (channel_id, newest_message_id, cov, scope,
+                 iso_utc(datetime.now(timezone.utc))))
+
+    async def reset_coverage(self, channel_id: int):
+        """Forget how far back a channel is covered (its tracked scope changed)."""
+        if self.db is None:
+            return
+        async with self.lock:
+            await self.db.execute(
+                "UPDATE channel_watermarks SET covered_from=NULL, scope=NULL, updated_at=? "
+                "WHERE channel_id=?", (iso_utc(datetime.now(timezone.utc)), channel_id))
+
+    # ------------------------------------------------------------------- reads
+    @staticmethod
+    def _record_from_row(r) -> PostRecord:
+        return PostRecord(
+            message_id=r["message_id"], guild_id=r["guild_id"],
+            channel_id=r["channel_id"], author_id=r["author_id"],
+            author_is_bot=bool(r["author_is_bot"]),
+            mention_id=r["mention_id"],
+            content_mention_id=r["content_mention_id"],
+            embed_creator_id=r["embed_creator_id"],
+            created_at=discord.utils.snowflake_time(r["message_id"]),
+            is_video=bool(r["is_video"]),
+            has_attachment=bool(r["has_attachment"]),
+            has_image=bool(r["has_image"]),
+            image_url=r["image_url"])
+
+    async def _load_reactions(self, p: PostRecord):
+        """Caller holds the lock."""
+        assert self.db is not None
+        cur = await self.db.execute(
+            "SELECT emoji_key, emoji_text, count, me FROM post_reactions "
+            "WHERE message_id=? ORDER BY rowid", (p.message_id,))
+        for r in await cur.fetchall():
+            p.reactions[r["emoji_key"]] = EmojiCount(r["emoji_text"], r["count"], bool(r["me"]))
+        await cur.close()
+
+    async def posts_in_window(
+        self,
+        channel_ids: Iterable[int],
+        start: datetime,
+        end_exclusive: datetime,
+        *,
+        author_id: Optional[int] = None,
+    ) -> dict[int, list[PostRecord]]:
+        """Stored posts created in [start, end_exclusive), grouped per channel."""
+        cids = [int(c) for c in channel_ids]
+        out: dict[int, list[PostRecord]] = {cid: [] for cid in cids}
+        if self.db is None or not cids:
+            return out
+        marks = ",".join("?" for _ in cids)
+        params: list = [*cids, snowflake_floor(start), snowflake_floor(end_exclusive)]
+        author_sql = ""
+        if author_id is not None:
+            author_sql = " AND p.author_id=?"
+            params.append(author_id)
+        async with self.lock:
+            cur = await self.db.execute(
+                f"SELECT * FROM posts p WHERE p.channel_id IN ({marks}) "
+                f"AND p.message_id>=? AND p.message_id<?{author_sql} ORDER BY p.message_id",
+                tuple(params))
+            post_rows = await cur.fetchall()
+            await cur.close()
+            by_id: dict[int, PostRecord] = {}
+            for r in post_rows:
+                p = self._record_from_row(r)
+                by_id[p.message_id] = p
+                out.setdefault(p.channel_id, []).append(p)
+            if by_id:
+                cur = await self.db.execute(
+                    f"SELECT pr.message_id, pr.emoji_key, pr.emoji_text, pr.count, pr.me "
+                    f"FROM post_reactions pr JOIN posts p ON p.message_id = pr.message_id "
+                    f"WHERE p.channel_id IN ({marks}) AND p.message_id>=? AND p.message_id<?"
+                    f"{author_sql} ORDER BY pr.rowid",
+                    tuple(params))
+                for r in await cur.fetchall():
+                    p = by_id.get(r["message_id"])
+                    if p is not None:
+                        p.reactions[r["emoji_key"]] = EmojiCount(
+                            r["emoji_text"], r["count"], bool(r["me"]))
+                await cur.close()
+        return out
+
+
+# =============================================================================
+# COG — gateway ingestion, sync and backfill
+# =============================================================================
+class ReactionStoreCog(commands.Cog):
+    """
+    Owns every listener that feeds the store. Leaderboard cogs call `track()`
+    once (usually in cog_load) and `load_posts()` per command; they never
+    read channel history themselves.
+    """
+
+    def __init__(self, bot: commands.Bot, store: ReactionStore):
+        self.bot = bot
+        self.store = store
+        # channel_id → authors to ingest (None = any author)
+        self._scopes: dict[int, Optional[frozenset[int]]] = {}
+        self._voter_channels: set[int] = set()
+        self._sync_tasks: dict[int, asyncio.Task] = {}
+        self._cover_locks: dict[int, asyncio.Lock] = {}
+        self._voter_lock = asyncio.Lock()
+        self._started = asyncio.Event()
+        self._startup_task: Optional[asyncio.Task] = None
+        self._scan_slots = asyncio.Semaphore(SCAN_CONCURRENCY)
+        self._pages = TokenBucket(SCAN_PAGES_PER_SEC, SCAN_PAGE_BURST)
+
+    # =========================================================== lifecycle
+    async def cog_load(self):
+        if self._startup_task is None or self._startup_task.done():
+            self._startup_task = asyncio.create_task(
+                self._startup(), name="reaction_store_startup")
+
+    async def cog_unload(self):
+        tasks = [t for t in (self._startup_task, *self._sync_tasks.values())
+                 if t is not None and not t.done()]
+        for t in tasks:
+            t.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._startup_task = None
+        self._sync_tasks.clear()
+
+    async def _startup(self):
+        await self.bot.wait_until_ready()
+        for cid in list(self._scopes):
+            self._schedule_sync(cid)
+        self._started.set()
+        try:
+            await asyncio.gather(*self._sync_tasks.values(), return_exceptions=True)
+            await self.reconcile_voters(self._voter_channels)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("ReactionStore startup reconcile failed")
+
+    # ========================================================== registration
+    def track(self, channel_ids: Iterable[int], *,
+              author_ids: Optional[Iterable[int]] = None, voters: bool = False):
+        """
+        Register interest in posts of `author_ids` (None = anyone) in the given
+        channels/threads. Scopes of several cogs on one channel are merged.
+        """
+        authors = frozenset(int(a) for a in author_ids) if author_ids is not None else None
+        for cid in (int(c) for c in channel_ids):
+            if voters:
+                self._voter_channels.add(cid)
+            if cid in self._scopes:
+                old = self._scopes[cid]
+                if old is None or (authors is not None and authors <= old):
+                    continue
+                merged = None if authors is None else authors | old
+            else:
+                merged = authors
+            self._scopes[cid] = merged
+            if self._started.is_set():
+                self._schedule_sync(cid)
+
+    def is_tracked(self, channel_id: Optional[int]) -> bool:
+        return channel_id in self._scopes
+
+    def _wants(self, channel_id: Optional[int], author_id: int) -> bool:
+        if channel_id not in self._scopes:
+            return False
+        authors = self._scopes[channel_id]
+        return authors is None or author_id in authors
+
+    def _scope_tag(self, channel_id: int) -> str:
+        authors = self._scopes.get(channel_id)
+        who = "*" if authors is None else ",".join(str(a) for a in sorted(authors))
+        return f"{SCOPE_VERSION}|{who}"
+
+    # ================================================================= sync
+    async def _history_channel(self, channel_id: int):
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            try:
+                channel = await self.bot.fetch_channel(channel_id)
+            except Exception:
+                logger.exception("Could not load channel %s.", channel_id)
+                return None
+        return channel if isinstance(channel, (discord.TextChannel, discord.Thread)) else None
+
+    async def _index_history(self, channel, start: datetime,
+                             end_exclusive: Optional[datetime] = None,
+                             progress: Optional[ScanProgress] = None) -> int:
+        """Read [start, end_exclusive) from history into the store; returns the
+        newest message id seen (any author) or 0. At most SCAN_CONCURRENCY of
+        these run at once, and every history page costs a token."""
+        records: list[PostRecord] = []
+        newest_id = 0
+        async with self._scan_slots:
+            with self.store.live_scan() as scan:
+                prune_until = end_exclusive or datetime.now(timezone.utc)
+                await self._pages.acquire()
+                seen = 0
+                async for msg in channel.history(
+                    after=start - timedelta(seconds=1), before=end_exclusive, limit=None
+                ):
+                    seen += 1
+                    if seen % HISTORY_PAGE_SIZE == 0:
+                        # The iterator fetches the next page right after this one.
+                        await self._pages.acquire()
+                        if progress is not None:
+                            progress.messages += HISTORY_PAGE_SIZE
+                            await progress.report()
+                    newest_id = max(newest_id, msg.id)
+                    if msg.created_at < start or not self._wants(channel.id, msg.author.id):
+                        continue
+                    records.append(record_from_message(msg))
+                await self.store.replace_window(channel.id, start, prune_until, records, scan=scan)
+        if progress is not None:
+            progress.messages += seen % HISTORY_PAGE_SIZE
+        return newest_id
+
+    def _schedule_sync(self, channel_id: int):
+        prev = self._sync_tasks.get(channel_id)
+        self._sync_tasks[channel_id] = asyncio.create_task(
+            self._sync_channel(channel_id, after=prev),
+            name=f"reaction_store_sync_{channel_id}")
+
+    async def _sync_channel(self, channel_id: int, *, after: Optional[asyncio.Task] = None):
+        """Session catch-up: re-read the reconcile window plus any gap since
+        the watermark. Runs once per channel per session (and per scope change)."""
+        if after is not None:
+            await asyncio.gather(after, return_exceptions=True)
+        channel = await self._history_channel(channel_id)
+        if channel is None:
+            return
+        scope = self._scope_tag(channel_id)
+        mark = await self.store.get_watermark(channel_id)
+        if mark and mark.get("scope") != scope:
+            # Indexed for other authors / an older classification: everything
+            # older than this sync has to be re-read on demand.
+            await self.store.reset_coverage(channel_id)
+        start = datetime.now(timezone.utc) - timedelta(days=RECONCILE_DAYS)
+        if mark and mark.get("newest_message_id"):
+            # Offline (or untracked) longer than the reconcile window: close the gap too.
+            start = min(start, discord.utils.snowflake_time(mark["newest_message_id"]))
+        start = max(start, discord.utils.snowflake_time(channel.id))
+        try:
+            newest_id = await self._index_history(channel, start)
+        except Exception:
+            logger.exception("Store sync failed for #%s (%s)", channel.name, channel.id)
+            return
+        await self.store.set_watermark(
+            channel_id, newest_message_id=newest_id or None, covered_from=start, scope=scope)
+        logger.info("Store synced #%s from %s", channel.name, start.isoformat())
+
+    async def _needs_backfill(self, channel_id: int, start: datetime) -> bool:
+        mark = await self.store.get_watermark(channel_id)
+        return not (mark and mark.get("covered_from")
+                    and datetime.fromisoformat(mark["covered_from"]) <= start)
+
+    async def _ensure_covered(self, channel_id: int, start: datetime,
+                              progress: Optional[ScanProgress] = None):
+        """Lazily backfill older ranges the first time they are requested."""
+        lock = self._cover_locks.setdefault(channel_id, asyncio.Lock())
+        try:
+            async with lock:
+                mark = await self.store.get_watermark(channel_id)
+                covered_from = (
+                    datetime.fromisoformat(mark["covered_from"])
+                    if mark and mark.get("covered_from") else None
+                )
+                if covered_from is not None and covered_from <= start:
+                    return
+                channel = await self._history_channel(channel_id)
+                if channel is None:
+                    return
+                try:
+                    await self._index_history(channel, start, covered_from, progress)
+                except Exception:
+                    logger.exception("Store backfill failed for #%s (%s)",
+                                     channel.name, channel.id)
+                    return
+                await self.store.set_watermark(channel_id, covered_from=start)
+        finally:
+            if progress is not None:
+                progress.channels_done += 1
+                await progress.report()
+
+    async def reconcile_voters(self, channel_ids: Iterable[int]):
+        """Read the voter ledger from the API for posts that never had it read,
+        or whose counts drifted while the bot was offline. After that the raw
+        reaction events keep it current and this finds nothing to do."""
+        cids = [int(c) for c in channel_ids]
+        if not cids:
+            return
+        async with self._voter_lock:
+            sem = asyncio.Semaphore(VOTER_FETCH_CONCURRENCY)
+
+            async def sync_one(post: PostRecord) -> bool:
+                async with sem:
+                    channel = self.bot.get_channel(post.channel_id)
+                    voters = await fetch_post_voters(channel, post)
+                    if voters is None:
+                        return False
+                    await self.store.replace_voters(post.id, voters)
+                    return True
+
+            total = 0
+            while True:
+                pending = await self.store.posts_pending_voters(cids)
+                if not pending:
+                    break
+                done = await asyncio.gather(*(sync_one(p) for p in pending))
+                total += sum(done)
+                if not any(done):
+                    logger.warning("Voter ledger: %s post(s) could not be read", len(pending))
+                    break
+            if total:
+                logger.info("Voter ledger: backfilled %s post(s)", total)
+
+    async def load_posts(
+        self,
+        channel_ids: Iterable[int],
+        start: datetime,
+        end_exclusive: datetime,
+        *,
+        author_id: Optional[int] = None,
+        voters: bool = False,
+        progress: Optional[Callable[[ScanProgress], Awaitable[None]]] = None,
+    ) -> dict[int, list[PostRecord]]:
+        """
+        Posts in [start, end_exclusive), grouped per channel. Untracked
+        channels are tracked on the fly (for `author_id`, or anyone); the call
+        waits for their session sync, backfills older ranges once and, with
+        `voters=True`, completes the voter ledger before answering.
+        `progress` is only called when a real history scan is needed.
+        """
+        cids = [int(c) for c in channel_ids]
+        await self.prepare(cids, start, author_id=author_id, voters=voters,
+                           progress=progress)
+        return await self.store.posts_in_window(cids, start, end_exclusive,
+                                                author_id=author_id)
+
+    async def prepare(
+        self,
+        channel_ids: Iterable[int],
+        start: datetime,
+        *,
+        author_id: Optional[int] = None,
+        voters: bool = False,
+        progress: Optional[Callable[[ScanProgress], Awaitable[None]]] = None,
+    ):
+        """Everything load_posts() does before querying – for callers that
+        read the store (or aggregates derived from it) themselves."""
+        cids = [int(c) for c in channel_ids]
+        self.track([c for c in cids if not self.is_tracked(c)],
+                   author_ids=[author_id] if author_id is not None else None)
+        if voters:
+            self._voter_channels.update(cids)
+        await self._started.wait()
+        pending = [self._sync_tasks[c] for c in cids if c in self._sync_tasks]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        # Channels are backfilled in parallel; _index_history caps concurrency
+        # and request rate, so one slow channel no longer blocks the others.
+        scan = [c for c in cids if await self._needs_backfill(c, start)]
+        tracker = ScanProgress(channels_total=len(scan), callback=progress) if scan else None
+        await asyncio.gather(*(self._ensure_covered(c, start, tracker) for c in scan))
+        if voters:
+            await self.reconcile_voters(cids)
+
+    # ======================================================= gateway events
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if not self._wants(message.channel.id, message.author.id):
+            return
+        try:
+            await self.store.upsert_post(record_from_message(message))
+            await self.store.set_watermark(message.channel.id, newest_message_id=message.id)
+        except Exception:
+            logger.exception("Store insert failed (msg=%s)", message.id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        msg = payload.message
+        if msg is None or not self._wants(payload.channel_id, msg.author.id):
+            return
+        try:
+            await self.store.upsert_post(record_from_message(msg), replace_reactions=False)
+        except Exception:
+            logger.exception("Store update failed (msg=%s)", payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if self.is_tracked(payload.channel_id):
+            await self.store.delete_posts([payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if self.is_tracked(payload.channel_id):
+            await self.store.delete_posts(payload.message_ids)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        if not self.is_tracked(payload.channel_id):
+            return
+        user = payload.member or self.bot.get_user(payload.user_id)
+        await self.store.adjust_reaction(
+            payload.message_id, payload.emoji, +1,
+            user_id=payload.user_id, is_bot=bool(user and user.bot),
+            is_me=bool(self.bot.user and payload.user_id == self.bot.user.id),
+            burst=payload.burst,
+        )
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        if not self.is_tracked(payload.channel_id):
+            return
+        await self.store.adjust_reaction(
+            payload.message_id, payload.emoji, -1,
+            user_id=payload.user_id,
+            is_me=bool(self.bot.user and payload.user_id == self.bot.user.id),
+            burst=payload.burst,
+        )
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear(self, payload: discord.RawReactionClearEvent):
+        if self.is_tracked(payload.channel_id):
+            await self.store.clear_reactions(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear_emoji(self, payload: discord.RawReactionClearEmojiEvent):
+        if self.is_tracked(payload.channel_id):
+            await self.store.clear_reactions(payload.message_id, payload.emoji)
+
+
+# =============================================================================
+# EXTENSION ENTRY POINTS
+# =============================================================================
+_store: Optional[ReactionStore] = None
+
+
+async def ensure_loaded(bot: commands.Bot) -> ReactionStoreCog:
+    """For leaderboard setup(): load this extension once, return its cog."""
+    if __name__ not in bot.extensions:
+        await bot.load_extension(__name__)
+    # No isinstance(): load_extension() executes a fresh module object, so the
+    # cog's class is not the one callers imported.
+    cog = bot.get_cog("ReactionStoreCog")
+    if cog is None:
+        raise RuntimeError("reaction_store extension is loaded but its cog is missing")
+    return cog
+
+
+async def setup(bot: commands.Bot):
+    global _store
+    store = ReactionStore()
+    await store.start()
+    try:
+        await bot.add_cog(ReactionStoreCog(bot, store))
+    except Exception:
+        await store.close()  # never leak an open DB connection
+        raise
+    _store = store
+
+
+async def teardown(bot: commands.Bot):
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
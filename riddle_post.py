@@ -11,6 +11,8 @@ from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 
+import http_client
+
 # =========================
 # Setup / Config
 # =========================
@@ -406,13 +408,14 @@ class VoteButtons(discord.ui.View):
 # Cog
 # =========================
 class RiddleCog(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, http: http_client.HttpClientCog):
         self.bot = bot
+        self.http = http
         self.session: Optional[aiohttp.ClientSession] = None
         self._vote_locks: set[int] = set()
 
     async def cog_load(self):
-        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=20))
+        self.session = self.http.session(aiohttp.ClientTimeout(total=20))
         self.bot.add_view(SubmitButtonView(self))
         self.bot.add_view(VoteButtons(self))
         log.info("RiddleCog loaded with persistent views.")
@@ -771,5 +774,6 @@ async def on_riddle_command_error(interaction: discord.Interaction, error: app_c
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(RiddleCog(bot))
+    http = await http_client.ensure_loaded(bot)
+    await bot.add_cog(RiddleCog(bot, http))
     bot.tree.on_error = on_riddle_command_error
\ No newline at end of file
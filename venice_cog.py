@@ -1,7 +1,6 @@
 # venice_cog.py
 import asyncio
 import contextlib
-import io
 import logging
 import os
 import random
@@ -25,20 +24,25 @@ try:
 except Exception:
     pytesseract = None
 
+import http_client
 from venice_shared import (
     SERVER_ANIM_ICON,
     AnimateEphemeralView,
+    ImageHandle,
     OwnerLockedView,
     add_rating_reactions,
     build_generation_success_text,
     build_progress_embed,
-    bytes_to_b64,
     codeblock_safe,
+    discord_upload_targets,
     eta_text,
     extract_image_from_response,
+    generation_cache,
     get_image_limit_for_member,
     get_member_tier,
     get_quota_store,
+    latency_key,
+    latency_model,
     looks_like_image,
     refresh_starter_message,
     register_starter_reposter,
@@ -50,6 +54,7 @@ from venice_shared import (
     send_image_with_compression,
     send_resolution_lock_message,
     trim,
+    venice_scheduler,
 )
 
 load_dotenv()
@@ -210,15 +215,12 @@ def _contains_filter_keywords(text: str) -> bool:
     return sum(1 for k in VENICE_FILTER_OCR_KEYWORDS if k in t) >= 2
 
 
-def _is_venice_filter_placeholder(image_bytes: bytes) -> bool:
-    if not image_bytes or Image is None:
-        return False
+def _is_venice_filter_placeholder(img: "Image.Image") -> bool:
+    """Runs in the image pool on the already decoded image (ImageHandle.prepare)."""
     try:
-        img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        gray = img.convert("L")
     except Exception:
         return False
-
-    gray = img.convert("L")
     w, h = gray.size
 
     if pytesseract is not None:
@@ -374,7 +376,13 @@ def build_resolution_hint(model_id: str) -> str:
     return f"Native: {', '.join(ordered)} • 2K/4K may use upscale"
 
 
-def estimate_generation_seconds(
+def generation_latency_key(
+    model_id: str, generation_resolution: Optional[str], steps: Optional[int] = None
+) -> str:
+    return latency_key("image", model_id, generation_resolution or "1K", steps)
+
+
+def _static_generation_seconds(
     model_id: str, steps: int, cfg_scale: float, prompt_len: int, generation_resolution: str
 ) -> float:
     cfg = MODEL_CONFIG[model_id]
@@ -388,19 +396,53 @@ def estimate_generation_seconds(
     return max(6.0, min(base * model_f * steps_f * prompt_f * cfg_f * res_f, 420.0))
 
 
+def estimate_generation_seconds(
+    model_id: str, steps: int, cfg_scale: float, prompt_len: int, generation_resolution: str
+) -> float:
+    """Learned average for this model/resolution/steps, else the static heuristic."""
+    prior = _static_generation_seconds(model_id, steps, cfg_scale, prompt_len, generation_resolution)
+    return latency_model.estimate(generation_latency_key(model_id, generation_resolution, steps), prior)
+
+
+def upscale_passes(scale: Optional[int], target_resolution: str) -> list[tuple[int, str]]:
+    """(scale, output resolution) per provider call; 4x runs as two 2x passes."""
+    if scale == 4:
+        return [(2, "2K"), (2, "4K")]
+    if scale == 2:
+        return [(2, target_resolution)]
+    return []
+
+
+def upscale_latency_key(scale: int, output_resolution: str) -> str:
+    return latency_key("upscale", f"{UPSCALE_MODEL}-{scale}x", output_resolution)
+
+
 def estimate_upscale_seconds(scale: Optional[int], target_resolution: str) -> float:
-    if scale not in (2, 4):
+    passes = upscale_passes(scale, target_resolution)
+    if not passes:
         return 0.0
     base = UPSCALE_BASE_SECONDS.get(scale, 10.0)
-    return max(4.0, min(base * UPSCALE_TARGET_FACTOR.get(target_resolution, 1.0), 180.0))
+    prior = max(4.0, min(base * UPSCALE_TARGET_FACTOR.get(target_resolution, 1.0), 180.0))
+    return sum(
+        latency_model.estimate(upscale_latency_key(s, out), prior / len(passes))
+        for s, out in passes
+    )
 
 
-def model_api_timeout(model_id: str, generation_resolution: Optional[str]) -> float:
-    """Per-model, per-resolution request timeout with a hard cap."""
+def model_api_timeout(
+    model_id: str, generation_resolution: Optional[str], steps: Optional[int] = None
+) -> float:
+    """
+    Per-model, per-resolution request timeout with a hard cap: the learned
+    p99 once enough renders were recorded, else the configured base.
+    """
     cfg = MODEL_CONFIG.get(model_id, {})
     base = float(cfg.get("api_timeout", DEFAULT_API_TIMEOUT))
     mult = RES_TIMEOUT_MULT.get(generation_resolution or "1K", 1.0)
-    return max(60.0, min(base * mult, MAX_API_TIMEOUT))
+    return latency_model.timeout(
+        generation_latency_key(model_id, generation_resolution, steps),
+        base * mult, 60.0, MAX_API_TIMEOUT,
+    )
 
 
 def build_model_options(channel_id: int, include_easy: bool = True) -> list[discord.SelectOption]:
@@ -438,6 +480,7 @@ def _image_progress_embed(
     eta_sec: float,
     stage: str,
     quota: dict[str, int],
+    queue_position: Optional[int] = None,
 ) -> discord.Embed:
     return build_progress_embed(
         title="🖼️ IMAGE RENDER",
@@ -449,6 +492,7 @@ def _image_progress_embed(
         quota_name="Quota (24h, shared)",
         quota_state=quota,
         footer=f"{model_label} • {ASPECT_LABELS.get(ratio, ratio)} • {resolution}",
+        queue_position=queue_position,
     )
 
 
@@ -482,6 +526,7 @@ async def venice_generate(
     headers = {"Authorization": f"Bearer {VENICE_API_KEY}"}
     req_id = os.urandom(4).hex()
     model = payload.get("model")
+    lat_key = generation_latency_key(model, payload.get("resolution"), payload.get("steps"))
 
     # sock_read close to total: blocking renders send no bytes for a long time.
     timeout = aiohttp.ClientTimeout(
@@ -512,6 +557,7 @@ async def venice_generate(
                 if resp.status == 200:
                     img = await extract_image_from_response(resp)
                     if img and looks_like_image(img):
+                        latency_model.record(lat_key, time.monotonic() - started)
                         return img, None
                     last_error = "Provider returned an empty or invalid image."
                     if attempt < retries:
@@ -523,7 +569,10 @@ async def venice_generate(
                 with contextlib.suppress(Exception):
                     body = await resp.text()
 
-                if resp.status in (429, 500, 502, 503, 504) and attempt < retries:
+                if resp.status == 429 and attempt < retries:
+                    await asyncio.sleep(venice_scheduler.rate_limited(model, resp.headers, body))
+                    continue
+                if resp.status in (500, 502, 503, 504) and attempt < retries:
                     logger.warning(
                         "[IMG %s] retryable %s: %s", req_id, resp.status, body[:200]
                     )
@@ -539,6 +588,8 @@ async def venice_generate(
                 "[IMG %s] TIMEOUT model=%s after %.0fs (limit %.0fs)",
                 req_id, model, elapsed, timeout_total,
             )
+            # Censored at the limit: the next timeout for this key grows.
+            latency_model.record(lat_key, elapsed)
             return None, (
                 f"The model did not respond within {int(timeout_total)}s.\n"
                 f"This model is slow at this resolution - try **1K** "
@@ -559,15 +610,16 @@ async def venice_generate(
 
 async def _upscale_once(
     session: aiohttp.ClientSession,
-    image_bytes: bytes,
+    image: ImageHandle,
     scale: int,
+    output_resolution: str,
     retries: int = 2,
-) -> Optional[bytes]:
+) -> Optional[ImageHandle]:
     headers = {"Authorization": f"Bearer {VENICE_API_KEY}"}
-    if not looks_like_image(image_bytes):
+    if not looks_like_image(image.data):
         return None
 
-    b64 = bytes_to_b64(image_bytes)
+    b64 = image.b64
     payloads = [
         {"image": b64, "scale": scale},
         {"image": f"data:image/png;base64,{b64}", "scale": scale},
@@ -580,6 +632,7 @@ async def _upscale_once(
 
     for attempt in range(retries + 1):
         for payload in payloads:
+            started = time.monotonic()
             try:
                 async with session.post(
                     VENICE_UPSCALE_URL, headers=headers, json=payload, timeout=timeout
@@ -587,7 +640,18 @@ async def _upscale_once(
                     if resp.status == 200:
                         out = await extract_image_from_response(resp)
                         if out and looks_like_image(out):
-                            return out
+                            latency_model.record(
+                                upscale_latency_key(scale, output_resolution),
+                                time.monotonic() - started,
+                            )
+                            return ImageHandle(out)
+                    elif resp.status == 429:
+                        body = ""
+                        with contextlib.suppress(Exception):
+                            body = await resp.text()
+                        await asyncio.sleep(
+                            venice_scheduler.rate_limited(UPSCALE_MODEL, resp.headers, body)
+                        )
                     else:
                         with contextlib.suppress(Exception):
                             logger.warning(
@@ -603,15 +667,23 @@ async def _upscale_once(
     return None
 
 
+# Scheduler key for the upscale endpoint (it has no model id of its own).
+UPSCALE_MODEL = "upscale"
+
+
 async def venice_upscale(
-    session: aiohttp.ClientSession, image_bytes: bytes, scale: int, retries: int = 2
-) -> Optional[bytes]:
-    if scale == 4:
-        first = await _upscale_once(session, image_bytes, 2, retries=retries)
-        if not first:
+    session: aiohttp.ClientSession,
+    image: ImageHandle,
+    scale: int,
+    target_resolution: str,
+    retries: int = 2,
+) -> Optional[ImageHandle]:
+    out: Optional[ImageHandle] = image
+    for pass_scale, output_resolution in upscale_passes(scale, target_resolution):
+        out = await _upscale_once(session, out, pass_scale, output_resolution, retries=retries)
+        if not out:
             return None
-        return await _upscale_once(session, first, 2, retries=retries)
-    return await _upscale_once(session, image_bytes, scale, retries=retries)
+    return out
 
 
 # =================================================
@@ -1001,6 +1073,9 @@ class ResolutionSelectView(OwnerLockedView):
         progress_msg: Optional[discord.Message] = None
         quota_success = False
         token_quota: Optional[dict[str, int]] = None
+        payload: Optional[dict[str, Any]] = None
+        # Keep an undelivered result cached only while posting it failed.
+        keep_cached = False
 
         async def drop_progress():
             """Delete the progress message immediately (idempotent)."""
@@ -1038,7 +1113,7 @@ class ResolutionSelectView(OwnerLockedView):
             est_gen = estimate_generation_seconds(
                 model_id, steps, cfg_val, len(prompt_text or ""), effective_gen_res
             )
-            api_timeout = model_api_timeout(model_id, effective_gen_res)
+            api_timeout = model_api_timeout(model_id, effective_gen_res, steps)
             gen_cap = 82 if upscale_factor in (2, 4) else 97
 
             # Ephemeral progress message: visible only to the triggering user.
@@ -1050,18 +1125,29 @@ class ResolutionSelectView(OwnerLockedView):
                 ),
             )
 
-            gen_task = asyncio.create_task(
-                venice_generate(self.session, payload, timeout_total=api_timeout)
-            )
+            image_bytes, gen_error = await generation_cache.get(payload), None
+            if image_bytes is None:
+                gen_ticket = venice_scheduler.ticket(model_id, interaction.user)
 
-            def gen_embed(percent: int, eta: float) -> discord.Embed:
-                return _image_progress_embed(
-                    interaction.user, prompt_text, get_model_label(model_id),
-                    ratio, resolution, percent, eta, "Generating image...", state,
-                )
+                async def generate():
+                    async with gen_ticket:
+                        return await venice_generate(self.session, payload, timeout_total=api_timeout)
+
+                gen_task = asyncio.create_task(generate())
 
-            await run_with_progress(gen_task, progress_msg, est_gen, 0, gen_cap, gen_embed, 6.0)
-            image_bytes, gen_error = await gen_task
+                def gen_embed(percent: int, eta: float) -> discord.Embed:
+                    return _image_progress_embed(
+                        interaction.user, prompt_text, get_model_label(model_id),
+                        ratio, resolution, percent, eta, "Generating image...", state,
+                        queue_position=gen_ticket.position,
+                    )
+
+                await run_with_progress(
+                    gen_task, progress_msg, est_gen, 0, gen_cap, gen_embed, 6.0, ticket=gen_ticket
+                )
+                image_bytes, gen_error = await gen_task
+                if image_bytes:
+                    await generation_cache.put(payload, image_bytes)
 
             if not image_bytes:
                 await drop_progress()
@@ -1071,24 +1157,32 @@ class ResolutionSelectView(OwnerLockedView):
                 )
                 return
 
+            image = ImageHandle(image_bytes)
             upscaled_success = False
             if upscale_factor in (2, 4):
                 est_up = estimate_upscale_seconds(upscale_factor, resolution)
-                up_task = asyncio.create_task(
-                    venice_upscale(self.session, image_bytes, upscale_factor)
-                )
+                up_ticket = venice_scheduler.ticket(UPSCALE_MODEL, interaction.user)
+
+                async def upscale():
+                    async with up_ticket:
+                        return await venice_upscale(self.session, image, upscale_factor, resolution)
+
+                up_task = asyncio.create_task(upscale())
 
                 def up_embed(percent: int, eta: float) -> discord.Embed:
                     return _image_progress_embed(
                         interaction.user, prompt_text, get_model_label(model_id),
                         ratio, resolution, percent, eta,
                         f"Upscaling {upscale_factor}x...", state,
+                        queue_position=up_ticket.position,
                     )
 
-                await run_with_progress(up_task, progress_msg, est_up, gen_cap, 99, up_embed, 4.0)
+                await run_with_progress(
+                    up_task, progress_msg, est_up, gen_cap, 99, up_embed, 4.0, ticket=up_ticket
+                )
                 upscaled = await up_task
                 if upscaled:
-                    image_bytes = upscaled
+                    image = upscaled
                     upscaled_success = True
                 else:
                     logger.warning(
@@ -1096,7 +1190,9 @@ class ResolutionSelectView(OwnerLockedView):
                         upscale_factor, model_id,
                     )
 
-            if _is_venice_filter_placeholder(image_bytes):
+            # One pool job: decode, placeholder check and the first upload fit.
+            upload_targets = discord_upload_targets(interaction)
+            if await image.prepare(upload_targets[:1], inspect=_is_venice_filter_placeholder):
                 await drop_progress()
                 await send_ephemeral(interaction, AUTO_FILTER_EPHEMERAL_TEXT)
                 return
@@ -1151,10 +1247,11 @@ class ResolutionSelectView(OwnerLockedView):
                 icon_url=guild_icon,
             )
 
+            keep_cached = True
             posted = await send_image_with_compression(
                 channel=interaction.channel,
                 interaction=interaction,
-                image_bytes=image_bytes,
+                image_bytes=image,
                 embed=embed,
                 content=f"{SERVER_ANIM_ICON} 🖼️ **Image** • {interaction.user.mention}",
                 filename_prompt=prompt_text,
@@ -1165,6 +1262,7 @@ class ResolutionSelectView(OwnerLockedView):
                 return
 
             quota_success = True
+            keep_cached = False
             await add_rating_reactions(posted)
 
             quota_now = await image_quota.peek(
@@ -1193,6 +1291,9 @@ class ResolutionSelectView(OwnerLockedView):
             if not quota_success:
                 await image_quota.rollback(token_quota)
 
+            if payload is not None and not keep_cached:
+                await generation_cache.release(payload)
+
             with contextlib.suppress(Exception):
                 await repost_starter_for_channel(interaction.channel)
 
@@ -1203,8 +1304,9 @@ class ResolutionSelectView(OwnerLockedView):
 # COG
 # =================================================
 class VeniceImageCog(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, http: http_client.HttpClientCog):
         self.bot = bot
+        self.http = http
         self.session: Optional[aiohttp.ClientSession] = None
         self._ready_bootstrap_done = False
         self._ready_lock = asyncio.Lock()
@@ -1212,10 +1314,7 @@ class VeniceImageCog(commands.Cog):
     async def _ensure_session(self):
         if self.session and not self.session.closed:
             return
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=MAX_API_TIMEOUT + 60),
-            connector=aiohttp.TCPConnector(limit=60, ttl_dns_cache=300),
-        )
+        self.session = self.http.session(aiohttp.ClientTimeout(total=MAX_API_TIMEOUT + 60))
 
     async def cog_load(self):
         await self._ensure_session()
@@ -1224,6 +1323,8 @@ class VeniceImageCog(commands.Cog):
             register_starter_reposter(channel_id, self.ensure_starter_message)
 
     def cog_unload(self):
+        latency_model.flush()
+        image_quota.close()
         if self.session and not self.session.closed:
             asyncio.create_task(self.session.close())
 
@@ -1260,13 +1361,14 @@ class VeniceImageCog(commands.Cog):
     @commands.command(name="venice_timeouts")
     @commands.has_permissions(administrator=True)
     async def venice_timeouts(self, ctx: commands.Context):
-        """Show configured timeouts per model and resolution."""
+        """Show current (learned or configured) timeouts per model and resolution."""
         lines = []
         for mid in get_active_model_ids():
             t1 = model_api_timeout(mid, "1K")
             t2 = model_api_timeout(mid, "2K")
             t4 = model_api_timeout(mid, "4K")
-            lines.append(f"`{mid}` -> 1K:{t1:.0f}s 2K:{t2:.0f}s 4K:{t4:.0f}s")
+            learned = latency_model.describe(generation_latency_key(mid, "1K"))
+            lines.append(f"`{mid}` -> 1K:{t1:.0f}s 2K:{t2:.0f}s 4K:{t4:.0f}s • 1K {learned}")
 
         chunk = ""
         for line in lines:
@@ -1291,4 +1393,5 @@ class VeniceImageCog(commands.Cog):
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(VeniceImageCog(bot))
\ No newline at end of file
+    http = await http_client.ensure_loaded(bot)
+    await bot.add_cog(VeniceImageCog(bot, http))
\ No newline at end of file
@@ -6,6 +6,8 @@ import aiohttp
 import discord
 from discord.ext import commands
 
+import http_client
+
 # We will access VeniceGenerationCog at runtime via bot.get_cog("VeniceGenerationCog")
 # so we avoid circular imports.
 
@@ -105,9 +107,9 @@ class VeniceView(discord.ui.View):
 
 class VeniceControlCog(commands.Cog):
     """Buttons and channel control (ensure button messages, on_ready, etc.)"""
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, http: http_client.HttpClientCog):
         self.bot = bot
-        self.session = aiohttp.ClientSession()
+        self.session = http.session()
 
     def cog_unload(self):
         asyncio.create_task(self.session.close())
@@ -177,4 +179,5 @@ class VeniceControlCog(commands.Cog):
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(VeniceControlCog(bot))
+    http = await http_client.ensure_loaded(bot)
+    await bot.add_cog(VeniceControlCog(bot, http))
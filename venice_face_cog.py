@@ -7,6 +7,7 @@ import logging
 import os
 import random
 import re
+import time
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
@@ -18,6 +19,7 @@ from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 
+import http_client
 from venice_shared import (
     SERVER_ANIM_ICON,
     AnimateEphemeralView,
@@ -31,6 +33,8 @@ from venice_shared import (
     eta_text,
     extract_image_from_response,
     get_quota_store,
+    latency_key,
+    latency_model,
     looks_like_image,
     refresh_starter_message,
     register_starter_reposter,
@@ -40,6 +44,7 @@ from venice_shared import (
     send_image_with_compression,
     send_role_locked_message,
     trim,
+    venice_scheduler,
 )
 
 load_dotenv()
@@ -104,6 +109,11 @@ image_quota = get_quota_store(IMAGE_QUOTA_FILE)
 
 FACE_CAPS_FILE = os.getenv("FACE_CAPS_FILE", "venice_face_model_caps.json")
 
+# Static ETA/timeout until latency_model has samples for the edit model.
+FACE_EST_SECONDS = 40.0
+FACE_API_TIMEOUT = 180.0
+FACE_MAX_API_TIMEOUT = 600.0
+
 # =================================================
 # BACKEND MODELS
 # label       -> long label used in config/admin views
@@ -576,7 +586,9 @@ async def venice_edit(
         "Content-Type": "application/json",
     }
     req_id = uuid.uuid4().hex[:8]
-    timeout = aiohttp.ClientTimeout(total=180, connect=20, sock_read=150)
+    lat_key = latency_key("face", model_id)
+    timeout_total = latency_model.timeout(lat_key, FACE_API_TIMEOUT, 60.0, FACE_MAX_API_TIMEOUT)
+    timeout = aiohttp.ClientTimeout(total=timeout_total, connect=20, sock_read=timeout_total - 30)
     endpoint = VENICE_IMAGE_EDIT_URL
 
     last_error: Optional[str] = None
@@ -592,11 +604,13 @@ async def venice_edit(
             req_id, model_id, len(prompt), payload.get("safe_mode"),
             model_caps.describe(model_id),
         )
+        started = time.monotonic()
         try:
             async with session.post(endpoint, headers=headers, json=payload, timeout=timeout) as resp:
                 if resp.status == 200:
                     img = await extract_image_from_response(resp)
                     if img and looks_like_image(img):
+                        latency_model.record(lat_key, time.monotonic() - started)
                         return img, None
                     last_error = "Empty/invalid image response"
                     attempt += 1
@@ -637,7 +651,11 @@ async def venice_edit(
 
                     return None, f"HTTP {resp.status}: {body[:400]}"
 
-                if resp.status in (429, 500, 502, 503, 504) and attempt < retries:
+                if resp.status == 429 and attempt < retries:
+                    await asyncio.sleep(venice_scheduler.rate_limited(model_id, resp.headers, body))
+                    attempt += 1
+                    continue
+                if resp.status in (500, 502, 503, 504) and attempt < retries:
                     await asyncio.sleep(1.5 * (attempt + 1))
                     attempt += 1
                     continue
@@ -645,6 +663,8 @@ async def venice_edit(
                 return None, f"HTTP {resp.status}: {body[:400]}"
 
         except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if isinstance(e, asyncio.TimeoutError):
+                latency_model.record(lat_key, time.monotonic() - started)
             last_error = f"Transport: {e}"
             if attempt < retries:
                 await asyncio.sleep(1.5 * (attempt + 1))
@@ -683,7 +703,7 @@ def is_starter_message(msg: discord.Message) -> bool:
     return (msg.content or "").strip() in LEGACY_STARTER_TEXTS
 
 
-def _face_progress_embed(user, prompt, mode_id, model_id, percent, eta_sec, stage, quota) -> discord.Embed:
+def _face_progress_embed(user, prompt, mode_id, model_id, percent, eta_sec, stage, quota, queue_position=None) -> discord.Embed:
     return build_progress_embed(
         title="🎭 FACE IMAGE RENDER",
         color=discord.Color.purple(),
@@ -692,6 +712,7 @@ def _face_progress_embed(user, prompt, mode_id, model_id, percent, eta_sec, stag
         quota_name="Quota (24h, shared)",
         quota_state=quota,
         footer=f"{get_mode_short_label(mode_id)} • {get_model_short_label(model_id)} • {_model_param_footer(model_id)}",
+        queue_position=queue_position,
     )
 # venice_face_cog.py — Part 2/2
 
@@ -856,7 +877,7 @@ async def run_face_generation(
             f"{FACE_ONLY_INSTRUCTION_SUFFIX}"
         ).strip()
 
-        est_time = 40.0
+        est_time = latency_model.estimate(latency_key("face", model_id), FACE_EST_SECONDS)
         progress_msg = await send_ephemeral(
             interaction,
             embed=_face_progress_embed(
@@ -865,17 +886,21 @@ async def run_face_generation(
             ),
         )
 
-        gen_task = asyncio.create_task(
-            venice_edit(session, model_id, full_prompt, face_bytes)
-        )
+        ticket = venice_scheduler.ticket(model_id, interaction.user)
+
+        async def edit():
+            async with ticket:
+                return await venice_edit(session, model_id, full_prompt, face_bytes)
+
+        gen_task = asyncio.create_task(edit())
 
         def gen_embed(percent, eta):
             return _face_progress_embed(
                 interaction.user, user_prompt, mode_id, model_id, percent, eta,
-                "Generating image...", state,
+                "Generating image...", state, queue_position=ticket.position,
             )
 
-        await run_with_progress(gen_task, progress_msg, est_time, 0, 97, gen_embed, 6.0)
+        await run_with_progress(gen_task, progress_msg, est_time, 0, 97, gen_embed, 6.0, ticket=ticket)
         image_bytes, err = await gen_task
 
         if not image_bytes:
@@ -1168,8 +1193,9 @@ class FaceConfigView(discord.ui.View):
 # COG
 # =================================================
 class VeniceFaceCog(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, http: http_client.HttpClientCog):
         self.bot = bot
+        self.http = http
         self.session: Optional[aiohttp.ClientSession] = None
         self._ready_bootstrap_done = False
         self._ready_lock = asyncio.Lock()
@@ -1180,10 +1206,7 @@ class VeniceFaceCog(commands.Cog):
     async def _ensure_session(self):
         if self.session and not self.session.closed:
             return
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=300),
-            connector=aiohttp.TCPConnector(limit=30, ttl_dns_cache=300),
-        )
+        self.session = self.http.session(aiohttp.ClientTimeout(total=FACE_MAX_API_TIMEOUT + 60))
 
     async def cog_load(self):
         global _cog_instance
@@ -1200,6 +1223,7 @@ class VeniceFaceCog(commands.Cog):
             _cog_instance = None
         model_caps.save()
         face_pool.save()
+        image_quota.close()
         if self.session and not self.session.closed:
             asyncio.create_task(self.session.close())
 
@@ -1293,10 +1317,11 @@ class VeniceFaceCog(commands.Cog):
         results: list[str] = []
         for mode_id in MODE_ORDER:
             model_id = get_mode_model(mode_id)
-            img, err = await venice_edit(
-                self.session, model_id, "a simple portrait test",
-                face, retries=0,
-            )
+            async with venice_scheduler.ticket(model_id, ctx.author):
+                img, err = await venice_edit(
+                    self.session, model_id, "a simple portrait test",
+                    face, retries=0,
+                )
             if img:
                 results.append(
                     f"✅ `{mode_id}` ({get_model_short_label(model_id)}) -> {len(img)} bytes"
@@ -1329,4 +1354,5 @@ class VeniceFaceCog(commands.Cog):
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(VeniceFaceCog(bot))
\ No newline at end of file
+    http = await http_client.ensure_loaded(bot)
+    await bot.add_cog(VeniceFaceCog(bot, http))
\ No newline at end of file
@@ -11,6 +11,8 @@ from datetime import datetime
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
+import http_client
+from venice_shared import venice_scheduler
 
 # Load environment
 load_dotenv()
@@ -296,7 +298,8 @@ class AspectRatioView(discord.ui.View):
         if full_prompt and not full_prompt[0].isalnum():
             full_prompt = " " + full_prompt
 
-        img_bytes = await venice_generate(
+        img_bytes = await venice_scheduler.call(
+            self.variant["model"], interaction.user, venice_generate,
             self.session,
             full_prompt,
             self.variant,
@@ -542,9 +545,9 @@ class PostGenerationView(discord.ui.View):
 # ---------------- Cog ----------------
 class VeniceGenerationCog(commands.Cog):
     """Cog that contains all generation logic, modals and views."""
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, http: http_client.HttpClientCog):
         self.bot = bot
-        self.session = aiohttp.ClientSession()
+        self.session = http.session()
         # expose modal class to control cog via instance attribute
         self.VeniceModal = VeniceModal
         self.VARIANT_MAP = VARIANT_MAP
@@ -557,4 +560,5 @@ class VeniceGenerationCog(commands.Cog):
 
 # Setup function for extension loading
 async def setup(bot: commands.Bot):
-    await bot.add_cog(VeniceGenerationCog(bot))
+    http = await http_client.ensure_loaded(bot)
+    await bot.add_cog(VeniceGenerationCog(bot, http))
@@ -17,6 +17,9 @@ import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
+import http_client
+from venice_shared import fit_image_for_discord, generation_cache, image_pool, venice_scheduler
+
 try:
     from PIL import Image
 except Exception:
@@ -42,7 +45,6 @@ def _env_int(name: str, default: int) -> int:
 
 DISCORD_UPLOAD_LIMIT_FORCE_MB = _env_int("DISCORD_UPLOAD_LIMIT_FORCE_MB", 0)
 DISCORD_UPLOAD_LIMIT_FALLBACK_MB = _env_int("DISCORD_UPLOAD_LIMIT_FALLBACK_MB", 50)
-DISCORD_UPLOAD_SAFETY_BYTES = _env_int("DISCORD_UPLOAD_SAFETY_BYTES", 512 * 1024)
 
 BUTTON_MESSAGE_TEXT = "💡 Choose Model for 🖼️ NEW image!"
 LEGACY_STARTER_TEXTS = {
@@ -475,61 +477,6 @@ def _discord_upload_limit_bytes(interaction: discord.Interaction) -> int:
     return max(candidates) if candidates else DISCORD_UPLOAD_LIMIT_FALLBACK_MB * 1024 * 1024
 
 
-def _fit_image_for_discord(image_bytes: bytes, max_bytes: int) -> tuple[bytes, str]:
-    target = max(256 * 1024, int(max_bytes - DISCORD_UPLOAD_SAFETY_BYTES))
-
-    if len(image_bytes) <= target and _looks_like_image(image_bytes):
-        return image_bytes, _infer_image_ext(image_bytes)
-    if Image is None:
-        return image_bytes, _infer_image_ext(image_bytes)
-
-    try:
-        img = Image.open(io.BytesIO(image_bytes))
-    except Exception:
-        return image_bytes, _infer_image_ext(image_bytes)
-
-    if img.mode not in ("RGB", "L"):
-        img = img.convert("RGB")
-
-    resample = Image.Resampling.LANCZOS if hasattr(Image, "Resampling") else Image.LANCZOS
-    best_data, best_ext = image_bytes, _infer_image_ext(image_bytes)
-
-    def remember(data: bytes, ext: str):
-        nonlocal best_data, best_ext
-        if len(data) < len(best_data):
-            best_data, best_ext = data, ext
-
-    for max_side in (4096, 3072, 2560, 2048, 1792, 1536, 1280, 1024, 896, 768, 640, 512):
-        work = img.copy()
-        work.thumbnail((max_side, max_side), resample)
-        for q in (92, 86, 80, 74, 68, 62, 56, 50, 44, 38, 32, 28, 24):
-            try:
-                buf = io.BytesIO()
-                work.save(buf, format="JPEG", quality=q, optimize=True, progressive=True)
-                data = buf.getvalue()
-                remember(data, "jpg")
-                if len(data) <= target:
-                    return data, "jpg"
-            except Exception:
-                continue
-
-    for max_side in (3072, 2560, 2048, 1536, 1280, 1024, 896, 768, 640, 512):
-        work = img.copy()
-        work.thumbnail((max_side, max_side), resample)
-        for q in (90, 80, 70, 60, 50, 40, 30, 24):
-            try:
-                buf = io.BytesIO()
-                work.save(buf, format="WEBP", quality=q, method=6)
-                data = buf.getvalue()
-                remember(data, "webp")
-                if len(data) <= target:
-                    return data, "webp"
-            except Exception:
-                continue
-
-    return best_data, best_ext
-
-
 def _b64_to_bytes(s: str) -> Optional[bytes]:
     if not s:
         return None
@@ -1339,14 +1286,20 @@ class ResolutionSelectView(OwnerLockedView):
         progress_msg = await interaction.followup.send(f"{pepper} Generating image...", ephemeral=True, wait=True)
         await track_ephemeral_message(interaction, progress_msg)
 
-        gen_task = asyncio.create_task(venice_generate(self.session, payload))
         display_name = interaction.user.display_name
+        image_bytes = await generation_cache.get(payload)
+        if image_bytes is None:
+            gen_task = asyncio.create_task(
+                venice_scheduler.call(model_id, interaction.user, venice_generate, self.session, payload)
+            )
 
-        def gen_content(percent: int, eta: float) -> str:
-            return f"{pepper} Generating image for **{display_name}**... {percent}% (ETA ~{_eta_text(eta)})"
+            def gen_content(percent: int, eta: float) -> str:
+                return f"{pepper} Generating image for **{display_name}**... {percent}% (ETA ~{_eta_text(eta)})"
 
-        _ = await run_with_progress(gen_task, progress_msg, est_gen, 0, gen_cap, gen_content, min_est=6.0)
-        image_bytes = await gen_task
+            _ = await run_with_progress(gen_task, progress_msg, est_gen, 0, gen_cap, gen_content, min_est=6.0)
+            image_bytes = await gen_task
+            if image_bytes:
+                await generation_cache.put(payload, image_bytes)
 
         if not image_bytes:
             await interaction.followup.send("❌ Generation failed.", ephemeral=True)
@@ -1356,7 +1309,9 @@ class ResolutionSelectView(OwnerLockedView):
         upscaled_success = False
         if upscale_factor in (2, 4):
             est_up = estimate_upscale_seconds(upscale_factor, resolution)
-            up_task = asyncio.create_task(venice_upscale(self.session, image_bytes, upscale_factor))
+            up_task = asyncio.create_task(
+                venice_scheduler.call("upscale", interaction.user, venice_upscale, self.session, image_bytes, upscale_factor)
+            )
 
             def up_content(percent: int, eta: float) -> str:
                 return f"{pepper} Upscaling ({upscale_factor}x) for **{display_name}**... {percent}% (ETA ~{_eta_text(eta)})"
@@ -1409,7 +1364,7 @@ class ResolutionSelectView(OwnerLockedView):
         posted: Optional[discord.Message] = None
         for s in (1.00, 0.90, 0.80, 0.70, 0.60, 0.50, 0.40, 0.30, 0.22, 0.18):
             target = max(256 * 1024, int(upload_limit * s))
-            candidate_bytes, candidate_ext = _fit_image_for_discord(image_bytes, target)
+            candidate_bytes, candidate_ext = await image_pool.run(fit_image_for_discord, image_bytes, target)
 
             fp = io.BytesIO(candidate_bytes)
             fp.seek(0)
@@ -1433,6 +1388,7 @@ class ResolutionSelectView(OwnerLockedView):
             await interaction.followup.send("❌ Upload failed after compression retries.", ephemeral=True)
             self.stop()
             return
+        await generation_cache.release(payload)
 
         for emo in REACTIONS:
             try:
@@ -1467,8 +1423,9 @@ class ResolutionSelectView(OwnerLockedView):
 # COG
 # =================================================
 class VeniceImageCog(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, http: http_client.HttpClientCog):
         self.bot = bot
+        self.http = http
         self.session: Optional[aiohttp.ClientSession] = None
         self._ready_bootstrap_done = False
         self._ready_lock = asyncio.Lock()
@@ -1476,10 +1433,7 @@ class VeniceImageCog(commands.Cog):
     async def _ensure_session(self):
         if self.session and not self.session.closed:
             return
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=300),
-            connector=aiohttp.TCPConnector(limit=60, ttl_dns_cache=300),
-        )
+        self.session = self.http.session(aiohttp.ClientTimeout(total=300))
 
     async def cog_load(self):
         await self._ensure_session()
@@ -1569,4 +1523,5 @@ class VeniceImageCog(commands.Cog):
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(VeniceImageCog(bot))
\ No newline at end of file
+    http = await http_client.ensure_loaded(bot)
+    await bot.add_cog(VeniceImageCog(bot, http))
\ No newline at end of file
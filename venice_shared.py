@@ -7,6 +7,10 @@ RULES:
 - TIER_RULES is the single source of truth.
 - Cogs register themselves via register_starter_reposter().
 - Progress embeds use build_progress_embed(quota_state=state).
+- Progress ETAs and provider timeouts come from latency_model; record every
+  completed provider call there.
+- Progress messages are edited via progress_reporter, never directly, while
+  a render is running.
 - Success messages use build_generation_success_text(state, kind=...).
 - Video model config lives in VIDEO_MODEL_PROFILES. Add a new animate button
   by adding one entry there. No cog change required.
@@ -18,13 +22,21 @@ import asyncio
 import base64
 import binascii
 import contextlib
+import hashlib
 import io
 import json
 import logging
+import math
+import multiprocessing
 import os
 import re
+import sqlite3
+import threading
 import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Awaitable, Callable, Optional
@@ -37,6 +49,8 @@ try:
 except Exception:
     Image = None
 
+import http_client
+
 logger = logging.getLogger("venice_shared")
 
 
@@ -63,8 +77,13 @@ def env_str(name: str, default: str) -> str:
 DISCORD_UPLOAD_LIMIT_FORCE_MB = env_int("DISCORD_UPLOAD_LIMIT_FORCE_MB", 0)
 DISCORD_UPLOAD_LIMIT_FALLBACK_MB = env_int("DISCORD_UPLOAD_LIMIT_FALLBACK_MB", 50)
 DISCORD_UPLOAD_SAFETY_BYTES = env_int("DISCORD_UPLOAD_SAFETY_BYTES", 512 * 1024)
+# How long a ceiling learned from a 413 is trusted before the declared limit is retried.
+DISCORD_UPLOAD_CEILING_TTL_SEC = env_int("DISCORD_UPLOAD_CEILING_TTL_SEC", 6 * 3600)
 
 DEFAULT_WINDOW_SECONDS = 24 * 60 * 60
+# Quota write-behind: journal group-commit delay and SQLite checkpoint interval
+QUOTA_FLUSH_DELAY_MS = env_int("QUOTA_FLUSH_DELAY_MS", 25)
+QUOTA_CHECKPOINT_SEC = env_int("QUOTA_CHECKPOINT_SEC", 60)
 
 
 def utc_now() -> datetime:
@@ -76,47 +95,238 @@ def utc_now() -> datetime:
 # =================================================
 class RollingQuotaStore:
     """
-    24h rolling window quota, persisted as JSON.
-    File I/O runs in a worker thread to avoid blocking the event loop.
+    24h rolling window quota, one row per (guild, user) in SQLite (WAL).
+
+    The working set lives in memory: peek is served from RAM, reserve/rollback
+    mutate RAM synchronously (so they are atomic per key on the event loop) and
+    append the new entry to a small write-ahead journal. Journal writes are
+    group-committed: everything that arrived within QUOTA_FLUSH_DELAY_MS shares
+    one append + fsync, and reserve/rollback return once their batch is
+    durable. Every QUOTA_CHECKPOINT_SEC the dirty entries are written to
+    SQLite in one transaction and the journal is truncated; on startup the
+    journal is replayed on top of the table. Single writer: one bot process
+    per quota file.
+
+    `file_path` is the historical JSON location; the database (.sqlite3) and
+    the journal (.journal) live next to it and a leftover JSON file is
+    imported once.
     """
 
     def __init__(self, file_path: str | Path, window_seconds: int = DEFAULT_WINDOW_SECONDS):
         self.file_path = Path(file_path)
+        self.db_path = self.file_path.with_suffix(".sqlite3")
+        self.journal_path = self.file_path.with_suffix(".journal")
         self.window_seconds = int(window_seconds)
-        self.lock = asyncio.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Guards the connection and the journal file across worker threads;
+        # held only for the duration of one batch, never across an await.
+        self._db_lock = threading.Lock()
+
+        # (guild_id, user_id) -> {"start", "used"}; None until loaded
+        self._entries: Optional[dict[tuple[int, int], dict[str, int]]] = None
+        self._load_lock = asyncio.Lock()
+        self._dirty: set[tuple[int, int]] = set()
+        self._journal_buf: list[str] = []
+        self._waiters: list[asyncio.Future] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._last_checkpoint = time.monotonic()
+
+    # ---------------------------------------------------------------- storage
+    def _connect_sync(self) -> sqlite3.Connection:
+        """Caller holds _db_lock."""
+        if self._conn is not None:
+            return self._conn
+        parent = self.db_path.parent
+        if parent and str(parent) != ".":
+            parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA busy_timeout=5000;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota ("
+            " guild_id INTEGER NOT NULL,"
+            " user_id INTEGER NOT NULL,"
+            " start INTEGER NOT NULL DEFAULT 0,"
+            " used INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY(guild_id, user_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn = conn
+        self._import_json_sync(conn)
+        return conn
 
-    def _read_sync(self) -> dict[str, Any]:
-        if not self.file_path.exists():
-            return {}
+    def _import_json_sync(self, conn: sqlite3.Connection) -> None:
+        """One-time migration of the old whole-file JSON store."""
+        if not self.file_path.exists() or self.file_path.suffix == ".sqlite3":
+            return
         try:
             raw = self.file_path.read_text(encoding="utf-8")
             data = json.loads(raw) if raw.strip() else {}
-            return data if isinstance(data, dict) else {}
+            data = data if isinstance(data, dict) else {}
         except Exception as e:
-            logger.error("Quota read failed (%s): %s", self.file_path, e)
-            with contextlib.suppress(Exception):
-                backup = self.file_path.with_suffix(f".corrupt.{int(time.time())}")
-                self.file_path.replace(backup)
-                logger.error("Corrupt quota file moved to %s", backup)
-            return {}
-
-    def _write_sync(self, data: dict[str, Any]) -> None:
-        parent = self.file_path.parent
-        if parent and str(parent) != ".":
-            parent.mkdir(parents=True, exist_ok=True)
-        tmp = self.file_path.with_suffix(self.file_path.suffix + f".tmp.{os.getpid()}")
-        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
-        os.replace(tmp, self.file_path)
-
-    async def _read(self) -> dict[str, Any]:
-        return await asyncio.to_thread(self._read_sync)
+            logger.error("Quota JSON import failed (%s): %s", self.file_path, e)
+            data = {}
+        rows = []
+        for key, entry in data.items():
+            guild_id, _, user_id = str(key).partition(":")
+            if not (guild_id.isdigit() and user_id.isdigit()) or not isinstance(entry, dict):
+                continue
+            rows.append((int(guild_id), int(user_id),
+                         safe_int(entry.get("start")), max(0, safe_int(entry.get("used")))))
+        self._write_rows_sync(conn, rows, insert_only=True)
+        with contextlib.suppress(Exception):
+            self.file_path.replace(self.file_path.with_suffix(f".migrated.{int(time.time())}"))
+        logger.info("Quota store %s: imported %d entr(y/ies) from JSON", self.db_path, len(rows))
 
-    async def _write(self, data: dict[str, Any]) -> None:
-        await asyncio.to_thread(self._write_sync, data)
+    @staticmethod
+    def _write_rows_sync(conn: sqlite3.Connection, rows: list[tuple[int, int, int, int]],
+                         insert_only: bool = False) -> None:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for guild_id, user_id, start, used in rows:
+                if insert_only:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO quota (guild_id, user_id, start, used) "
+                        "VALUES (?, ?, ?, ?)", (guild_id, user_id, start, used))
+                elif start <= 0 and used <= 0:
+                    conn.execute("DELETE FROM quota WHERE guild_id=? AND user_id=?",
+                                 (guild_id, user_id))
+                else:
+                    conn.execute(
+                        "INSERT INTO quota (guild_id, user_id, start, used) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(guild_id, user_id) DO UPDATE SET "
+                        "start=excluded.start, used=excluded.used",
+                        (guild_id, user_id, start, used))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
 
-    def _key(self, guild_id: int, user_id: int) -> str:
-        return f"{guild_id}:{user_id}"
+    def _load_sync(self) -> dict[tuple[int, int], dict[str, int]]:
+        """Table + journal replay. Replayed entries are checkpointed right away."""
+        with self._db_lock:
+            conn = self._connect_sync()
+            entries = {
+                (g, u): {"start": s, "used": n}
+                for g, u, s, n in conn.execute("SELECT guild_id, user_id, start, used FROM quota")
+            }
+            replayed: set[tuple[int, int]] = set()
+            if self.journal_path.exists():
+                with open(self.journal_path, "r", encoding="utf-8") as fh:
+                    for line in fh:
+                        try:
+                            g, u, s, n = json.loads(line)
+                        except Exception:
+                            # torn tail from a crash mid-append
+                            break
+                        entries[(g, u)] = {"start": s, "used": n}
+                        replayed.add((g, u))
+            if replayed:
+                self._write_rows_sync(
+                    conn, [(g, u, entries[(g, u)]["start"], entries[(g, u)]["used"]) for g, u in replayed])
+                logger.info("Quota store %s: replayed %d journal entr(y/ies)", self.db_path, len(replayed))
+            self._truncate_journal_sync()
+        return {k: v for k, v in entries.items() if v["start"] > 0 or v["used"] > 0}
+
+    def _append_journal_sync(self, lines: list[str]) -> None:
+        with self._db_lock:
+            with open(self.journal_path, "a", encoding="utf-8") as fh:
+                fh.write("\n".join(lines) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    def _truncate_journal_sync(self) -> None:
+        """Caller holds _db_lock."""
+        with open(self.journal_path, "w", encoding="utf-8") as fh:
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def _checkpoint_sync(self, rows: list[tuple[int, int, int, int]]) -> None:
+        with self._db_lock:
+            if rows:
+                self._write_rows_sync(self._connect_sync(), rows)
+            self._truncate_journal_sync()
+
+    def _take_dirty_rows(self) -> list[tuple[int, int, int, int]]:
+        entries = self._entries or {}
+        rows = []
+        for key in self._dirty:
+            e = entries.get(key) or {"start": 0, "used": 0}
+            rows.append((key[0], key[1], e["start"], e["used"]))
+        self._dirty.clear()
+        return rows
+
+    async def _ensure_loaded(self) -> dict[tuple[int, int], dict[str, int]]:
+        if self._entries is None:
+            async with self._load_lock:
+                if self._entries is None:
+                    self._entries = await asyncio.to_thread(self._load_sync)
+        return self._entries
+
+    def _record(self, key: tuple[int, int], entry: dict[str, int]) -> asyncio.Future:
+        """Apply one mutation in RAM and queue it for the next journal batch."""
+        assert self._entries is not None
+        if entry["start"] <= 0 and entry["used"] <= 0:
+            self._entries.pop(key, None)
+        else:
+            self._entries[key] = entry
+        self._dirty.add(key)
+        self._journal_buf.append(json.dumps([key[0], key[1], entry["start"], entry["used"]]))
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._waiters.append(fut)
+        if self._flusher is None:
+            self._flusher = loop.create_task(self._flush_loop())
+        return fut
+
+    async def _flush_loop(self) -> None:
+        try:
+            while self._journal_buf:
+                await asyncio.sleep(QUOTA_FLUSH_DELAY_MS / 1000)
+                lines, self._journal_buf = self._journal_buf, []
+                waiters, self._waiters = self._waiters, []
+                try:
+                    await asyncio.to_thread(self._append_journal_sync, lines)
+                except Exception as e:
+                    # RAM stays authoritative; the next checkpoint retries via _dirty
+                    logger.error("Quota journal append failed (%s): %s", self.journal_path, e)
+                for w in waiters:
+                    if not w.done():
+                        w.set_result(None)
+                if time.monotonic() - self._last_checkpoint >= QUOTA_CHECKPOINT_SEC:
+                    self._last_checkpoint = time.monotonic()
+                    rows = self._take_dirty_rows()
+                    try:
+                        await asyncio.to_thread(self._checkpoint_sync, rows)
+                    except Exception as e:
+                        self._dirty.update((g, u) for g, u, _, _ in rows)
+                        logger.error("Quota checkpoint failed (%s): %s", self.db_path, e)
+        finally:
+            self._flusher = None
+
+    def close(self) -> None:
+        """
+        Synchronous final checkpoint for cog_unload; safe to call more than
+        once. Stores are shared between cogs, so the store stays usable: the
+        connection is reopened on the next write.
+        """
+        if self._entries is not None and (self._journal_buf or self._dirty):
+            self._journal_buf.clear()
+            with contextlib.suppress(Exception):
+                self._checkpoint_sync(self._take_dirty_rows())
+        # The checkpoint made every pending mutation durable.
+        waiters, self._waiters = self._waiters, []
+        for w in waiters:
+            if not w.done():
+                w.set_result(None)
+        with self._db_lock:
+            if self._conn is not None:
+                with contextlib.suppress(Exception):
+                    self._conn.close()
+                self._conn = None
 
+    # ---------------------------------------------------------------- logic
     def _normalize(self, entry: Any, now_ts: int) -> dict[str, int]:
         if not isinstance(entry, dict):
             entry = {}
@@ -144,42 +354,40 @@ class RollingQuotaStore:
         }
 
     async def peek(self, guild_id: int, user_id: int, limit: int) -> dict[str, int]:
+        entries = await self._ensure_loaded()
         now_ts = int(time.time())
         limit = max(0, int(limit))
-        async with self.lock:
-            db = await self._read()
-            entry = self._normalize(db.get(self._key(guild_id, user_id), {}), now_ts)
-            return self._state(entry, limit, now_ts)
+        entry = self._normalize(entries.get((guild_id, user_id)), now_ts)
+        return self._state(entry, limit, now_ts)
 
     async def reserve(
         self, guild_id: int, user_id: int, limit: int, amount: int
     ) -> tuple[bool, dict[str, int], Optional[dict[str, int]]]:
+        entries = await self._ensure_loaded()
         now_ts = int(time.time())
         limit = max(0, int(limit))
         amount = max(0, int(amount))
 
-        async with self.lock:
-            db = await self._read()
-            key = self._key(guild_id, user_id)
-            entry = self._normalize(db.get(key, {}), now_ts)
-
-            if limit <= 0 or amount <= 0 or entry["used"] + amount > limit:
-                return False, self._state(entry, limit, now_ts), None
+        key = (guild_id, user_id)
+        entry = self._normalize(entries.get(key), now_ts)
 
-            if entry["start"] <= 0:
-                entry["start"] = now_ts
-            entry["used"] += amount
+        if limit <= 0 or amount <= 0 or entry["used"] + amount > limit:
+            return False, self._state(entry, limit, now_ts), None
 
-            db[key] = entry
-            await self._write(db)
+        if entry["start"] <= 0:
+            entry["start"] = now_ts
+        entry["used"] += amount
+        durable = self._record(key, entry)
+        state = self._state(entry, limit, now_ts)
+        await durable
 
-            token = {
-                "guild_id": guild_id,
-                "user_id": user_id,
-                "amount": amount,
-                "start": entry["start"],
-            }
-            return True, self._state(entry, limit, now_ts), token
+        token = {
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "amount": amount,
+            "start": entry["start"],
+        }
+        return True, state, token
 
     async def rollback(self, token: Optional[dict[str, int]]) -> None:
         if not token:
@@ -191,28 +399,25 @@ class RollingQuotaStore:
         if guild_id <= 0 or user_id <= 0 or amount <= 0:
             return
 
+        entries = await self._ensure_loaded()
         now_ts = int(time.time())
-        async with self.lock:
-            db = await self._read()
-            key = self._key(guild_id, user_id)
-            entry = self._normalize(db.get(key, {}), now_ts)
-
-            if entry["start"] == token_start and entry["used"] > 0:
-                entry["used"] = max(0, entry["used"] - amount)
-                if entry["used"] == 0:
-                    entry["start"] = 0
-                db[key] = entry
-                await self._write(db)
+        key = (guild_id, user_id)
+        entry = self._normalize(entries.get(key), now_ts)
+
+        if entry["start"] == token_start and entry["used"] > 0:
+            entry["used"] = max(0, entry["used"] - amount)
+            if entry["used"] == 0:
+                entry["start"] = 0
+            await self._record(key, entry)
 
     async def prune(self) -> int:
+        entries = await self._ensure_loaded()
         now_ts = int(time.time())
-        async with self.lock:
-            db = await self._read()
-            before = len(db)
-            alive = {k: v for k, v in db.items() if self._normalize(v, now_ts)["start"] > 0}
-            if len(alive) != before:
-                await self._write(alive)
-            return before - len(alive)
+        expired = [k for k, e in entries.items() if self._normalize(e, now_ts)["start"] <= 0]
+        durable = [self._record(k, {"start": 0, "used": 0}) for k in expired]
+        if durable:
+            await asyncio.gather(*durable)
+        return len(expired)
 
 
 _stores: dict[str, RollingQuotaStore] = {}
@@ -474,17 +679,159 @@ def extract_image_from_json_obj(obj: Any, depth: int = 0) -> Optional[bytes]:
     return None
 
 
+# Streaming JSON image extraction: body chunk size, how many leading
+# characters of a string are sniffed, and the shortest string worth decoding.
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_SNIFF_CHARS = 64
+STREAM_DATA_URL_MAX_PREFIX = 256
+STREAM_B64_MIN_CHARS = 256
+_STRING_STOP = re.compile(rb'["\\]')
+
+
+class Base64ImageScanner:
+    """
+    Incremental JSON scanner for provider responses.
+
+    feed() takes body chunks and returns the first string value that is a
+    base64 (or data: URL) encoded image, decoded chunk by chunk as it
+    arrives. Neither the raw body, the JSON tree nor the base64 text is ever
+    held whole: strings whose first decoded bytes are not image magic are
+    skipped, so peak memory is about one chunk plus the decoded image.
+    """
+
+    def __init__(self):
+        self._in_str = False
+        self._escape = False
+        self._reset_string()
+
+    def _reset_string(self):
+        self._head = bytearray()
+        self._sniffed = False
+        self._skip = False
+        self._pending = bytearray()
+        self._out = bytearray()
+        self._chars = 0
+
+    def _decode(self, final: bool = False):
+        usable = len(self._pending) if final else len(self._pending) - len(self._pending) % 4
+        if usable <= 0:
+            return
+        try:
+            self._out += base64.b64decode(bytes(self._pending[:usable]))
+        except (binascii.Error, ValueError):
+            self._skip = True
+            return
+        del self._pending[:usable]
+        if len(self._out) >= 12 and not looks_like_image(bytes(self._out[:12])):
+            self._skip = True
+
+    def _take(self, data: bytes):
+        if self._skip or not data:
+            return
+        self._chars += len(data)
+        if self._sniffed:
+            self._pending += data
+            self._decode()
+            return
+        self._head += data
+        if len(self._head) < STREAM_SNIFF_CHARS:
+            return
+        self._sniff()
+
+    def _sniff(self, final: bool = False):
+        head = bytes(self._head)
+        self._head = bytearray()
+        if head.startswith(b"data:"):
+            comma = head.find(b",")
+            if comma < 0:
+                if len(head) < STREAM_DATA_URL_MAX_PREFIX and not final:
+                    self._head = bytearray(head)
+                else:
+                    self._skip = True
+                return
+            head = head[comma + 1:]
+        self._sniffed = True
+        self._pending += head
+        self._decode(final)
+
+    def _end_string(self) -> Optional[bytes]:
+        out: Optional[bytes] = None
+        if not self._skip and self._chars >= STREAM_B64_MIN_CHARS:
+            if not self._sniffed:
+                self._sniff(final=True)
+            if not self._skip:
+                self._decode(final=True)
+            if not self._skip and looks_like_image(bytes(self._out[:12])):
+                out = bytes(self._out)
+        self._reset_string()
+        return out
+
+    def feed(self, chunk: bytes) -> Optional[bytes]:
+        pos, n = 0, len(chunk)
+        while pos < n:
+            if not self._in_str:
+                q = chunk.find(b'"', pos)
+                if q < 0:
+                    return None
+                self._in_str = True
+                pos = q + 1
+                continue
+            if self._escape:
+                self._escape = False
+                c = chunk[pos:pos + 1]
+                if c == b"/":
+                    self._take(c)
+                elif c not in (b"n", b"r", b"t"):
+                    # \uXXXX, \" or \\ never occur in base64.
+                    self._skip = True
+                pos += 1
+                continue
+            m = _STRING_STOP.search(chunk, pos)
+            if m is None:
+                self._take(chunk[pos:])
+                return None
+            self._take(chunk[pos:m.start()])
+            pos = m.end()
+            if m.group() == b"\\":
+                self._escape = True
+                continue
+            self._in_str = False
+            out = self._end_string()
+            if out:
+                return out
+        return None
+
+
 async def extract_image_from_response(resp: aiohttp.ClientResponse) -> Optional[bytes]:
-    raw = await resp.read()
+    """
+    Binary bodies are read as-is; JSON bodies are streamed through a
+    Base64ImageScanner instead of being parsed whole.
+    """
     ctype = (resp.headers.get("Content-Type") or "").lower()
-    if "image/" in ctype and looks_like_image(raw):
-        return raw
-    try:
-        data = json.loads(raw.decode("utf-8", errors="ignore"))
-    except Exception:
+    if "image/" in ctype:
+        raw = await resp.read()
         return raw if looks_like_image(raw) else None
-    out = extract_image_from_json_obj(data)
-    return out if out and looks_like_image(out) else None
+
+    first = b""
+    async for chunk in resp.content.iter_chunked(STREAM_CHUNK_BYTES):
+        first = chunk
+        break
+    if first.lstrip()[:1] not in (b"{", b"["):
+        raw = first + await resp.content.read()
+        return raw if looks_like_image(raw) else None
+
+    scanner = Base64ImageScanner()
+    out = scanner.feed(first)
+    if out is None:
+        async for chunk in resp.content.iter_chunked(STREAM_CHUNK_BYTES):
+            out = scanner.feed(chunk)
+            if out is not None:
+                break
+    # Drain the rest so the pooled connection can be reused.
+    with contextlib.suppress(Exception):
+        while await resp.content.read(STREAM_CHUNK_BYTES):
+            pass
+    return out
 
 
 def extract_urls_from_payload(payload: Any) -> list[str]:
@@ -511,6 +858,813 @@ def extract_urls_from_payload(payload: Any) -> list[str]:
     return list(dict.fromkeys(urls))
 
 
+# =================================================
+# VENICE REQUEST SCHEDULER
+# =================================================
+# Every Venice call (generate, edit, upscale, video queue+render) holds a
+# ticket from venice_scheduler while it talks to the provider.
+VENICE_MAX_CONCURRENT = max(1, env_int("VENICE_MAX_CONCURRENT", 6))
+VENICE_MODEL_MAX_CONCURRENT = max(1, env_int("VENICE_MODEL_MAX_CONCURRENT", 2))
+# Video renders hold their slot from queue request until download.
+VENICE_VIDEO_MAX_CONCURRENT = max(1, env_int("VENICE_VIDEO_MAX_CONCURRENT", 1))
+# Per-model overrides: "model-a=3,model-b=1"
+VENICE_MODEL_LIMITS = env_str("VENICE_MODEL_LIMITS", "")
+
+
+def _parse_model_limits(raw: str) -> dict[str, int]:
+    out: dict[str, int] = {}
+    for part in (raw or "").split(","):
+        name, _, n = part.partition("=")
+        with contextlib.suppress(ValueError):
+            if name.strip():
+                out[name.strip()] = max(1, int(n))
+    return out
+
+
+def retry_after_seconds(headers: Any, text: str = "", default: int = 20, cap: int = 90) -> int:
+    """Retry-After header (or a 'retry after N' hint in the body), clamped to [2, cap]."""
+    retry_after = 0
+    try:
+        raw = headers.get("Retry-After") if headers is not None else None
+        if raw is not None:
+            retry_after = int(float(str(raw).strip()))
+    except Exception:
+        retry_after = 0
+
+    if retry_after <= 0:
+        m = re.search(r"retry(?:\s+after)?\s*[:=]?\s*(\d+)", text or "", flags=re.IGNORECASE)
+        if m:
+            retry_after = int(m.group(1))
+
+    return max(2, min(retry_after if retry_after > 0 else default, cap))
+
+
+def tier_weight(tier: int) -> float:
+    """Fair-queue share from TIER_RULES: no tier 1, tier N gets 1 + N."""
+    return 1.0 + (tier if tier in TIER_RULES else 0)
+
+
+class VeniceTicket:
+    """One caller's place in the scheduler. Use `async with ticket:` or acquire()/release()."""
+
+    def __init__(self, scheduler: VeniceScheduler, model: str, user_id: int, weight: float, kind: str):
+        self.scheduler = scheduler
+        self.model = model
+        self.user_id = user_id
+        self.weight = weight
+        self.kind = kind
+        self.vtime = 0.0
+        self.seq = 0
+        self.enqueued_at = 0.0
+        self.state = "new"  # new -> waiting -> running -> done
+        self._granted: Optional[asyncio.Future] = None
+
+    @property
+    def waiting(self) -> bool:
+        return self.state in ("new", "waiting")
+
+    @property
+    def position(self) -> Optional[int]:
+        """1-based queue position while waiting, else None."""
+        return self.scheduler._position(self) if self.state == "waiting" else None
+
+    async def acquire(
+        self,
+        on_position: Optional[Callable[[int], Awaitable[None]]] = None,
+        every: float = 4.0,
+    ):
+        if self.state != "new":
+            return
+        self._granted = asyncio.get_running_loop().create_future()
+        self.scheduler._enqueue(self)
+        last: Optional[int] = None
+        try:
+            while not self._granted.done():
+                pos = self.position
+                if on_position is not None and pos is not None and pos != last:
+                    last = pos
+                    with contextlib.suppress(Exception):
+                        await on_position(pos)
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(asyncio.shield(self._granted), every)
+        except asyncio.CancelledError:
+            self.scheduler._abandon(self)
+            raise
+
+    def release(self):
+        self.scheduler._release(self)
+
+    async def __aenter__(self) -> VeniceTicket:
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+class VeniceScheduler:
+    """
+    Global + per-model (+ per-kind) concurrency caps with a per-user fair queue.
+    Waiting tickets are served in virtual-finish-time order: each request
+    costs 1 / tier_weight, so a user with many queued renders cannot starve
+    others, and higher tiers get a proportionally larger share.
+    A 429 puts the model on cooldown for Retry-After seconds; its queued
+    tickets wait instead of all hitting the provider again at once.
+    """
+
+    def __init__(
+        self,
+        global_cap: int = VENICE_MAX_CONCURRENT,
+        model_cap: int = VENICE_MODEL_MAX_CONCURRENT,
+        model_limits: Optional[dict[str, int]] = None,
+        kind_caps: Optional[dict[str, int]] = None,
+    ):
+        self.global_cap = global_cap
+        self.model_cap = model_cap
+        self.model_limits = model_limits if model_limits is not None else _parse_model_limits(VENICE_MODEL_LIMITS)
+        self.kind_caps = kind_caps if kind_caps is not None else {"video": VENICE_VIDEO_MAX_CONCURRENT}
+        self._waiting: list[VeniceTicket] = []
+        self._running = 0
+        self._running_model: dict[str, int] = {}
+        self._running_kind: dict[str, int] = {}
+        self._user_finish: dict[int, float] = {}
+        self._vclock = 0.0
+        self._seq = 0
+        self._cooldown_until: dict[str, float] = {}
+        self._wake: Optional[asyncio.TimerHandle] = None
+        # metrics
+        self.granted = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.rate_limits = 0
+
+    def ticket(self, model: str, user: Optional[discord.abc.User] = None, kind: str = "image") -> VeniceTicket:
+        member = user if isinstance(user, discord.Member) else None
+        return VeniceTicket(self, model, getattr(user, "id", 0), tier_weight(get_member_tier(member)), kind)
+
+    async def call(
+        self, model: str, user: Optional[discord.abc.User], fn: Callable[..., Awaitable[Any]],
+        *args: Any, kind: str = "image", **kwargs: Any,
+    ) -> Any:
+        """await fn(*args, **kwargs) while holding a ticket."""
+        async with self.ticket(model, user, kind):
+            return await fn(*args, **kwargs)
+
+    def model_limit(self, model: str) -> int:
+        return self.model_limits.get(model, self.model_cap)
+
+    # ---------------------------------------------------------------- queue
+    def _enqueue(self, t: VeniceTicket):
+        self._seq += 1
+        t.seq = self._seq
+        t.vtime = max(self._vclock, self._user_finish.get(t.user_id, 0.0)) + 1.0 / t.weight
+        self._user_finish[t.user_id] = t.vtime
+        t.enqueued_at = time.monotonic()
+        t.state = "waiting"
+        self._waiting.append(t)
+        self._dispatch()
+        if t.state == "waiting":
+            self.queued += 1
+            logger.info(
+                "Venice queue: %s/%s user=%s waits at position %s (%s)",
+                t.kind, t.model, t.user_id, self._position(t), self.stats(),
+            )
+
+    def _position(self, t: VeniceTicket) -> int:
+        key = (t.vtime, t.seq)
+        return 1 + sum(1 for o in self._waiting if (o.vtime, o.seq) < key)
+
+    def _cooling(self, model: str, now: float) -> bool:
+        return self._cooldown_until.get(model, 0.0) > now
+
+    def _can_run(self, t: VeniceTicket, now: float) -> bool:
+        if self._running >= self.global_cap:
+            return False
+        if self._running_model.get(t.model, 0) >= self.model_limit(t.model):
+            return False
+        cap = self.kind_caps.get(t.kind)
+        if cap is not None and self._running_kind.get(t.kind, 0) >= cap:
+            return False
+        return not self._cooling(t.model, now)
+
+    def _dispatch(self):
+        now = time.monotonic()
+        self._waiting.sort(key=lambda o: (o.vtime, o.seq))
+        for t in list(self._waiting):
+            if self._running >= self.global_cap:
+                break
+            if not self._can_run(t, now):
+                continue
+            self._waiting.remove(t)
+            t.state = "running"
+            self._running += 1
+            self._running_model[t.model] = self._running_model.get(t.model, 0) + 1
+            self._running_kind[t.kind] = self._running_kind.get(t.kind, 0) + 1
+            self._vclock = max(self._vclock, t.vtime - 1.0 / t.weight)
+            self.granted += 1
+            self.total_wait += now - t.enqueued_at
+            if t._granted is not None and not t._granted.done():
+                t._granted.set_result(None)
+
+        if not self._waiting and not self._running:
+            # Idle: forget finish times so returning users start fresh.
+            self._user_finish.clear()
+        self._arm_wakeup(now)
+
+    def _arm_wakeup(self, now: float):
+        pending = [
+            self._cooldown_until[t.model] for t in self._waiting if self._cooling(t.model, now)
+        ]
+        if self._wake is not None:
+            self._wake.cancel()
+            self._wake = None
+        if pending:
+            self._wake = asyncio.get_running_loop().call_later(
+                max(0.05, min(pending) - now), self._dispatch
+            )
+
+    def _release(self, t: VeniceTicket):
+        if t.state == "running":
+            self._running -= 1
+            self._running_model[t.model] = max(0, self._running_model.get(t.model, 0) - 1)
+            self._running_kind[t.kind] = max(0, self._running_kind.get(t.kind, 0) - 1)
+        elif t.state == "waiting" and t in self._waiting:
+            self._waiting.remove(t)
+        t.state = "done"
+        self._dispatch()
+
+    def _abandon(self, t: VeniceTicket):
+        # Granted right as the waiter was cancelled: hand the slot back.
+        self._release(t)
+
+    # ------------------------------------------------------------- 429 / stats
+    def rate_limited(self, model: str, headers: Any = None, text: str = "") -> int:
+        """Put `model` on cooldown after a 429; returns the seconds the caller should wait."""
+        delay = retry_after_seconds(headers, text)
+        until = time.monotonic() + delay
+        self._cooldown_until[model] = max(self._cooldown_until.get(model, 0.0), until)
+        self.rate_limits += 1
+        logger.warning("Venice 429 for %s: cooling down %ss (%d rate limit(s) so far)", model, delay, self.rate_limits)
+        return delay
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self._running,
+            "waiting": len(self._waiting),
+            "by_model": {m: n for m, n in self._running_model.items() if n},
+            "granted": self.granted,
+            "queued": self.queued,
+            "avg_wait_s": round(self.total_wait / max(1, self.granted), 2),
+            "rate_limits": self.rate_limits,
+        }
+
+
+venice_scheduler = VeniceScheduler()
+
+
+# =================================================
+# LATENCY ESTIMATOR
+# =================================================
+# Learned request durations per (kind, model, resolution, steps); feeds the
+# progress ETAs and the per-request API timeouts.
+LATENCY_FILE = Path(env_str("VENICE_LATENCY_FILE", "data/venice_latency.json"))
+LATENCY_WINDOW = max(8, env_int("VENICE_LATENCY_WINDOW", 64))
+LATENCY_EWMA_ALPHA = 0.25
+# Samples a key needs before its EWMA replaces the caller's static estimate.
+LATENCY_MIN_SAMPLES = 3
+# Below this many samples the p99 may only extend a timeout, never shorten it.
+LATENCY_TIMEOUT_MIN_SAMPLES = 20
+LATENCY_TIMEOUT_QUANTILE = 0.99
+LATENCY_TIMEOUT_MARGIN = 1.25
+LATENCY_TIMEOUT_PAD_SEC = 15.0
+LATENCY_SAVE_DELAY_SEC = 30.0
+
+
+def latency_key(
+    kind: str, model: str, resolution: Optional[str] = None, steps: Optional[int] = None
+) -> str:
+    """'kind|model|resolution|steps'; a missing part is '*' (any)."""
+    return "|".join([kind, model, resolution or "*", "*" if steps is None else str(int(steps))])
+
+
+def _quantile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return ordered[idx]
+
+
+class LatencyEstimator:
+    """
+    Online latency model. Every completed provider call is recorded under its
+    key and under the key's any-steps parent; each key keeps an EWMA (for
+    ETAs) and a sliding window of raw samples (for the timeout quantile).
+
+    Lookups use the exact key, then the parent, then the caller's static
+    heuristic until a key has LATENCY_MIN_SAMPLES. Timeouts are recorded at
+    their limit, so a model that keeps timing out gets a longer timeout next
+    time instead of failing the same way again.
+
+    Persisted to a small JSON file, written at most once per
+    LATENCY_SAVE_DELAY_SEC (and on flush()).
+    """
+
+    def __init__(
+        self,
+        path: Path = LATENCY_FILE,
+        window: int = LATENCY_WINDOW,
+        alpha: float = LATENCY_EWMA_ALPHA,
+    ):
+        self.path = Path(path)
+        self.window = window
+        self.alpha = alpha
+        # key -> {"ewma": float, "n": int, "samples": list[float]}
+        self._series: Optional[dict[str, dict[str, Any]]] = None
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._dirty = False
+
+    # ---------------------------------------------------------------- storage
+    def _data(self) -> dict[str, dict[str, Any]]:
+        if self._series is not None:
+            return self._series
+        self._series = {}
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return self._series
+        except (OSError, ValueError) as e:
+            logger.warning("Latency file %s unreadable, starting fresh: %s", self.path, e)
+            return self._series
+        for key, row in (raw.items() if isinstance(raw, dict) else []):
+            with contextlib.suppress(Exception):
+                samples = [float(x) for x in row.get("samples", [])][-self.window:]
+                self._series[str(key)] = {
+                    "ewma": float(row["ewma"]),
+                    "n": int(row.get("n", len(samples))),
+                    "samples": samples,
+                }
+        return self._series
+
+    def _save_sync(self, snapshot: dict[str, dict[str, Any]]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        tmp.write_text(json.dumps(snapshot, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _snapshot(self) -> dict[str, dict[str, Any]]:
+        return {
+            k: {"ewma": round(v["ewma"], 3), "n": v["n"], "samples": [round(x, 2) for x in v["samples"]]}
+            for k, v in self._data().items()
+        }
+
+    async def _save(self):
+        self._save_handle = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._save_sync, self._snapshot())
+        except OSError as e:
+            logger.warning("Latency file write failed: %s", e)
+
+    def _schedule_save(self):
+        self._dirty = True
+        if self._save_handle is not None:
+            return
+        with contextlib.suppress(RuntimeError):
+            loop = asyncio.get_running_loop()
+            self._save_handle = loop.call_later(
+                LATENCY_SAVE_DELAY_SEC, lambda: loop.create_task(self._save())
+            )
+
+    def flush(self):
+        """Write pending samples now (blocking; for cog unload)."""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            self._save_sync(self._snapshot())
+        except OSError as e:
+            logger.warning("Latency file write failed: %s", e)
+
+    # ---------------------------------------------------------------- model
+    @staticmethod
+    def _parent(key: str) -> Optional[str]:
+        head, _, steps = key.rpartition("|")
+        return f"{head}|*" if head and steps != "*" else None
+
+    def _lookup(self, key: str) -> Optional[dict[str, Any]]:
+        data = self._data()
+        for k in (key, self._parent(key)):
+            row = data.get(k) if k else None
+            if row is not None and len(row["samples"]) >= LATENCY_MIN_SAMPLES:
+                return row
+        return None
+
+    def record(self, key: str, seconds: float):
+        if seconds <= 0:
+            return
+        data = self._data()
+        for k in (key, self._parent(key)):
+            if not k:
+                continue
+            row = data.get(k)
+            if row is None:
+                data[k] = {"ewma": float(seconds), "n": 1, "samples": [float(seconds)]}
+                continue
+            row["ewma"] += self.alpha * (seconds - row["ewma"])
+            row["n"] += 1
+            row["samples"] = [*row["samples"], float(seconds)][-self.window:]
+        self._schedule_save()
+
+    def estimate(self, key: str, prior: float) -> float:
+        """Typical duration (EWMA) for `key`, or `prior` while data is thin."""
+        row = self._lookup(key)
+        return row["ewma"] if row is not None else prior
+
+    def timeout(self, key: str, prior: float, lo: float, hi: float) -> float:
+        """p99 x margin + pad, clamped to [lo, hi]; never below `prior` while data is thin."""
+        row = self._lookup(key)
+        if row is None:
+            return max(lo, min(prior, hi))
+        learned = (
+            _quantile(row["samples"], LATENCY_TIMEOUT_QUANTILE) * LATENCY_TIMEOUT_MARGIN
+            + LATENCY_TIMEOUT_PAD_SEC
+        )
+        if len(row["samples"]) < LATENCY_TIMEOUT_MIN_SAMPLES:
+            learned = max(learned, prior)
+        return max(lo, min(learned, hi))
+
+    def describe(self, key: str) -> str:
+        row = self._lookup(key)
+        if row is None:
+            return "static"
+        return f"n={row['n']} avg={row['ewma']:.0f}s p99={_quantile(row['samples'], LATENCY_TIMEOUT_QUANTILE):.0f}s"
+
+
+latency_model = LatencyEstimator()
+
+
+# =================================================
+# IMAGE PROCESS POOL
+# =================================================
+# Pillow decode/resize/encode runs here, never on the event loop thread.
+IMAGE_POOL_WORKERS = max(1, env_int("IMAGE_POOL_WORKERS", os.cpu_count() or 2))
+# Jobs allowed to wait for a worker; further callers block until a slot frees.
+IMAGE_POOL_MAX_QUEUE = max(0, env_int("IMAGE_POOL_MAX_QUEUE", IMAGE_POOL_WORKERS * 4))
+IMAGE_POOL_SLOW_WAIT_SEC = 2.0
+
+
+def _timed_call(fn: Callable[..., Any], args: tuple) -> tuple[float, Any]:
+    """Runs inside the worker process; returns (cpu wall seconds, result)."""
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - t0, result
+
+
+class ImageWorkPool:
+    """
+    Process pool for CPU-heavy image work shared by every Venice cog.
+    At most workers + max_queue jobs are admitted; everything beyond waits in
+    run() (backpressure) instead of piling up pickled images in the executor.
+    Falls back to a worker thread if no process pool can be started.
+    `fn` must be a module-level function (picklable).
+    """
+
+    def __init__(self, workers: int = IMAGE_POOL_WORKERS, max_queue: int = IMAGE_POOL_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._use_threads = False
+        self._slots = asyncio.Semaphore(workers + max_queue)
+        # metrics
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the bot has live threads (aiosqlite, to_thread) that fork would copy
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info("Image pool started (%d worker(s), queue %d)", self.workers, self.max_queue)
+        return self._executor
+
+    async def _dispatch(self, fn: Callable[..., Any], args: tuple) -> tuple[float, Any]:
+        if not self._use_threads:
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_executor(), _timed_call, fn, args)
+            except BrokenProcessPool:
+                logger.error("Image pool broken, restarting it")
+                self._executor = None
+                return await loop.run_in_executor(self._get_executor(), _timed_call, fn, args)
+            except (OSError, NotImplementedError, PermissionError) as e:
+                logger.warning("Image pool unavailable (%s), using threads", e)
+                self._use_threads = True
+        return await asyncio.to_thread(_timed_call, fn, args)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        t0 = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        wait = time.perf_counter() - t0
+        self.in_flight += 1
+        try:
+            run_s, result = await self._dispatch(fn, args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+        self.completed += 1
+        self.total_wait += wait
+        self.total_run += run_s
+        self.max_run = max(self.max_run, run_s)
+        name = getattr(fn, "__name__", "job")
+        if wait >= IMAGE_POOL_SLOW_WAIT_SEC:
+            logger.info("Image pool: %s waited %.1fs for a slot, ran %.2fs (%s)", name, wait, run_s, self.stats())
+        else:
+            logger.debug("Image pool: %s ran %.2fs (waited %.2fs)", name, run_s, wait)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        done = max(1, self.completed)
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_s": round(self.total_wait / done, 3),
+            "avg_run_s": round(self.total_run / done, 3),
+            "max_run_s": round(self.max_run, 3),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_pool = ImageWorkPool()
+
+
+# =================================================
+# IMAGE HANDLE
+# =================================================
+def process_image(
+    image_bytes: bytes,
+    max_bytes_list: tuple[int, ...],
+    inspect: Optional[Callable[["Image.Image"], Any]] = None,
+) -> tuple[Any, list[tuple[bytes, str]]]:
+    """
+    Worker-side: decode once, run `inspect` on the pixels, fit every budget.
+    Budgets the original already satisfies never trigger a decode.
+    """
+    fits: list[tuple[bytes, str]] = []
+    img = None
+    if inspect is not None or any(not _fits_as_is(image_bytes, m) for m in max_bytes_list):
+        img = _decode_image(image_bytes)
+    result = None
+    if inspect is not None and img is not None:
+        result = inspect(img)
+    for max_bytes in max_bytes_list:
+        if img is None:
+            fits.append(fit_image_for_discord(image_bytes, max_bytes))
+        else:
+            fits.append(_fit_decoded(img, image_bytes, max_bytes))
+    return result, fits
+
+
+class ImageHandle:
+    """
+    One image on its way generate → upscale → fit → post.
+    Carries the original bytes plus format/dimensions (header only), and caches
+    the base64 form and every Discord fit, so a request never decodes or
+    base64-encodes the same image twice. Pixels are only decoded inside the
+    image pool, once per prepare() call.
+    """
+
+    __slots__ = ("data", "ext", "_size", "_b64", "_fits")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.ext = infer_image_ext(data)
+        self._size: Optional[tuple[int, int]] = None
+        self._b64: Optional[str] = None
+        self._fits: dict[int, tuple[bytes, str]] = {}
+
+    @classmethod
+    def of(cls, image: bytes | ImageHandle) -> ImageHandle:
+        return image if isinstance(image, cls) else cls(image)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """(width, height) from the header; (0, 0) if unreadable."""
+        if self._size is None:
+            self._size = (0, 0)
+            if Image is not None:
+                with contextlib.suppress(Exception):
+                    with Image.open(io.BytesIO(self.data)) as im:
+                        self._size = im.size
+        return self._size
+
+    @property
+    def b64(self) -> str:
+        if self._b64 is None:
+            self._b64 = bytes_to_b64(self.data)
+        return self._b64
+
+    @property
+    def mime(self) -> str:
+        return infer_image_mime(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    async def prepare(
+        self,
+        max_bytes_list: list[int] | tuple[int, ...],
+        inspect: Optional[Callable[["Image.Image"], Any]] = None,
+    ) -> Any:
+        """
+        Fits all missing budgets (and runs `inspect`, a module-level function
+        taking the decoded image) in a single pool job. Returns inspect's result.
+        """
+        missing = []
+        for m in dict.fromkeys(max_bytes_list):
+            if m in self._fits:
+                continue
+            if _fits_as_is(self.data, m):
+                self._fits[m] = (self.data, self.ext)
+            else:
+                missing.append(m)
+        if not missing and inspect is None:
+            return None
+        result, fits = await image_pool.run(process_image, self.data, tuple(missing), inspect)
+        self._fits.update(zip(missing, fits))
+        return result
+
+    async def fitted(self, max_bytes: int) -> tuple[bytes, str]:
+        if max_bytes not in self._fits:
+            await self.prepare([max_bytes])
+        return self._fits[max_bytes]
+
+
+# Bytes of recently posted images, so the animate flow does not download
+# what this process just uploaded.
+POSTED_IMAGE_CACHE_BYTES = env_int("POSTED_IMAGE_CACHE_MB", 64) * 1024 * 1024
+_posted_images: "OrderedDict[int, bytes]" = OrderedDict()
+_posted_images_bytes = 0
+
+
+def remember_posted_image(message_id: int, data: bytes):
+    global _posted_images_bytes
+    if len(data) > POSTED_IMAGE_CACHE_BYTES:
+        return
+    old = _posted_images.pop(message_id, None)
+    if old is not None:
+        _posted_images_bytes -= len(old)
+    _posted_images[message_id] = data
+    _posted_images_bytes += len(data)
+    while _posted_images_bytes > POSTED_IMAGE_CACHE_BYTES and _posted_images:
+        _, dropped = _posted_images.popitem(last=False)
+        _posted_images_bytes -= len(dropped)
+
+
+# =================================================
+# GENERATION RESULT CACHE
+# =================================================
+GEN_CACHE_DIR = Path(env_str("VENICE_GEN_CACHE_DIR", "data/venice_gen_cache"))
+GEN_CACHE_TTL_SEC = env_int("VENICE_GEN_CACHE_TTL_HOURS", 24) * 3600
+GEN_CACHE_MAX_BYTES = env_int("VENICE_GEN_CACHE_MAX_MB", 512) * 1024 * 1024
+
+
+class GenerationCache:
+    """
+    On-disk LRU of Venice generation results, keyed by the SHA-256 of the
+    canonicalized request payload (file mtime is the LRU clock).
+
+    Payloads with a seed are deterministic and stay cached until TTL or the
+    byte cap evicts them. Without a seed the provider renders something new
+    every call, so such a result is only kept until it has been delivered:
+    a retry after a failed Discord post is served locally, a deliberate
+    re-roll with the same settings still reaches the provider.
+    """
+
+    def __init__(
+        self,
+        root: Path = GEN_CACHE_DIR,
+        ttl_sec: int = GEN_CACHE_TTL_SEC,
+        max_bytes: int = GEN_CACHE_MAX_BYTES,
+    ):
+        self.root = Path(root)
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(payload: dict[str, Any]) -> str:
+        canon = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def deterministic(payload: dict[str, Any]) -> bool:
+        return payload.get("seed") is not None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.bin"
+
+    def _get_sync(self, key: str) -> Optional[bytes]:
+        p = self._path(key)
+        try:
+            if time.time() - p.stat().st_mtime > self.ttl_sec:
+                p.unlink(missing_ok=True)
+                return None
+            data = p.read_bytes()
+            os.utime(p)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _put_sync(self, key: str, data: bytes):
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f"{p.name}.{uuid.uuid4().hex[:8]}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, p)
+        self._evict_sync()
+
+    def _evict_sync(self):
+        now = time.time()
+        entries: list[tuple[float, int, Path]] = []
+        total = 0
+        for p in self.root.glob("*/*.bin"):
+            with contextlib.suppress(FileNotFoundError):
+                st = p.stat()
+                if now - st.st_mtime > self.ttl_sec:
+                    p.unlink(missing_ok=True)
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, p in entries:
+            p.unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    async def get(self, payload: dict[str, Any]) -> Optional[bytes]:
+        key = self.key(payload)
+        try:
+            data = await asyncio.to_thread(self._get_sync, key)
+        except OSError as e:
+            logger.warning("Generation cache read failed: %s", e)
+            data = None
+        if data is None or not looks_like_image(data):
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(
+            "Generation cache hit %s model=%s (%d hit(s), %d miss(es))",
+            key[:12], payload.get("model"), self.hits, self.misses,
+        )
+        return data
+
+    async def put(self, payload: dict[str, Any], data: bytes):
+        if not data or len(data) > self.max_bytes:
+            return
+        try:
+            await asyncio.to_thread(self._put_sync, self.key(payload), data)
+        except OSError as e:
+            logger.warning("Generation cache write failed: %s", e)
+
+    async def release(self, payload: dict[str, Any]):
+        """The result was delivered; only deterministic payloads stay cached."""
+        if self.deterministic(payload):
+            return
+        with contextlib.suppress(OSError):
+            await asyncio.to_thread(self._path(self.key(payload)).unlink, True)
+
+
+generation_cache = GenerationCache()
+
+
 # =================================================
 # DISCORD UPLOAD
 # =================================================
@@ -523,17 +1677,117 @@ def discord_upload_limit_bytes(interaction: discord.Interaction) -> int:
     return max(candidates) if candidates else DISCORD_UPLOAD_LIMIT_FALLBACK_MB * 1024 * 1024
 
 
-def fit_image_for_discord(image_bytes: bytes, max_bytes: int) -> tuple[bytes, str]:
-    target = max(256 * 1024, int(max_bytes - DISCORD_UPLOAD_SAFETY_BYTES))
+def channel_upload_limit_bytes(channel: Any) -> int:
+    """discord_upload_limit_bytes for posts made without an interaction."""
+    if DISCORD_UPLOAD_LIMIT_FORCE_MB > 0:
+        return DISCORD_UPLOAD_LIMIT_FORCE_MB * 1024 * 1024
+    guild = getattr(channel, "guild", None)
+    limit = getattr(guild, "filesize_limit", None) if guild else None
+    return limit if isinstance(limit, int) and limit > 0 else DISCORD_UPLOAD_LIMIT_FALLBACK_MB * 1024 * 1024
+
+
+# Predictive fit: one fast probe encode gives the image's bytes-per-pixel at
+# FIT_PROBE_QUALITY; _JPEG_REL_SIZE (JPEG size relative to quality 85 at the
+# same pixel count, averaged over typical renders) turns that into a predicted
+# size for any quality/scale. Only has to be roughly right - a short binary
+# search over quality corrects the rest. Typical fit: 2-3 encodes.
+_JPEG_REL_SIZE = (
+    (40, 0.36), (50, 0.42), (60, 0.49), (65, 0.54), (70, 0.60), (75, 0.68),
+    (80, 0.80), (85, 1.00), (88, 1.18), (90, 1.32), (92, 1.45), (95, 1.85),
+)
+FIT_PROBE_QUALITY = 85
+FIT_PROBE_PIXELS = 1024 * 1024
+FIT_MAX_QUALITY = 92
+FIT_KEEP_SIZE_MIN_QUALITY = 50  # below this, downscale at FIT_RESIZE_QUALITY instead
+FIT_RESIZE_QUALITY = 80
+FIT_MIN_QUALITY = 40
+FIT_MAX_SIDE = 4096
+FIT_MIN_SIDE = 512
+FIT_HEADROOM = 0.94
+FIT_SEARCH_STEPS = 3
+
+
+def _jpeg_rel_size(quality: int) -> float:
+    pts = _JPEG_REL_SIZE
+    if quality <= pts[0][0]:
+        return pts[0][1]
+    for (q0, r0), (q1, r1) in zip(pts, pts[1:]):
+        if quality <= q1:
+            return r0 + (r1 - r0) * (quality - q0) / (q1 - q0)
+    return pts[-1][1]
+
+
+def _encode_jpeg(img: Any, quality: int, *, final: bool = True) -> bytes:
+    buf = io.BytesIO()
+    if final:
+        img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _predict_jpeg_plan(pixels: float, bpp_ref: float, target: int) -> tuple[float, int]:
+    """(pixel-count factor, quality) predicted to land just under target."""
+    budget = target * FIT_HEADROOM
+    for q in range(FIT_MAX_QUALITY, FIT_KEEP_SIZE_MIN_QUALITY - 1, -2):
+        if pixels * bpp_ref * _jpeg_rel_size(q) <= budget:
+            return 1.0, q
+    return budget / (pixels * bpp_ref * _jpeg_rel_size(FIT_RESIZE_QUALITY)), FIT_RESIZE_QUALITY
+
+
+def _search_jpeg_quality(
+    img: Any, lo: int, hi: int, target: int, first: Optional[int] = None,
+) -> tuple[Optional[bytes], int]:
+    """Highest quality in [lo, hi] that fits (bounded binary search). `first`
+    replaces the first midpoint with a model prediction; a fit within 15% of
+    the target ends the search early."""
+    best: Optional[bytes] = None
+    encodes = 0
+    while lo <= hi and encodes < FIT_SEARCH_STEPS:
+        mid = first if first is not None and encodes == 0 and lo <= first <= hi else (lo + hi) // 2
+        data = _encode_jpeg(img, mid)
+        encodes += 1
+        if len(data) <= target:
+            best, lo = data, mid + 1
+            if len(data) >= target * 0.85:
+                break
+        else:
+            hi = mid - 1
+    return best, encodes
+
+
+def _fit_target(max_bytes: int) -> int:
+    return max(256 * 1024, int(max_bytes - DISCORD_UPLOAD_SAFETY_BYTES))
+
+
+def _fits_as_is(image_bytes: bytes, max_bytes: int) -> bool:
+    return len(image_bytes) <= _fit_target(max_bytes) and looks_like_image(image_bytes)
 
-    if len(image_bytes) <= target and looks_like_image(image_bytes):
-        return image_bytes, infer_image_ext(image_bytes)
-    if Image is None:
-        return image_bytes, infer_image_ext(image_bytes)
 
+def _decode_image(image_bytes: bytes) -> Optional["Image.Image"]:
+    if Image is None:
+        return None
     try:
         img = Image.open(io.BytesIO(image_bytes))
+        img.load()
+        return img
     except Exception:
+        return None
+
+
+def fit_image_for_discord(image_bytes: bytes, max_bytes: int) -> tuple[bytes, str]:
+    if _fits_as_is(image_bytes, max_bytes):
+        return image_bytes, infer_image_ext(image_bytes)
+    img = _decode_image(image_bytes)
+    if img is None:
+        return image_bytes, infer_image_ext(image_bytes)
+    return _fit_decoded(img, image_bytes, max_bytes)
+
+
+def _fit_decoded(img: "Image.Image", image_bytes: bytes, max_bytes: int) -> tuple[bytes, str]:
+    """fit_image_for_discord on an already decoded image (img is not modified)."""
+    target = _fit_target(max_bytes)
+    if _fits_as_is(image_bytes, max_bytes):
         return image_bytes, infer_image_ext(image_bytes)
 
     if img.mode not in ("RGB", "L"):
@@ -547,47 +1801,161 @@ def fit_image_for_discord(image_bytes: bytes, max_bytes: int) -> tuple[bytes, st
         if len(data) < len(best_data):
             best_data, best_ext = data, ext
 
-    for max_side in (4096, 3072, 2560, 2048, 1792, 1536, 1280, 1024, 896, 768, 640, 512):
-        work = img.copy()
-        work.thumbnail((max_side, max_side), resample)
-        for q in (92, 86, 80, 74, 68, 62, 56, 50, 44, 38, 32, 28, 24):
-            with contextlib.suppress(Exception):
-                buf = io.BytesIO()
-                work.save(buf, format="JPEG", quality=q, optimize=True, progressive=True)
-                data = buf.getvalue()
-                remember(data, "jpg")
-                if len(data) <= target:
-                    return data, "jpg"
-
-    for max_side in (3072, 2560, 2048, 1536, 1280, 1024, 896, 768, 640, 512):
-        work = img.copy()
-        work.thumbnail((max_side, max_side), resample)
-        for q in (90, 80, 70, 60, 50, 40, 30, 24):
-            with contextlib.suppress(Exception):
-                buf = io.BytesIO()
-                work.save(buf, format="WEBP", quality=q, method=6)
-                data = buf.getvalue()
-                remember(data, "webp")
-                if len(data) <= target:
-                    return data, "webp"
+    src = img
+    if max(src.size) > FIT_MAX_SIDE:
+        src = img.copy()
+        src.thumbnail((FIT_MAX_SIDE, FIT_MAX_SIDE), resample)
+
+    encodes = 0
+    try:
+        # Probe on a ~1 MP box-reduced copy: a fraction of a full encode, and
+        # its bytes-per-pixel errs on the high side (denser detail).
+        k = max(1, int((src.width * src.height / FIT_PROBE_PIXELS) ** 0.5))
+        probe_img = src.reduce(k) if k > 1 else src
+        probe = _encode_jpeg(probe_img, FIT_PROBE_QUALITY, final=False)
+        encodes += 1
+        bpp = len(probe) / (probe_img.width * probe_img.height)
+        work = src
+        for _ in range(3):
+            factor, quality = _predict_jpeg_plan(work.width * work.height, bpp, target)
+            if factor < 1.0:
+                side = max(FIT_MIN_SIDE, int(max(work.size) * (factor ** 0.5)))
+                if side < max(work.size):
+                    work = src.copy()
+                    work.thumbnail((side, side), resample)
+            data = _encode_jpeg(work, quality)
+            encodes += 1
+            remember(data, "jpg")
+            if len(data) <= target:
+                return data, "jpg"
+
+            # Prediction was off for this image: recalibrate from what we
+            # actually got and search quality at this size around the new guess.
+            bpp = len(data) / (work.width * work.height) / _jpeg_rel_size(quality)
+            factor, guess = _predict_jpeg_plan(work.width * work.height, bpp, target)
+            found, n = _search_jpeg_quality(
+                work, FIT_MIN_QUALITY, quality - 1, target,
+                first=guess if factor >= 1.0 else None,
+            )
+            encodes += n
+            if found is not None:
+                remember(found, "jpg")
+                return found, "jpg"
+            if max(work.size) <= FIT_MIN_SIDE:
+                break
+            # Even the lowest quality tried is too big: shrink.
+            work_side = max(FIT_MIN_SIDE, int(max(work.size) * 0.85))
+            work = src.copy()
+            work.thumbnail((work_side, work_side), resample)
+
+        # Last resort: WebP usually beats JPEG at very low budgets.
+        with contextlib.suppress(Exception):
+            buf = io.BytesIO()
+            work.save(buf, format="WEBP", quality=60, method=4)
+            encodes += 1
+            remember(buf.getvalue(), "webp")
+    except Exception as e:
+        logger.warning("fit_image_for_discord failed after %d encode(s): %s", encodes, e)
+    finally:
+        logger.debug("fit_image_for_discord: %d encode(s), target=%d", encodes, target)
 
     return best_data, best_ext
 
 
+# Upload budget ladder (fraction of the Discord limit) tried on 413s.
+UPLOAD_RETRY_SCALES = (1.00, 0.90, 0.80, 0.70, 0.60, 0.50, 0.40, 0.30, 0.22, 0.18)
+
+
+class UploadLimitTracker:
+    """
+    Per-guild upload ceiling learned from 413 / 40005 rejections.
+    A ceiling is tied to the declared limit and boost tier it was learned
+    under (a boost change resets it) and expires after
+    DISCORD_UPLOAD_CEILING_TTL_SEC. The first upload attempt starts at the
+    largest ladder budget below the ceiling instead of at the declared limit.
+    """
+
+    def __init__(self):
+        # guild_id -> (declared limit, premium tier, ceiling, learned_at)
+        self._ceilings: dict[int, tuple[int, int, int, float]] = {}
+        self.uploads = 0
+        self.first_try = 0
+        self.retries = 0
+        self.failed = 0
+
+    @staticmethod
+    def _key(interaction: discord.Interaction) -> tuple[int, int, int]:
+        guild = interaction.guild
+        return (
+            guild.id if guild else 0,
+            discord_upload_limit_bytes(interaction),
+            int(getattr(guild, "premium_tier", 0) or 0) if guild else 0,
+        )
+
+    def ceiling(self, interaction: discord.Interaction) -> int:
+        gid, declared, tier = self._key(interaction)
+        row = self._ceilings.get(gid)
+        if row is None or row[:2] != (declared, tier) or time.time() - row[3] > DISCORD_UPLOAD_CEILING_TTL_SEC:
+            return declared
+        return row[2]
+
+    def targets(self, interaction: discord.Interaction) -> list[int]:
+        # The ladder hangs off the learned ceiling, so a guild whose real limit
+        # is far below the declared one still gets a full set of budgets.
+        base = self.ceiling(interaction)
+        return list(dict.fromkeys(max(256 * 1024, int(base * scale)) for scale in UPLOAD_RETRY_SCALES))
+
+    def rejected(self, interaction: discord.Interaction, size: int):
+        gid, declared, tier = self._key(interaction)
+        ceiling = min(self.ceiling(interaction), max(1, size - 1))
+        self._ceilings[gid] = (declared, tier, ceiling, time.time())
+        logger.info("Upload of %d bytes rejected in guild %s; ceiling now %d", size, gid, ceiling)
+
+    def record(self, retries: int, ok: bool):
+        self.uploads += 1
+        self.retries += retries
+        if not ok:
+            self.failed += 1
+        elif retries == 0:
+            self.first_try += 1
+        if retries:
+            logger.info("Image upload needed %d retr%s (%s)", retries, "y" if retries == 1 else "ies", self.stats())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "uploads": self.uploads,
+            "first_try_ok": self.first_try,
+            "retries": self.retries,
+            "failed": self.failed,
+            "retry_rate": round(self.retries / max(1, self.uploads), 3),
+            "guild_ceilings": len(self._ceilings),
+        }
+
+
+upload_limits = UploadLimitTracker()
+
+
+def discord_upload_targets(interaction: discord.Interaction) -> list[int]:
+    """Byte budgets to try in order, starting below any learned ceiling."""
+    return upload_limits.targets(interaction)
+
+
 async def send_image_with_compression(
     channel: discord.abc.Messageable,
     interaction: discord.Interaction,
-    image_bytes: bytes,
+    image_bytes: bytes | ImageHandle,
     embed: discord.Embed,
     content: str,
     filename_prompt: str,
     filename_fallback: str = "image",
 ) -> Optional[discord.Message]:
-    upload_limit = discord_upload_limit_bytes(interaction)
+    image = ImageHandle.of(image_bytes)
+    pending = discord_upload_targets(interaction)
+    retries = 0
 
-    for scale in (1.00, 0.90, 0.80, 0.70, 0.60, 0.50, 0.40, 0.30, 0.22, 0.18):
-        target = max(256 * 1024, int(upload_limit * scale))
-        data, ext = fit_image_for_discord(image_bytes, target)
+    while pending and retries < len(UPLOAD_RETRY_SCALES):
+        target = pending.pop(0)
+        data, ext = await image.fitted(target)
         fname = make_safe_filename(filename_prompt, ext=ext, fallback=filename_fallback)
 
         fp = io.BytesIO(data)
@@ -595,7 +1963,7 @@ async def send_image_with_compression(
         embed.set_image(url=f"attachment://{fname}")
 
         try:
-            return await channel.send(
+            posted = await channel.send(
                 content=content,
                 embed=embed,
                 file=discord.File(fp, filename=fname),
@@ -603,8 +1971,21 @@ async def send_image_with_compression(
             )
         except discord.HTTPException as e:
             if e.status == 413 or getattr(e, "code", None) == 40005:
+                upload_limits.rejected(interaction, len(data))
+                # Budgets at or above the rejected size cannot succeed either.
+                pending = [t for t in pending if t < len(data)]
+                if not retries or not pending:
+                    # Re-plan from the new ceiling and fit every budget of
+                    # that ladder from a single decode.
+                    pending = [t for t in discord_upload_targets(interaction) if t < len(data)]
+                    await image.prepare(pending)
+                retries += 1
                 continue
             raise
+        upload_limits.record(retries, ok=True)
+        remember_posted_image(posted.id, data)
+        return posted
+    upload_limits.record(retries, ok=False)
     return None
 
 
@@ -627,6 +2008,9 @@ async def extract_image_bytes_from_message(
     msg: discord.Message,
     shared_session: Optional[aiohttp.ClientSession] = None,
 ) -> Optional[bytes]:
+    cached = _posted_images.get(msg.id)
+    if cached is not None:
+        return cached
     for a in msg.attachments:
         with contextlib.suppress(Exception):
             raw = await a.read()
@@ -641,7 +2025,7 @@ async def extract_image_bytes_from_message(
     session = shared_session
     if session is None or session.closed:
         own = True
-        session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=25))
+        session = http_client.client_session(aiohttp.ClientTimeout(total=25))
 
     try:
         for url in urls[:8]:
@@ -903,8 +2287,11 @@ def build_progress_embed(
     quota_unit: str = "",
     footer: Optional[str] = None,
     footer_icon: Optional[str] = None,
+    queue_position: Optional[int] = None,
 ) -> discord.Embed:
     used = int(quota_state.get("used", 0))
+    if queue_position:
+        status_lines = [f"⏳ Queued - position **{queue_position}**", *status_lines]
     limit = int(quota_state.get("limit", 0))
     remaining = int(quota_state.get("remaining", 0))
 
@@ -963,6 +2350,159 @@ def build_generation_success_text(
     return "\n".join(lines)
 
 
+# =================================================
+# PROGRESS REPORTER
+# =================================================
+# All progress embeds (image, face, video) are edited through
+# progress_reporter so concurrent renders share one edit budget.
+PROGRESS_EDITS_PER_SEC = max(0.5, env_int("PROGRESS_EDITS_PER_10S", 20) / 10.0)
+PROGRESS_MIN_INTERVAL_SEC = 1.5
+PROGRESS_MAX_INTERVAL_SEC = 12.0
+# An edit slower than this was held back by discord.py's rate limiter.
+PROGRESS_SLOW_EDIT_SEC = 1.0
+PROGRESS_STATE_TTL_SEC = 15 * 60
+
+
+def _edit_signature(kwargs: dict[str, Any]) -> str:
+    """Comparable form of message.edit kwargs; embed timestamps are ignored."""
+    parts: dict[str, Any] = {}
+    for k, v in kwargs.items():
+        if isinstance(v, discord.Embed):
+            v = v.to_dict()
+            v.pop("timestamp", None)
+        parts[k] = v
+    return json.dumps(parts, sort_keys=True, default=str)
+
+
+class _ProgressState:
+    __slots__ = ("message", "pending", "sent_sig", "last_sent", "sending", "task")
+
+    def __init__(self, message: discord.Message):
+        self.message = message
+        self.pending: Optional[dict[str, Any]] = None
+        self.sent_sig: Optional[str] = None
+        self.last_sent = 0.0
+        self.sending = False
+        self.task: Optional[asyncio.Task] = None
+
+
+class ProgressReporter:
+    """
+    Coalesced progress-message edits.
+
+    report() only stores the latest edit for a message; one flusher task per
+    message sends it once the message's interval has passed, so intermediate
+    states that were superseded in the meantime are never sent. Edits that
+    would not change the message (embed timestamp aside) are skipped.
+
+    The interval is each active message's fair share of PROGRESS_EDITS_PER_SEC,
+    at least PROGRESS_MIN_INTERVAL_SEC, and is stretched while edits come back
+    slow or rate-limited (the bucket is nearly spent) and relaxed again once
+    they are fast.
+
+    Call settle() before editing or deleting the message directly so a late
+    coalesced edit cannot overwrite the final state.
+    """
+
+    def __init__(self, edits_per_sec: float = PROGRESS_EDITS_PER_SEC):
+        self.edits_per_sec = edits_per_sec
+        self._states: dict[int, _ProgressState] = {}
+        self._penalty = 1.0
+        # metrics
+        self.sent = 0
+        self.coalesced = 0
+        self.skipped = 0
+
+    def _active(self) -> int:
+        return sum(1 for st in self._states.values() if st.task is not None and not st.task.done())
+
+    def interval(self) -> float:
+        fair = max(1, self._active()) / self.edits_per_sec
+        return min(PROGRESS_MAX_INTERVAL_SEC, max(PROGRESS_MIN_INTERVAL_SEC, fair) * self._penalty)
+
+    def _prune(self, now: float):
+        stale = [
+            mid for mid, st in self._states.items()
+            if (st.task is None or st.task.done()) and now - st.last_sent > PROGRESS_STATE_TTL_SEC
+        ]
+        for mid in stale:
+            del self._states[mid]
+
+    def report(self, message: Optional[discord.Message], **edit_kwargs: Any):
+        """Queue `message.edit(**edit_kwargs)`; replaces any edit still waiting."""
+        if message is None:
+            return
+        now = time.monotonic()
+        self._prune(now)
+        st = self._states.get(message.id)
+        if st is None:
+            st = self._states[message.id] = _ProgressState(message)
+        if st.pending is not None:
+            self.coalesced += 1
+        st.pending = edit_kwargs
+        if st.task is None or st.task.done():
+            st.task = asyncio.create_task(self._flush(st))
+
+    async def _flush(self, st: _ProgressState):
+        while st.pending is not None:
+            wait = st.last_sent + self.interval() - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            kwargs, st.pending = st.pending, None
+            sig = _edit_signature(kwargs)
+            if sig == st.sent_sig:
+                self.skipped += 1
+                continue
+            started = time.monotonic()
+            st.sending = True
+            try:
+                await st.message.edit(**kwargs)
+                st.sent_sig = sig
+                self.sent += 1
+                slow = time.monotonic() - started > PROGRESS_SLOW_EDIT_SEC
+            except discord.NotFound:
+                st.pending = None
+                return
+            except discord.HTTPException as e:
+                slow = e.status == 429
+            except Exception:
+                slow = False
+            finally:
+                st.sending = False
+            st.last_sent = time.monotonic()
+            if slow:
+                self._penalty = min(8.0, self._penalty * 2.0)
+            else:
+                self._penalty = max(1.0, self._penalty * 0.8)
+
+    async def settle(self, message: Optional[discord.Message]):
+        """Drop the waiting edit for `message` and wait out one in flight."""
+        if message is None:
+            return
+        st = self._states.pop(message.id, None)
+        if st is None:
+            return
+        st.pending = None
+        if st.task is None or st.task.done():
+            return
+        if not st.sending:
+            st.task.cancel()
+        await asyncio.wait([st.task])
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "active": self._active(),
+            "interval_s": round(self.interval(), 2),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "skipped": self.skipped,
+        }
+
+
+progress_reporter = ProgressReporter()
+
+
 # =================================================
 # PROGRESS LOOP
 # =================================================
@@ -974,12 +2514,34 @@ async def run_with_progress(
     end_percent: int,
     make_embed: Callable[[int, float], discord.Embed],
     min_est: float = 6.0,
+    ticket: Optional[VeniceTicket] = None,
 ) -> float:
+    """
+    With a scheduler ticket the bar holds at start_percent while the request
+    is queued (the embed factory shows ticket.position) and the ETA clock
+    only starts once the slot is granted.
+
+    Edits go through progress_reporter; the message is settled before
+    returning, so the caller may edit or delete it directly.
+    """
     started = time.monotonic()
     last_percent = -1
+    last_position: Optional[int] = None
     span = max(0, end_percent - start_percent)
 
     while not task.done():
+        if ticket is not None and ticket.waiting:
+            started = time.monotonic()
+            position = ticket.position
+            if position != last_position:
+                last_position = position
+                last_percent = start_percent
+                progress_reporter.report(progress_msg, content=None, embed=make_embed(start_percent, est))
+            await asyncio.sleep(0.8)
+            continue
+        if last_position is not None:
+            last_position = None
+            last_percent = -1
         elapsed = time.monotonic() - started
         if elapsed > est * 1.15:
             est = elapsed * 1.20
@@ -989,11 +2551,10 @@ async def run_with_progress(
 
         if percent != last_percent:
             last_percent = percent
-            if progress_msg:
-                with contextlib.suppress(Exception):
-                    await progress_msg.edit(content=None, embed=make_embed(percent, eta))
+            progress_reporter.report(progress_msg, content=None, embed=make_embed(percent, eta))
         await asyncio.sleep(0.8)
 
+    await progress_reporter.settle(progress_msg)
     return time.monotonic() - started
 
 
@@ -1,20 +1,17 @@
 # video_cog.py
 import asyncio
 import contextlib
-import io
-import json
 import logging
 import os
-import re
-import uuid
-from datetime import timedelta
+import time
+from pathlib import Path
 from typing import Any, Optional
 
-import aiohttp
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
+import http_client
 from venice_shared import (
     MAX_VIDEO_RENDER_SECONDS,
     SERVER_ANIM_ICON,
@@ -25,42 +22,42 @@ from venice_shared import (
     add_rating_reactions,
     build_generation_success_text,
     build_progress_embed,
-    bytes_to_data_url,
-    closest_aspect_ratio,
     codeblock_safe,
-    extract_urls_from_payload,
     format_reset_line,
     get_member_tier,
     get_model_durations,
-    get_model_resolution,
     get_quota_store,
     get_video_budget_for_member,
-    get_video_profile,
     looks_like_image,
-    looks_like_video,
     next_tier,
+    progress_reporter,
     repost_starter_for_channel,
     safe_int,
     sanitize_error_text,
     send_ephemeral,
     trim,
     utc_now,
+    venice_scheduler,
     video_tier_line,
 )
+from video_engine import (
+    VENICE_API_KEY,
+    VENICE_VIDEO_QUEUE_URL,
+    VENICE_VIDEO_RETRIEVE_URL,
+    deliver_video,
+    discard_job_media,
+    queue_i2v,
+    resolution_for_model,
+    video_jobs,
+    video_journal,
+)
 
 load_dotenv()
-logger = logging.getLogger("venice_video_cog")
+logger = logging.getLogger("video_cog")
 
 # =================================================
 # ENV
 # =================================================
-VENICE_API_KEY = os.getenv("VENICE_API_KEY")
-VENICE_VIDEO_QUEUE_URL = os.getenv("VENICE_VIDEO_QUEUE_URL")
-VENICE_VIDEO_RETRIEVE_URL = os.getenv("VENICE_VIDEO_RETRIEVE_URL")
-
-# Global fallback resolution for models not listed in VIDEO_MODEL_PROFILES.
-VENICE_VIDEO_RESOLUTION_FALLBACK = os.getenv("VENICE_VIDEO_RESOLUTION", "720p")
-
 # Legacy fallback when animate_image_to_video is called without model_id.
 VENICE_VIDEO_I2V_MODEL_DEFAULT = os.getenv(
     "VENICE_VIDEO_I2V_MODEL", VENICE_VIDEO_I2V_MODEL_ENHANCED
@@ -69,12 +66,6 @@ VENICE_VIDEO_I2V_MODEL_DEFAULT = os.getenv(
 # =================================================
 # SETTINGS
 # =================================================
-VIDEO_POLL_SECONDS = 6
-VIDEO_HARD_TIMEOUT_SECONDS = 1800
-VIDEO_ADAPTIVE_TIMEOUT_SECONDS = 720
-VIDEO_MAX_CONSECUTIVE_5XX = 8
-VIDEO_5XX_WINDOW_SECONDS = 180
-
 # Display renames for known model IDs.
 VIDEO_MODEL_RENAMES = {
     VENICE_VIDEO_I2V_MODEL_ENHANCED: "WAN27-Enh 🔞",
@@ -90,119 +81,33 @@ PROGRESS_EMBED_TITLE = "🎬 VIDEO RENDER"
 # =================================================
 # HELPERS
 # =================================================
-def _parse_retry_after_seconds(headers: Any, text: str) -> int:
-    retry_after = 0
-    try:
-        raw = headers.get("Retry-After")
-        if raw is not None:
-            retry_after = int(str(raw).strip())
-    except Exception:
-        retry_after = 0
-
-    if retry_after <= 0:
-        m = re.search(r"retry(?:\s+after)?\s*[:=]?\s*(\d+)", text or "", flags=re.IGNORECASE)
-        if m:
-            retry_after = int(m.group(1))
-
-    return max(2, min(retry_after if retry_after > 0 else 20, 90))
-
-
-def _extract_queue_id(payload: Any) -> Optional[str]:
-    if not isinstance(payload, dict):
-        return None
-    for key in ("queue_id", "id"):
-        v = payload.get(key)
-        if isinstance(v, str) and v:
-            return v
-    nested = payload.get("data")
-    if isinstance(nested, dict):
-        for key in ("queue_id", "id"):
-            v = nested.get(key)
-            if isinstance(v, str) and v:
-                return v
-    return None
-
-
 def _video_model_label(model_name: str) -> str:
     key = (model_name or "").strip()
     return VIDEO_MODEL_RENAMES.get(key, key)
 
 
-def _resolution_for_model(model_id: str) -> str:
-    """Per-model resolution from the shared profile table, with env fallback."""
-    return get_model_resolution(model_id) or VENICE_VIDEO_RESOLUTION_FALLBACK
-
-
-def _resolve_aspect_ratio(model_id: str, source_aspect: str) -> Optional[str]:
-    """
-    For models that require aspect_ratio (e.g. LTX), pick the value from the
-    model's allowed list that best matches the source image's ratio. Returns
-    None for models that don't send an aspect_ratio field.
-    """
-    profile = get_video_profile(model_id)
-    if not profile.get("require_aspect_ratio"):
-        return None
-    allowed = profile.get("allowed_aspect_ratios") or []
-    if not allowed:
-        return None
-    return closest_aspect_ratio(source_aspect or "16:9", allowed)
-
-
 # =================================================
 # COG
 # =================================================
 class VeniceVideoCog(commands.Cog):
+    """
+    Discord front-end for video renders: quota, progress embeds and posts.
+    Queueing, polling, downloading and upload fitting live in video_engine.
+    """
+
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.session: Optional[aiohttp.ClientSession] = None
-        self.session_lock = asyncio.Lock()
-
-        self.global_busy = False
-        self.global_busy_lock = asyncio.Lock()
-
-        self._active_users: set[int] = set()
-        self._active_users_lock = asyncio.Lock()
-
         self.video_quota = get_quota_store(VIDEO_QUOTA_FILE)
+        self._resume_task: Optional[asyncio.Task] = None
 
     # ---------- lifecycle ----------
-    async def _ensure_session(self):
-        async with self.session_lock:
-            if self.session is None or self.session.closed:
-                self.session = aiohttp.ClientSession(
-                    timeout=aiohttp.ClientTimeout(total=120),
-                    connector=aiohttp.TCPConnector(limit=40, ttl_dns_cache=300),
-                )
-
     async def cog_load(self):
-        await self._ensure_session()
+        self._resume_task = asyncio.create_task(self._resume_pending_jobs())
 
     def cog_unload(self):
-        if self.session and not self.session.closed:
-            asyncio.create_task(self.session.close())
-
-    # ---------- locks ----------
-    async def _try_begin_global(self) -> bool:
-        async with self.global_busy_lock:
-            if self.global_busy:
-                return False
-            self.global_busy = True
-            return True
-
-    async def _end_global(self):
-        async with self.global_busy_lock:
-            self.global_busy = False
-
-    async def _try_lock_user(self, user_id: int) -> bool:
-        async with self._active_users_lock:
-            if user_id in self._active_users:
-                return False
-            self._active_users.add(user_id)
-            return True
-
-    async def _unlock_user(self, user_id: int):
-        async with self._active_users_lock:
-            self._active_users.discard(user_id)
+        if self._resume_task is not None:
+            self._resume_task.cancel()
+        self.video_quota.close()
 
     # ---------- quota ----------
     async def get_remaining_info(self, guild_id: int, member: discord.Member) -> dict[str, int]:
@@ -228,6 +133,7 @@ class VeniceVideoCog(commands.Cog):
         stage_text: str,
         quota: dict[str, int],
         model_id: str,
+        queue_position: Optional[int] = None,
     ) -> discord.Embed:
         return build_progress_embed(
             title=PROGRESS_EMBED_TITLE,
@@ -241,8 +147,9 @@ class VeniceVideoCog(commands.Cog):
             quota_unit="s",
             footer=(
                 f"🎞️ {_video_model_label(model_id)} "
-                f"• 📺 {_resolution_for_model(model_id)}"
+                f"• 📺 {resolution_for_model(model_id)}"
             ),
+            queue_position=queue_position,
         )
 
     def _result_embed(
@@ -257,7 +164,7 @@ class VeniceVideoCog(commands.Cog):
         embed.set_footer(
             text=(
                 f"🎞️ {_video_model_label(model_id)} "
-                f"• 📺 {_resolution_for_model(model_id)} • ⏱️ {seconds}s"
+                f"• 📺 {resolution_for_model(model_id)} • ⏱️ {seconds}s"
             ),
             icon_url=guild_icon_url,
         )
@@ -290,179 +197,15 @@ class VeniceVideoCog(commands.Cog):
     async def _safe_edit_progress(
         self, message: Optional[discord.Message], embed: discord.Embed
     ):
-        if message:
-            with contextlib.suppress(Exception):
-                await message.edit(embed=embed)
+        progress_reporter.report(message, embed=embed)
 
     async def _safe_delete_message(self, message: Optional[discord.Message]):
+        await progress_reporter.settle(message)
         if message:
             with contextlib.suppress(Exception):
                 await message.delete()
 
-    # ---------- media fetch ----------
-    async def _fetch_media_from_url(
-        self, url: str, headers: dict[str, str], visited: Optional[set[str]] = None
-    ):
-        if not isinstance(url, str) or not url.startswith("http"):
-            return None, None
-        visited = visited or set()
-        if url in visited or len(visited) > 12:
-            return None, None
-        visited.add(url)
-
-        await self._ensure_session()
-        assert self.session is not None
-
-        timeout = aiohttp.ClientTimeout(total=45, connect=12, sock_read=35)
-        for use_auth in (True, False):
-            try:
-                req_headers = dict(headers) if use_auth else {}
-                async with self.session.get(url, headers=req_headers, timeout=timeout) as resp:
-                    body = await resp.read()
-                    ctype = (resp.headers.get("content-type") or "").lower()
-                    if resp.status >= 400 or not body:
-                        continue
-
-                    if "video" in ctype or looks_like_video(body):
-                        return body, "video"
-                    if "image" in ctype or looks_like_image(body):
-                        return body, "image"
-
-                    if "json" in ctype:
-                        try:
-                            nested = json.loads(body.decode("utf-8", errors="ignore"))
-                        except Exception:
-                            nested = None
-                        if nested:
-                            for nested_url in extract_urls_from_payload(nested):
-                                data, kind = await self._fetch_media_from_url(
-                                    nested_url, headers, visited
-                                )
-                                if data:
-                                    return data, kind
-            except Exception:
-                continue
-
-        return None, None
-
-    # ---------- provider: queue ----------
-    async def _queue_i2v(
-        self,
-        model_id: str,
-        image_url: str,
-        image_bytes: Optional[bytes],
-        prompt: str,
-        seconds: int,
-        aspect: str,
-    ) -> tuple[Optional[str], Optional[dict[str, Any]], Optional[str], str]:
-        if not VENICE_VIDEO_QUEUE_URL:
-            return None, None, "VENICE_VIDEO_QUEUE_URL is missing.", "noid"
-        if not VENICE_API_KEY:
-            return None, None, "VENICE_API_KEY is missing.", "noid"
-
-        # Canonical field per Venice docs is 'image_url', which accepts both
-        # http URLs and data URLs. Strict validators (LTX) reject the legacy
-        # 'image' key, so we drop it entirely.
-        image_variants: list[dict[str, Any]] = []
-        if image_url and image_url.startswith("http"):
-            image_variants.append({"image_url": image_url})
-        if image_bytes and looks_like_image(image_bytes):
-            image_variants.append({"image_url": bytes_to_data_url(image_bytes)})
-
-        if not image_variants:
-            return None, None, "No usable source image (neither URL nor bytes).", "noid"
-
-        await self._ensure_session()
-        assert self.session is not None
-
-        headers = {
-            "Authorization": f"Bearer {VENICE_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        request_id = uuid.uuid4().hex[:8]
-        resolution = _resolution_for_model(model_id)
-        base_payload: dict[str, Any] = {
-            "model": model_id,
-            "prompt": prompt,
-            "resolution": resolution,
-            "duration": f"{seconds}s",
-        }
-
-        # Some models (LTX) require aspect_ratio and restrict its allowed values.
-        aspect_for_payload = _resolve_aspect_ratio(model_id, aspect)
-        if aspect_for_payload:
-            base_payload["aspect_ratio"] = aspect_for_payload
-
-        timeout = aiohttp.ClientTimeout(total=45, connect=10, sock_read=40)
-        last_error = "Queue request failed."
-
-        for attempt in range(2):
-            for variant_idx, variant in enumerate(image_variants):
-                payload = {**base_payload, **variant}
-                try:
-                    async with self.session.post(
-                        VENICE_VIDEO_QUEUE_URL, headers=headers, json=payload, timeout=timeout
-                    ) as resp:
-                        text = await resp.text()
-                        logger.info(
-                            "[VID %s] queue status=%s attempt=%s variant=%s(%s) "
-                            "model=%s res=%s ar=%s",
-                            request_id, resp.status, attempt + 1,
-                            variant_idx, next(iter(variant)),
-                            model_id, resolution,
-                            base_payload.get("aspect_ratio", "-"),
-                        )
-
-                        if resp.status in (400, 415, 422):
-                            last_error = (
-                                f"Queue error ({resp.status}): {sanitize_error_text(text)}"
-                            )
-                            if variant_idx < len(image_variants) - 1:
-                                continue
-                            return None, {"raw": text}, last_error, request_id
-
-                        if resp.status in (401, 403, 404):
-                            return (
-                                None, {"raw": text},
-                                f"Queue error ({resp.status}): {sanitize_error_text(text)}",
-                                request_id,
-                            )
-
-                        if resp.status == 429:
-                            if "too many failed attempts" in (text or "").lower():
-                                return (
-                                    None, {"raw": text},
-                                    f"Provider rate limit: {sanitize_error_text(text)}",
-                                    request_id,
-                                )
-                            await asyncio.sleep(_parse_retry_after_seconds(resp.headers, text))
-                            continue
-
-                        if resp.status >= 500:
-                            last_error = f"Provider error ({resp.status})"
-                            await asyncio.sleep(2 + attempt * 2)
-                            continue
-
-                        try:
-                            data = json.loads(text) if text else {}
-                        except Exception:
-                            data = {"raw": text}
-
-                        queue_id = _extract_queue_id(data)
-                        if queue_id:
-                            return queue_id, data, None, request_id
-
-                        last_error = "Queue response did not include queue_id."
-                except asyncio.TimeoutError:
-                    last_error = "Queue request timed out."
-                except Exception as e:
-                    last_error = f"Queue request error: {e}"
-
-            await asyncio.sleep(1.2 + attempt)
-
-        return None, None, last_error, request_id
-
-# ---------- provider: poll ----------
+    # ---------- provider: poll ----------
     async def _wait_for_result(
         self,
         model_id: str,
@@ -473,184 +216,31 @@ class VeniceVideoCog(commands.Cog):
         quota: dict[str, int],
         queue_download_url: Optional[str] = None,
         request_id: str = "unknown",
-    ) -> tuple[Optional[bytes], Optional[str], Optional[str]]:
+        started_at: Optional[float] = None,
+    ) -> tuple[Optional[Path], Optional[str], Optional[str]]:
         if not VENICE_VIDEO_RETRIEVE_URL:
             return None, None, "VENICE_VIDEO_RETRIEVE_URL is missing."
         if not VENICE_API_KEY:
             return None, None, "VENICE_API_KEY is missing."
 
-        await self._ensure_session()
-        assert self.session is not None
-
-        headers = {
-            "Authorization": f"Bearer {VENICE_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        started = utc_now()
-        hard_deadline = started + timedelta(seconds=VIDEO_HARD_TIMEOUT_SECONDS)
-        adaptive_deadline = started + timedelta(seconds=VIDEO_ADAPTIVE_TIMEOUT_SECONDS)
-
-        consecutive_5xx = 0
-        total_5xx = 0
-        first_5xx_at = None
-        finalize_attempts = 0
-        last_percent = 8
-
-        timeout = aiohttp.ClientTimeout(total=90, connect=15, sock_read=70)
-
-        while True:
-            if utc_now() >= hard_deadline or utc_now() >= adaptive_deadline:
-                break
-
-            await asyncio.sleep(VIDEO_POLL_SECONDS)
-            elapsed_sec = int((utc_now() - started).total_seconds())
-
-            try:
-                async with self.session.post(
-                    VENICE_VIDEO_RETRIEVE_URL,
-                    headers=headers,
-                    json={"model": model_id, "queue_id": queue_id},
-                    timeout=timeout,
-                ) as response:
-                    ctype = (response.headers.get("content-type") or "").lower()
-
-                    if response.status == 429:
-                        t429 = await response.text()
-                        await asyncio.sleep(_parse_retry_after_seconds(response.headers, t429))
-                        continue
-
-                    if response.status >= 400:
-                        _ = await response.text()
-
-                        if response.status >= 500:
-                            total_5xx += 1
-                            consecutive_5xx += 1
-                            if first_5xx_at is None:
-                                first_5xx_at = utc_now()
-
-                            p = max(last_percent, 12)
-                            await self._safe_edit_progress(
-                                progress_message,
-                                self._progress_embed(
-                                    user, prompt, p, elapsed_sec,
-                                    f"Provider error {response.status} (retry {total_5xx})...",
-                                    quota, model_id,
-                                ),
-                            )
-                            last_percent = p
-
-                            too_many = consecutive_5xx >= VIDEO_MAX_CONSECUTIVE_5XX
-                            too_long = first_5xx_at and (
-                                (utc_now() - first_5xx_at).total_seconds()
-                                >= VIDEO_5XX_WINDOW_SECONDS
-                            )
-                            if too_many or too_long:
-                                return None, None, "Provider unavailable (repeated 5xx errors)."
-                            continue
-
-                        consecutive_5xx = 0
-                        first_5xx_at = None
-
-                        if response.status in (401, 403):
-                            return None, None, "API authentication failed (401/403)."
-                        if response.status == 404:
-                            return None, None, "Retrieve endpoint not found (404)."
-                        if response.status == 422:
-                            return None, None, "Retrieve request rejected by provider (422)."
-                        continue
-
-                    consecutive_5xx = 0
-                    first_5xx_at = None
-
-                    if "video" in ctype:
-                        blob = await response.read()
-                        if looks_like_video(blob):
-                            return blob, "video", None
-
-                    if "image" in ctype:
-                        blob = await response.read()
-                        if looks_like_image(blob):
-                            return blob, "image", None
-
-                    raw = await response.text()
-                    try:
-                        data = json.loads(raw) if raw else {}
-                    except Exception:
-                        continue
-
-                    status = str(data.get("status", "")).lower()
-
-                    avg_ms = safe_int(data.get("average_execution_time", 180000), 180000)
-                    exec_ms = safe_int(data.get("execution_duration", 0), 0)
-                    if exec_ms <= 0:
-                        exec_ms = elapsed_sec * 1000
-
-                    expected_total_sec = int((max(avg_ms, 60000) / 1000) * 2.5) + 120
-                    candidate = started + timedelta(seconds=expected_total_sec)
-                    if candidate > adaptive_deadline:
-                        adaptive_deadline = min(candidate, hard_deadline)
-
-                    if status in {"failed", "error", "cancelled", "canceled"}:
-                        err = data.get("error")
-                        msg = (
-                            err.get("message") if isinstance(err, dict)
-                            else err if isinstance(err, str)
-                            else data.get("message")
-                        )
-                        return None, None, (
-                            f"Rendering aborted: {sanitize_error_text(str(msg or 'unknown'))}"
-                        )
-
-                    if status == "completed":
-                        candidate_urls: list[str] = []
-                        if isinstance(queue_download_url, str) and queue_download_url.startswith("http"):
-                            candidate_urls.append(queue_download_url)
-                        candidate_urls.extend(extract_urls_from_payload(data))
-                        candidate_urls = list(dict.fromkeys(candidate_urls))
-
-                        for media_url in candidate_urls:
-                            media_data, media_type = await self._fetch_media_from_url(
-                                media_url, headers
-                            )
-                            if media_data:
-                                return media_data, media_type, None
-
-                        finalize_attempts += 1
-                        p = max(last_percent, 98)
-                        await self._safe_edit_progress(
-                            progress_message,
-                            self._progress_embed(
-                                user, prompt, p, elapsed_sec,
-                                "Finalizing file delivery...", quota, model_id,
-                            ),
-                        )
-                        last_percent = p
-
-                        if finalize_attempts >= 25:
-                            return None, None, (
-                                "Rendering finished, but no deliverable file was returned."
-                            )
-                        continue
-
-                    target_ms = max(avg_ms, 120000)
-                    percent = min(97, max(8, int((exec_ms / max(target_ms, 1)) * 100)))
-                    percent = max(percent, last_percent)
-
-                    if percent != last_percent:
-                        await self._safe_edit_progress(
-                            progress_message,
-                            self._progress_embed(
-                                user, prompt, percent, elapsed_sec, "Rendering...", quota, model_id,
-                            ),
-                        )
-                        last_percent = percent
-
-            except asyncio.TimeoutError:
-                continue
-            except Exception:
-                continue
+        def on_progress(percent: int, elapsed_sec: int, stage: str):
+            progress_reporter.report(
+                progress_message,
+                embed=self._progress_embed(
+                    user, prompt, percent, elapsed_sec, stage, quota, model_id,
+                ),
+            )
 
-        return None, None, "Generation timed out."
+        media, kind, error = await video_jobs.run(
+            queue_id,
+            model_id,
+            queue_download_url=queue_download_url,
+            on_progress=on_progress,
+            started_at=started_at,
+        )
+        if error:
+            logger.warning("[VID %s] queue_id=%s failed: %s", request_id, queue_id, error)
+        return media, kind, error
 
     # ---------- public api (called by image / face cogs + shared animate UI) ----------
     async def animate_image_to_video(
@@ -706,7 +296,7 @@ class VeniceVideoCog(commands.Cog):
             )
             return False
 
-        if not await self._try_lock_user(interaction.user.id):
+        if not video_jobs.claim_user(interaction.user.id):
             await send_ephemeral(
                 interaction, "⏳ You already have a video render running. Please wait."
             )
@@ -719,7 +309,7 @@ class VeniceVideoCog(commands.Cog):
             await send_ephemeral(
                 interaction, "🎬 Video rendering is locked for members without a Tier role."
             )
-            await self._unlock_user(interaction.user.id)
+            video_jobs.release_user(interaction.user.id)
             return False
 
         ok_q, state_q, token = await self.video_quota.reserve(
@@ -743,20 +333,19 @@ class VeniceVideoCog(commands.Cog):
                 )
             msg += f"\nTier budgets: `{video_tier_line()}`"
             await send_ephemeral(interaction, msg)
-            await self._unlock_user(interaction.user.id)
-            return False
-
-        if not await self._try_begin_global():
-            await self.video_quota.rollback(token)
-            await send_ephemeral(
-                interaction, "⏳ Another video render is currently running. Please wait."
-            )
-            await self._unlock_user(interaction.user.id)
+            video_jobs.release_user(interaction.user.id)
             return False
 
+        # Holds a video slot from queue request to download; waits in the
+        # shared Venice queue while other renders run.
+        ticket = venice_scheduler.ticket(effective_model_id, interaction.user, kind="video")
         progress_message: Optional[discord.Message] = None
         quota_success = False
         keep_ids: set[int] = set()
+        queue_id: Optional[str] = None
+        # Set when shutdown interrupts a journaled render: it is resumed on the
+        # next start, so its quota and progress message must survive.
+        resumable = False
 
         if isinstance(target_channel, (discord.TextChannel, discord.Thread)):
             await self._cleanup_progress_leaks(target_channel, keep_ids=set(), limit=20)
@@ -770,13 +359,20 @@ class VeniceVideoCog(commands.Cog):
             )
             keep_ids.add(progress_message.id)
 
-            queue_id, queue_response, queue_error, request_id = await self._queue_i2v(
-                model_id=effective_model_id,
-                image_url=image_url,
-                image_bytes=image_bytes,
-                prompt=prompt,
-                seconds=seconds,
-                aspect=aspect,
+            async def show_queue(position: int):
+                await self._safe_edit_progress(
+                    progress_message,
+                    self._progress_embed(
+                        interaction.user, prompt, 5, 0, "Waiting for a render slot...",
+                        state_q, effective_model_id, queue_position=position,
+                    ),
+                )
+
+            await ticket.acquire(on_position=show_queue)
+
+            queue_id, queue_response, queue_error, request_id = await queue_i2v(
+                effective_model_id, prompt, seconds, aspect,
+                image_url=image_url, image_bytes=image_bytes,
             )
             if not queue_id:
                 await send_ephemeral(
@@ -792,6 +388,22 @@ class VeniceVideoCog(commands.Cog):
                 if isinstance(qdu, str):
                     queue_download_url = qdu
 
+            started_at = time.time()
+            await video_journal.add({
+                "queue_id": queue_id,
+                "model": effective_model_id,
+                "request_id": request_id,
+                "guild_id": interaction.guild.id,
+                "channel_id": getattr(target_channel, "id", None),
+                "user_id": interaction.user.id,
+                "progress_message_id": progress_message.id,
+                "prompt": prompt,
+                "seconds": seconds,
+                "queue_download_url": queue_download_url,
+                "quota_token": token,
+                "started_at": started_at,
+            })
+
             await self._safe_edit_progress(
                 progress_message,
                 self._progress_embed(
@@ -800,7 +412,7 @@ class VeniceVideoCog(commands.Cog):
                 ),
             )
 
-            media_data, media_type, error_message = await self._wait_for_result(
+            media_path, media_type, error_message = await self._wait_for_result(
                 model_id=effective_model_id,
                 queue_id=queue_id,
                 progress_message=progress_message,
@@ -809,9 +421,10 @@ class VeniceVideoCog(commands.Cog):
                 quota=state_q,
                 queue_download_url=queue_download_url,
                 request_id=request_id,
+                started_at=started_at,
             )
 
-            if not media_data:
+            if not media_path:
                 await send_ephemeral(
                     interaction,
                     f"❌ Animation failed: "
@@ -822,38 +435,15 @@ class VeniceVideoCog(commands.Cog):
                 await send_ephemeral(interaction, "❌ Provider returned non-video output.")
                 return False
 
-            guild_limit = None
-            guild_icon_url = None
-            guild = getattr(target_channel, "guild", None)
-            if guild:
-                guild_limit = getattr(guild, "filesize_limit", None)
-                if guild.icon:
-                    guild_icon_url = guild.icon.url
-
-            if guild_limit and len(media_data) > guild_limit:
-                await send_ephemeral(
-                    interaction,
-                    f"❌ Video too large for Discord upload limit "
-                    f"({len(media_data) // (1024 * 1024)}MB > "
-                    f"{guild_limit // (1024 * 1024)}MB).",
-                )
-                return False
-
-            video_post = await target_channel.send(
-                content=(
-                    f"{SERVER_ANIM_ICON} 🎬 **Video** • {interaction.user.mention} "
-                    f"• ▶ **CLICK TO PLAY**"
-                ),
-                embed=self._result_embed(prompt, seconds, effective_model_id, guild_icon_url),
-                file=discord.File(io.BytesIO(media_data), filename="AI_video.mp4"),
-                allowed_mentions=discord.AllowedMentions(
-                    users=True, roles=False, everyone=False
-                ),
+            video_post, post_error = await self._post_video(
+                target_channel, interaction.user, prompt, seconds, effective_model_id,
+                queue_id, media_path,
             )
+            if video_post is None:
+                await send_ephemeral(interaction, post_error or "❌ Video upload failed.")
+                return False
             keep_ids.add(video_post.id)
 
-            await add_rating_reactions(video_post)
-
             quota_success = True
             info = await self.get_remaining_info(interaction.guild.id, interaction.user)
             await send_ephemeral(
@@ -867,6 +457,9 @@ class VeniceVideoCog(commands.Cog):
             )
             return True
 
+        except asyncio.CancelledError:
+            resumable = queue_id is not None and not quota_success
+            raise
         except discord.Forbidden:
             await send_ephemeral(
                 interaction, "❌ Missing Discord permissions to post video."
@@ -879,25 +472,169 @@ class VeniceVideoCog(commands.Cog):
             )
             return False
         finally:
-            if not quota_success:
-                await self.video_quota.rollback(token)
+            ticket.release()
+            video_jobs.release_user(interaction.user.id)
+            if resumable:
+                logger.info("Video job %s left in the journal for resume", queue_id)
+            else:
+                await self._finish_job(
+                    queue_id, token if not quota_success else None,
+                    progress_message, target_channel, keep_ids,
+                )
+
+                # NOTE: cleanup_user_ephemerals wipes tracked ephemerals only.
+                # AnimateEphemeralView is declared persistent_ephemeral=True in
+                # venice_shared, so its 🔞 / 🎬 / 💎 buttons stay clickable and
+                # the user can queue further animations of the same source image.
+                asyncio.create_task(self._cleanup_user_ephemerals_delayed(interaction))
+
+    async def _finish_job(
+        self,
+        queue_id: Optional[str],
+        rollback_token: Optional[dict[str, int]],
+        progress_message: Optional[discord.Message],
+        target_channel: Any,
+        keep_ids: set[int],
+    ):
+        """Shared teardown of a live or resumed render that will not be retried."""
+        if rollback_token:
+            await self.video_quota.rollback(rollback_token)
+        if queue_id:
+            await video_journal.remove(queue_id)
+            await discard_job_media(queue_id)
 
-            await self._safe_delete_message(progress_message)
-            await self._end_global()
-            await self._unlock_user(interaction.user.id)
+        await self._safe_delete_message(progress_message)
 
-            if isinstance(target_channel, (discord.TextChannel, discord.Thread)):
-                await self._cleanup_progress_leaks(
-                    target_channel, keep_ids=keep_ids, limit=25
+        if isinstance(target_channel, (discord.TextChannel, discord.Thread)):
+            await self._cleanup_progress_leaks(
+                target_channel, keep_ids=keep_ids, limit=25
+            )
+            with contextlib.suppress(Exception):
+                await repost_starter_for_channel(target_channel)
+
+    async def _post_video(
+        self,
+        target_channel: discord.abc.Messageable,
+        user: discord.abc.User,
+        prompt: str,
+        seconds: int,
+        model_id: str,
+        queue_id: str,
+        media_path: Path,
+    ) -> tuple[Optional[discord.Message], Optional[str]]:
+        """
+        Post the finished video, re-encoded to fit the upload limit if needed;
+        returns (message, None) or (None, error text).
+        """
+        guild_icon_url = None
+        guild = getattr(target_channel, "guild", None)
+        if guild and guild.icon:
+            guild_icon_url = guild.icon.url
+
+        video_post, error = await deliver_video(
+            target_channel,
+            queue_id,
+            media_path,
+            content=(
+                f"{SERVER_ANIM_ICON} 🎬 **Video** • {user.mention} "
+                f"• ▶ **CLICK TO PLAY**"
+            ),
+            embed=self._result_embed(prompt, seconds, model_id, guild_icon_url),
+            allowed_mentions=discord.AllowedMentions(
+                users=True, roles=False, everyone=False
+            ),
+        )
+        if video_post is not None:
+            await add_rating_reactions(video_post)
+        return video_post, error
+
+    # ---------- resume after restart ----------
+    async def _resume_pending_jobs(self):
+        await self.bot.wait_until_ready()
+        records = await video_journal.pending()
+        if records:
+            logger.info("Resuming %d journaled video job(s)", len(records))
+        for record in records:
+            asyncio.create_task(self._resume_job(record))
+
+    async def _resume_job(self, record: dict[str, Any]):
+        queue_id = str(record["queue_id"])
+        model_id = str(record.get("model") or VENICE_VIDEO_I2V_MODEL_DEFAULT)
+        prompt = str(record.get("prompt") or "")
+        seconds = safe_int(record.get("seconds"), 0)
+        user_id = safe_int(record.get("user_id"), 0)
+        token = record.get("quota_token")
+
+        channel_id = safe_int(record.get("channel_id"), 0)
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            with contextlib.suppress(Exception):
+                channel = await self.bot.fetch_channel(channel_id)
+        guild = getattr(channel, "guild", None)
+        member = guild.get_member(user_id) if guild else None
+        if guild is not None and member is None:
+            with contextlib.suppress(Exception):
+                member = await guild.fetch_member(user_id)
+        if channel is None or guild is None or member is None:
+            # Nowhere to deliver: the render is wasted, give the seconds back.
+            logger.warning("Video job %s: channel or member gone, dropping", queue_id)
+            await self._finish_job(queue_id, token, None, None, set())
+            return
+
+        progress_message: Optional[discord.Message] = None
+        with contextlib.suppress(Exception):
+            progress_message = await channel.fetch_message(
+                safe_int(record.get("progress_message_id"), 0)
+            )
+
+        locked = video_jobs.claim_user(user_id)
+        delivered = False
+        keep_ids: set[int] = set()
+        resumable = False
+        try:
+            quota = await self.get_remaining_info(guild.id, member)
+            media_path, media_type, error_message = await self._wait_for_result(
+                model_id=model_id,
+                queue_id=queue_id,
+                progress_message=progress_message,
+                user=member,
+                prompt=prompt,
+                quota=quota,
+                queue_download_url=record.get("queue_download_url"),
+                request_id=str(record.get("request_id") or "resume"),
+                started_at=float(record.get("started_at") or time.time()),
+            )
+            if media_path and media_type == "video":
+                video_post, error_message = await self._post_video(
+                    channel, member, prompt, seconds, model_id, queue_id, media_path
                 )
-                with contextlib.suppress(Exception):
-                    await repost_starter_for_channel(target_channel)
+                if video_post is not None:
+                    keep_ids.add(video_post.id)
+                    delivered = True
+            elif media_path:
+                error_message = "Provider returned non-video output."
 
-            # NOTE: cleanup_user_ephemerals wipes tracked ephemerals only.
-            # AnimateEphemeralView is declared persistent_ephemeral=True in
-            # venice_shared, so its 🔞 / 🎬 / 💎 buttons stay clickable and
-            # the user can queue further animations of the same source image.
-            asyncio.create_task(self._cleanup_user_ephemerals_delayed(interaction))
+            if not delivered:
+                with contextlib.suppress(Exception):
+                    await channel.send(
+                        f"❌ {member.mention} your animation could not be completed: "
+                        f"{sanitize_error_text(error_message or 'Unknown error')}",
+                        allowed_mentions=discord.AllowedMentions(users=True),
+                        delete_after=120,
+                    )
+        except asyncio.CancelledError:
+            resumable = True
+            raise
+        except Exception as e:
+            logger.exception("Resuming video job %s failed: %s", queue_id, e)
+        finally:
+            if locked:
+                video_jobs.release_user(user_id)
+            if not resumable:
+                await self._finish_job(
+                    queue_id, None if delivered else token,
+                    progress_message, channel, keep_ids,
+                )
 
     async def _cleanup_user_ephemerals_delayed(
         self, interaction: discord.Interaction, delay: float = 8.0
@@ -931,4 +668,6 @@ class VeniceVideoCog(commands.Cog):
 
 
 async def setup(bot: commands.Bot):
+    # video_engine's session rides on the shared connector.
+    await http_client.ensure_loaded(bot)
     await bot.add_cog(VeniceVideoCog(bot))
\ No newline at end of file
@@ -0,0 +1,1033 @@
+# video_engine.py
+"""
+Shared Venice video engine: the one place that talks to the video API.
+Discord front-ends (VeniceVideoCog, the shared animate UI, slash commands)
+only handle quota, embeds and messages and go through this API:
+
+- queue:   `queue_i2v()` submits an image-to-video render,
+- poll:    `video_jobs.run()` waits for it,
+- fetch:   `fetch_media_from_url()` spools the finished file,
+- deliver: `deliver_video()` fits and posts it.
+
+Everything shares one aiohttp session (`video_jobs.session()`), one job
+table (`video_jobs`, which also holds the one-render-per-user claims) and
+one concurrency limiter (venice_scheduler's video tickets).
+
+One VideoJobTracker (`video_jobs`) owns every in-flight render. `run()`
+resolves once the render is delivered, failed or timed out. All jobs are
+polled from one loop:
+
+- one shared 429 / Retry-After cooldown instead of per-job backoff,
+- per-job poll intervals that stretch with the provider's
+  `average_execution_time` and tighten towards the expected finish,
+- downloads run in their own task and never stall the poll loop.
+
+Finished media is streamed to a spool file (never held in RAM) with HTTP
+Range resume, so a retried or restarted download continues where it
+stopped; callers get a Path to hand straight to discord.File.
+
+Videos over the guild upload limit are re-encoded to fit by `video_fitter`
+(a local ffmpeg binary in its own process), cached per job.
+
+Queued jobs are also written to `video_journal` (one JSON file per job) so
+a render that is still running when the bot restarts is resumed and
+delivered instead of lost.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+import http_client
+import discord
+
+from venice_shared import (
+    DISCORD_UPLOAD_SAFETY_BYTES,
+    bytes_to_data_url,
+    channel_upload_limit_bytes,
+    closest_aspect_ratio,
+    env_int,
+    env_str,
+    extract_urls_from_payload,
+    get_model_resolution,
+    get_video_profile,
+    looks_like_image,
+    looks_like_video,
+    safe_int,
+    sanitize_error_text,
+    venice_scheduler,
+)
+
+load_dotenv()
+logger = logging.getLogger("video_engine")
+
+# =================================================
+# ENV
+# =================================================
+VENICE_API_KEY = os.getenv("VENICE_API_KEY")
+VENICE_VIDEO_QUEUE_URL = os.getenv("VENICE_VIDEO_QUEUE_URL")
+VENICE_VIDEO_RETRIEVE_URL = os.getenv("VENICE_VIDEO_RETRIEVE_URL")
+
+# Global fallback resolution for models not listed in VIDEO_MODEL_PROFILES.
+VENICE_VIDEO_RESOLUTION_FALLBACK = os.getenv("VENICE_VIDEO_RESOLUTION", "720p")
+
+# =================================================
+# SETTINGS
+# =================================================
+VIDEO_POLL_SECONDS = 6
+VIDEO_POLL_MAX_SECONDS = max(VIDEO_POLL_SECONDS, env_int("VIDEO_POLL_MAX_SECONDS", 30))
+VIDEO_POLL_TICK_SECONDS = 1.0
+VIDEO_HARD_TIMEOUT_SECONDS = 1800
+VIDEO_ADAPTIVE_TIMEOUT_SECONDS = 720
+VIDEO_MAX_CONSECUTIVE_5XX = 8
+VIDEO_5XX_WINDOW_SECONDS = 180
+VIDEO_FINALIZE_ATTEMPTS = 25
+VIDEO_JOB_DIR = Path(env_str("VIDEO_JOB_DIR", "data/video_jobs"))
+VIDEO_SPOOL_DIR = Path(env_str("VIDEO_SPOOL_DIR", "data/video_spool"))
+VIDEO_DOWNLOAD_CHUNK_BYTES = 256 * 1024
+VIDEO_SNIFF_BYTES = 64
+# Nested JSON pointing at the real file is small; never buffer more than this.
+VIDEO_NESTED_JSON_MAX_BYTES = 1024 * 1024
+VIDEO_MAX_URL_HOPS = 12
+FFMPEG_BIN = env_str("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = env_str("FFPROBE_BIN", "ffprobe")
+# ffmpeg is multi-threaded already; more than one encode at once only slows both.
+VIDEO_FIT_CONCURRENCY = max(1, env_int("VIDEO_FIT_CONCURRENCY", 1))
+VIDEO_FIT_TIMEOUT_SECONDS = env_int("VIDEO_FIT_TIMEOUT_SECONDS", 300)
+VIDEO_FIT_ATTEMPTS = 3
+VIDEO_FIT_HEADROOM = 0.92  # container overhead + rate-control overshoot
+VIDEO_FIT_AUDIO_BPS = 64_000
+VIDEO_FIT_MIN_VIDEO_BPS = 150_000
+# Below this many bits per pixel per frame x264 turns to mush: shrink instead.
+VIDEO_FIT_MIN_BPP = 0.06
+VIDEO_FIT_MIN_HEIGHT = 360
+
+# (spooled media file, "video" | "image", error text)
+VideoResult = tuple[Optional[Path], Optional[str], Optional[str]]
+# (percent, elapsed seconds, stage text)
+ProgressCallback = Callable[[int, int, str], Any]
+
+
+def _api_headers() -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {VENICE_API_KEY}",
+        "Content-Type": "application/json",
+    }
+
+
+def _failure_message(data: dict[str, Any]) -> str:
+    err = data.get("error")
+    if isinstance(err, dict):
+        msg = err.get("message")
+    elif isinstance(err, str):
+        msg = err
+    else:
+        msg = data.get("message")
+    return f"Rendering aborted: {sanitize_error_text(str(msg or 'unknown'))}"
+
+
+# =================================================
+# MEDIA SPOOL
+# =================================================
+def _sniff_kind(head: bytes, ctype: str = "") -> Optional[str]:
+    if "video" in ctype or looks_like_video(head):
+        return "video"
+    if "image" in ctype or looks_like_image(head):
+        return "image"
+    return None
+
+
+def _read_file_head(path: Path) -> bytes:
+    with contextlib.suppress(OSError):
+        with open(path, "rb") as f:
+            return f.read(VIDEO_SNIFF_BYTES)
+    return b""
+
+
+def _spool_stem(queue_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", queue_id)[:80]
+
+
+def _part_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _complete(part: Path, kind: str) -> Path:
+    final = part.with_suffix(".mp4" if kind == "video" else ".img")
+    os.replace(part, final)
+    return final
+
+
+async def _read_head(resp: aiohttp.ClientResponse) -> bytes:
+    head = b""
+    while len(head) < VIDEO_SNIFF_BYTES:
+        chunk = await resp.content.read(VIDEO_DOWNLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        head += chunk
+    return head
+
+
+async def spool_response(
+    resp: aiohttp.ClientResponse, part: Path, first: bytes, append: bool
+) -> int:
+    """Write `first` and the rest of the body to `part`; returns the bytes written."""
+    part.parent.mkdir(parents=True, exist_ok=True)
+    f = await asyncio.to_thread(open, part, "ab" if append else "wb")
+    written = 0
+    try:
+        chunk = first
+        while chunk:
+            await asyncio.to_thread(f.write, chunk)
+            written += len(chunk)
+            chunk = await resp.content.read(VIDEO_DOWNLOAD_CHUNK_BYTES)
+    finally:
+        await asyncio.to_thread(f.close)
+    return written
+
+
+async def fetch_media_from_url(
+    session: aiohttp.ClientSession,
+    url: str,
+    headers: dict[str, str],
+    stem: str,
+    visited: Optional[set[str]] = None,
+) -> tuple[Optional[Path], Optional[str]]:
+    """
+    Stream the media behind `url` into VIDEO_SPOOL_DIR; returns (path, kind).
+
+    The kind is decided from the Content-Type and the first bytes only. An
+    interrupted download keeps its .part file (named after `stem` and the
+    URL) and the next attempt asks for the rest with a Range request. JSON
+    bodies are followed to the URLs they contain.
+    """
+    if not isinstance(url, str) or not url.startswith("http"):
+        return None, None
+    visited = visited if visited is not None else set()
+    if url in visited or len(visited) > VIDEO_MAX_URL_HOPS:
+        return None, None
+    visited.add(url)
+
+    part = VIDEO_SPOOL_DIR / f"{_spool_stem(stem)}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:10]}.part"
+    timeout = aiohttp.ClientTimeout(total=600, connect=12, sock_read=35)
+    for use_auth in (True, False):
+        offset = await asyncio.to_thread(_part_size, part)
+        req_headers = dict(headers) if use_auth else {}
+        if offset:
+            req_headers["Range"] = f"bytes={offset}-"
+        try:
+            async with session.get(url, headers=req_headers, timeout=timeout) as resp:
+                ctype = (resp.headers.get("content-type") or "").lower()
+                if resp.status == 416 and offset:
+                    # Everything was already on disk.
+                    kind = _sniff_kind(await asyncio.to_thread(_read_file_head, part))
+                    if kind:
+                        return await asyncio.to_thread(_complete, part, kind), kind
+                    await asyncio.to_thread(part.unlink, True)
+                    continue
+                if resp.status >= 400:
+                    continue
+
+                resumed = resp.status == 206 and offset > 0
+                first = await _read_head(resp)
+                if not first:
+                    continue
+                if resumed:
+                    kind = _sniff_kind(await asyncio.to_thread(_read_file_head, part))
+                else:
+                    kind = _sniff_kind(first, ctype)
+
+                if kind is None:
+                    if "json" in ctype or first.lstrip()[:1] in (b"{", b"["):
+                        body = first
+                        # read() returns what is buffered, not the whole body: loop to EOF or the cap
+                        while len(body) < VIDEO_NESTED_JSON_MAX_BYTES:
+                            chunk = await resp.content.read(VIDEO_NESTED_JSON_MAX_BYTES - len(body))
+                            if not chunk:
+                                break
+                            body += chunk
+                        try:
+                            nested = json.loads(body.decode("utf-8", errors="ignore"))
+                        except Exception:
+                            nested = None
+                        for nested_url in extract_urls_from_payload(nested) if nested else []:
+                            path, nested_kind = await fetch_media_from_url(
+                                session, nested_url, headers, stem, visited
+                            )
+                            if path:
+                                return path, nested_kind
+                    continue
+
+                written = await spool_response(resp, part, first, append=resumed)
+                if resumed:
+                    logger.info("Resumed %s at %d bytes (+%d)", part.name, offset, written)
+                return await asyncio.to_thread(_complete, part, kind), kind
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            logger.info("Media download %s interrupted (%s); partial file kept", part.name, e)
+            continue
+        except OSError as e:
+            logger.warning("Media spool write failed for %s: %s", part.name, e)
+            continue
+
+    return None, None
+
+
+def _sweep_spool_sync(max_age: float):
+    now = time.time()
+    for p in VIDEO_SPOOL_DIR.glob("*"):
+        with contextlib.suppress(OSError):
+            if now - p.stat().st_mtime > max_age:
+                p.unlink()
+
+
+async def discard_job_media(queue_id: str):
+    """Delete every spool file of a job: downloads, partials and fitted copies."""
+    def _sync():
+        for p in VIDEO_SPOOL_DIR.glob(f"{_spool_stem(queue_id)}-*"):
+            with contextlib.suppress(OSError):
+                p.unlink()
+    await asyncio.to_thread(_sync)
+
+
+# =================================================
+# VIDEO FIT
+# =================================================
+class VideoProbe:
+    __slots__ = ("duration", "width", "height", "fps", "has_audio")
+
+    def __init__(self, duration: float, width: int, height: int, fps: float, has_audio: bool):
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.has_audio = has_audio
+
+
+def _parse_rate(rate: Any) -> float:
+    try:
+        num, _, den = str(rate).partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def plan_video_fit(probe: VideoProbe, target: int) -> tuple[int, int]:
+    """(video bits/s, output height) predicted to land under `target` bytes."""
+    total_bps = target * 8 * VIDEO_FIT_HEADROOM / max(0.5, probe.duration)
+    audio_bps = VIDEO_FIT_AUDIO_BPS if probe.has_audio else 0
+    video_bps = max(VIDEO_FIT_MIN_VIDEO_BPS, int(total_bps - audio_bps))
+    height = probe.height
+    fps = probe.fps or 24.0
+    max_pixels = video_bps / (fps * VIDEO_FIT_MIN_BPP)
+    if probe.width * probe.height > max_pixels:
+        scale = (max_pixels / (probe.width * probe.height)) ** 0.5
+        height = max(VIDEO_FIT_MIN_HEIGHT, int(probe.height * scale))
+    return video_bps, min(probe.height, height) // 2 * 2
+
+
+class VideoFitter:
+    """
+    Re-encodes spooled videos that are over the upload limit, the video
+    counterpart of fit_image_for_discord: probe duration/size with ffprobe,
+    predict a bitrate (and a smaller height where that bitrate would be too
+    thin), encode once with ffmpeg and correct from the real size if it still
+    overshoots. ffmpeg runs as its own process, so the event loop only waits
+    on it. Results are cached on disk per (job, target) so a retry after a
+    413 or a resumed delivery does not encode again.
+    """
+
+    def __init__(self, concurrency: int = VIDEO_FIT_CONCURRENCY):
+        self._slots = asyncio.Semaphore(concurrency)
+        self._inflight: dict[tuple[str, int], asyncio.Future] = {}
+        self._unavailable = False
+        # metrics
+        self.fitted = 0
+        self.cache_hits = 0
+        self.failed = 0
+        self.total_encode = 0.0
+
+    async def _exec(self, *args: str, timeout: float) -> tuple[int, bytes, bytes]:
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(), timeout)
+        except BaseException:
+            with contextlib.suppress(ProcessLookupError):
+                proc.kill()
+            await proc.wait()
+            raise
+        return proc.returncode or 0, out, err
+
+    async def probe(self, path: Path) -> Optional[VideoProbe]:
+        code, out, err = await self._exec(
+            FFPROBE_BIN, "-v", "error",
+            "-show_entries", "format=duration:stream=codec_type,width,height,avg_frame_rate",
+            "-of", "json", str(path),
+            timeout=30,
+        )
+        if code != 0:
+            logger.warning("ffprobe failed for %s: %s", path.name, sanitize_error_text(err.decode(errors="ignore")))
+            return None
+        try:
+            info = json.loads(out.decode("utf-8", errors="ignore"))
+        except ValueError:
+            return None
+        streams = info.get("streams") or []
+        video = next((s for s in streams if s.get("codec_type") == "video"), None)
+        if video is None:
+            return None
+        try:
+            duration = float((info.get("format") or {}).get("duration") or 0)
+        except ValueError:
+            duration = 0.0
+        if duration <= 0:
+            return None
+        return VideoProbe(
+            duration,
+            safe_int(video.get("width"), 0),
+            safe_int(video.get("height"), 0),
+            _parse_rate(video.get("avg_frame_rate")),
+            any(s.get("codec_type") == "audio" for s in streams),
+        )
+
+    async def _encode(self, src: Path, dst: Path, probe: VideoProbe, video_bps: int, height: int) -> bool:
+        args = [
+            FFMPEG_BIN, "-y", "-v", "error", "-i", str(src),
+            "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+            "-b:v", str(video_bps), "-maxrate", str(video_bps), "-bufsize", str(video_bps * 2),
+        ]
+        if height < probe.height:
+            args += ["-vf", f"scale=-2:{height}"]
+        args += ["-c:a", "aac", "-b:a", str(VIDEO_FIT_AUDIO_BPS)] if probe.has_audio else ["-an"]
+        args += ["-movflags", "+faststart", "-f", "mp4", str(dst)]
+        code, _, err = await self._exec(*args, timeout=VIDEO_FIT_TIMEOUT_SECONDS)
+        if code != 0:
+            logger.warning("ffmpeg failed for %s: %s", src.name, sanitize_error_text(err.decode(errors="ignore")))
+        return code == 0
+
+    async def _fit(self, job_id: str, src: Path, target: int, out: Path) -> Optional[Path]:
+        probe = await self.probe(src)
+        if probe is None or not probe.height:
+            return None
+        video_bps, height = plan_video_fit(probe, target)
+        tmp = out.with_name(f"{out.stem}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            for attempt in range(VIDEO_FIT_ATTEMPTS):
+                t0 = time.perf_counter()
+                ok = await self._encode(src, tmp, probe, video_bps, height)
+                self.total_encode += time.perf_counter() - t0
+                if not ok:
+                    return None
+                size = tmp.stat().st_size
+                logger.info(
+                    "Video fit %s: %dx%s @ %dkbps -> %.1fMB (target %.1fMB, attempt %d)",
+                    job_id, probe.width, height, video_bps // 1000,
+                    size / 1048576, target / 1048576, attempt + 1,
+                )
+                if size <= target:
+                    os.replace(tmp, out)
+                    return out
+                # Overshoot: scale the bitrate by what we actually got.
+                video_bps = max(VIDEO_FIT_MIN_VIDEO_BPS, int(video_bps * target / size * 0.95))
+                if video_bps == VIDEO_FIT_MIN_VIDEO_BPS:
+                    height = max(VIDEO_FIT_MIN_HEIGHT, int(height * 0.75)) // 2 * 2
+            return None
+        finally:
+            with contextlib.suppress(OSError):
+                tmp.unlink()
+
+    async def fit(self, job_id: str, src: Path, max_bytes: int) -> Optional[Path]:
+        """
+        A file no larger than `max_bytes` minus the upload safety margin: `src`
+        itself when it already fits, else a cached or fresh re-encode. None
+        when it cannot be made to fit (or ffmpeg is not available).
+        """
+        target = max(1024 * 1024, int(max_bytes - DISCORD_UPLOAD_SAFETY_BYTES))
+        if src.stat().st_size <= target:
+            return src
+        out = VIDEO_SPOOL_DIR / f"{_spool_stem(job_id)}-fit-{target}.mp4"
+        if out.exists() and out.stat().st_size <= target:
+            self.cache_hits += 1
+            return out
+        if self._unavailable:
+            return None
+
+        key = (job_id, target)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        result: Optional[Path] = None
+        try:
+            async with self._slots:
+                result = await self._fit(job_id, src, target, out)
+        except FileNotFoundError:
+            logger.error("Video fit disabled: %s / %s not found", FFMPEG_BIN, FFPROBE_BIN)
+            self._unavailable = True
+        except (asyncio.TimeoutError, OSError) as e:
+            logger.warning("Video fit %s failed: %s", job_id, e)
+        finally:
+            del self._inflight[key]
+            if result is not None:
+                self.fitted += 1
+            else:
+                self.failed += 1
+            fut.set_result(result)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "available": not self._unavailable,
+            "fitted": self.fitted,
+            "cache_hits": self.cache_hits,
+            "failed": self.failed,
+            "avg_encode_s": round(self.total_encode / max(1, self.fitted), 2),
+        }
+
+
+video_fitter = VideoFitter()
+
+
+# =================================================
+# JOB TRACKER
+# =================================================
+class VideoJob:
+    """One queued render: poll bookkeeping plus the future its waiter awaits."""
+
+    def __init__(
+        self,
+        queue_id: str,
+        model: str,
+        *,
+        queue_download_url: Optional[str] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        max_finalize: int = VIDEO_FINALIZE_ATTEMPTS,
+        started_at: Optional[float] = None,
+    ):
+        self.queue_id = queue_id
+        self.model = model
+        self.queue_download_url = queue_download_url
+        self.on_progress = on_progress
+        self.max_finalize = max_finalize
+
+        # started_at (epoch) carries the original start across a restart.
+        self.started = time.monotonic()
+        if started_at is not None:
+            self.started -= max(0.0, time.time() - started_at)
+        self.hard_deadline = self.started + VIDEO_HARD_TIMEOUT_SECONDS
+        self.deadline = self.started + VIDEO_ADAPTIVE_TIMEOUT_SECONDS
+        self.next_poll = time.monotonic() + VIDEO_POLL_SECONDS
+        self.busy = False
+
+        self.avg_ms = 0
+        self.exec_ms = 0
+        self.last_percent = 8
+        self.consecutive_5xx = 0
+        self.total_5xx = 0
+        self.first_5xx_at: Optional[float] = None
+        self.finalize_attempts = 0
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def elapsed(self) -> int:
+        return int(time.monotonic() - self.started)
+
+    def progress(self, percent: int, stage: str):
+        self.last_percent = percent
+        if self.on_progress is not None:
+            with contextlib.suppress(Exception):
+                self.on_progress(percent, self.elapsed, stage)
+
+    def finish(self, media: Optional[Path], kind: Optional[str], error: Optional[str]):
+        if not self.future.done():
+            self.future.set_result((media, kind, error))
+
+
+class VideoJobTracker:
+    """
+    Polls every in-flight video job from one loop. Jobs become due at their
+    own interval: VIDEO_POLL_SECONDS at first and near the expected finish,
+    up to VIDEO_POLL_MAX_SECONDS while much of the provider's average
+    execution time is still ahead. A 429 on any job pauses all polling for
+    Retry-After seconds and puts the model on cooldown in venice_scheduler.
+    """
+
+    def __init__(self):
+        self._jobs: dict[str, VideoJob] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self._inflight: set[asyncio.Task] = set()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._cooldown_until = 0.0
+        self._swept = False
+        self._active_users: set[int] = set()
+        # metrics
+        self.polls = 0
+        self.rate_limits = 0
+
+    # ---------------------------------------------------------------- api
+    def track(self, queue_id: str, model: str, **kwargs: Any) -> VideoJob:
+        job = VideoJob(queue_id, model, **kwargs)
+        self._jobs[queue_id] = job
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run())
+        return job
+
+    async def wait(self, job: VideoJob) -> VideoResult:
+        try:
+            return await job.future
+        finally:
+            if self._jobs.get(job.queue_id) is job:
+                del self._jobs[job.queue_id]
+
+    async def run(self, queue_id: str, model: str, **kwargs: Any) -> VideoResult:
+        """Track `queue_id` and wait for its result."""
+        return await self.wait(self.track(queue_id, model, **kwargs))
+
+    def claim_user(self, user_id: int) -> bool:
+        """One render per user at a time; False if `user_id` already has one."""
+        if user_id in self._active_users:
+            return False
+        self._active_users.add(user_id)
+        return True
+
+    def release_user(self, user_id: int):
+        self._active_users.discard(user_id)
+
+    def session(self) -> aiohttp.ClientSession:
+        """The engine's one session (shared connector) for queue, poll and fetch."""
+        if self._session is None or self._session.closed:
+            self._session = http_client.client_session(aiohttp.ClientTimeout(total=120))
+        return self._session
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "jobs": len(self._jobs),
+            "active_users": len(self._active_users),
+            "polls": self.polls,
+            "rate_limits": self.rate_limits,
+            "cooldown_s": max(0, int(self._cooldown_until - time.monotonic())),
+        }
+
+    # ---------------------------------------------------------------- loop
+    async def _run(self):
+        if not self._swept:
+            # Leftovers older than any job could live (a journaled job keeps
+            # its .part for resume) are from crashed or abandoned renders.
+            self._swept = True
+            with contextlib.suppress(OSError):
+                await asyncio.to_thread(_sweep_spool_sync, 2 * VIDEO_HARD_TIMEOUT_SECONDS)
+        while self._jobs:
+            now = time.monotonic()
+            for job in list(self._jobs.values()):
+                if job.future.done():
+                    self._jobs.pop(job.queue_id, None)
+                elif job.busy:
+                    # Never time out under a running poll: it may be fetching
+                    # a finished render. Its own request timeouts bound it,
+                    # and the deadline applies on the next tick if it fails.
+                    continue
+                elif now >= min(job.deadline, job.hard_deadline):
+                    job.finish(None, None, "Generation timed out.")
+                    self._jobs.pop(job.queue_id, None)
+                elif job.next_poll <= now and now >= self._cooldown_until:
+                    job.busy = True
+                    task = asyncio.create_task(self._poll(job))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+            await asyncio.sleep(VIDEO_POLL_TICK_SECONDS)
+
+    def _interval(self, job: VideoJob) -> float:
+        if job.avg_ms <= 0 or job.consecutive_5xx or job.finalize_attempts:
+            return VIDEO_POLL_SECONDS
+        remaining = (max(job.avg_ms, 60000) - job.exec_ms) / 1000
+        return max(VIDEO_POLL_SECONDS, min(VIDEO_POLL_MAX_SECONDS, remaining / 4))
+
+    async def _poll(self, job: VideoJob):
+        try:
+            await self._poll_once(job)
+        except asyncio.TimeoutError:
+            pass
+        except Exception as e:
+            logger.warning("Video poll %s failed: %s", job.queue_id, e)
+        finally:
+            job.busy = False
+            job.next_poll = time.monotonic() + self._interval(job)
+
+    async def _poll_once(self, job: VideoJob):
+        if not VENICE_VIDEO_RETRIEVE_URL:
+            job.finish(None, None, "VENICE_VIDEO_RETRIEVE_URL is missing.")
+            return
+        headers = _api_headers()
+        timeout = aiohttp.ClientTimeout(total=90, connect=15, sock_read=70)
+        self.polls += 1
+
+        async with self.session().post(
+            VENICE_VIDEO_RETRIEVE_URL,
+            headers=headers,
+            json={"model": job.model, "queue_id": job.queue_id},
+            timeout=timeout,
+        ) as response:
+            ctype = (response.headers.get("content-type") or "").lower()
+
+            if response.status == 429:
+                text = await response.text()
+                delay = venice_scheduler.rate_limited(job.model, response.headers, text)
+                self.rate_limits += 1
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                return
+
+            if response.status >= 400:
+                await response.text()
+                if response.status >= 500:
+                    self._on_5xx(job, response.status)
+                    return
+                job.consecutive_5xx = 0
+                job.first_5xx_at = None
+                if response.status in (401, 403):
+                    job.finish(None, None, "API authentication failed (401/403).")
+                elif response.status == 404:
+                    job.finish(None, None, "Retrieve endpoint not found (404).")
+                elif response.status == 422:
+                    job.finish(None, None, "Retrieve request rejected by provider (422).")
+                return
+
+            job.consecutive_5xx = 0
+            job.first_5xx_at = None
+
+            if "video" in ctype or "image" in ctype:
+                first = await _read_head(response)
+                kind = _sniff_kind(first)
+                if kind:
+                    part = VIDEO_SPOOL_DIR / f"{_spool_stem(job.queue_id)}-retrieve.part"
+                    await spool_response(response, part, first, append=False)
+                    job.finish(await asyncio.to_thread(_complete, part, kind), kind, None)
+                return
+
+            raw = await response.text()
+        try:
+            data = json.loads(raw) if raw else {}
+        except Exception:
+            return
+        if not isinstance(data, dict):
+            return
+        await self._on_status(job, data, headers)
+
+    def _on_5xx(self, job: VideoJob, status: int):
+        job.total_5xx += 1
+        job.consecutive_5xx += 1
+        now = time.monotonic()
+        if job.first_5xx_at is None:
+            job.first_5xx_at = now
+        job.progress(max(job.last_percent, 12), f"Provider error {status} (retry {job.total_5xx})...")
+        too_many = job.consecutive_5xx >= VIDEO_MAX_CONSECUTIVE_5XX
+        too_long = now - job.first_5xx_at >= VIDEO_5XX_WINDOW_SECONDS
+        if too_many or too_long:
+            job.finish(None, None, "Provider unavailable (repeated 5xx errors).")
+
+    async def _on_status(self, job: VideoJob, data: dict[str, Any], headers: dict[str, str]):
+        status = str(data.get("status", "")).lower()
+        job.avg_ms = safe_int(data.get("average_execution_time", 180000), 180000)
+        job.exec_ms = safe_int(data.get("execution_duration", 0), 0)
+        if job.exec_ms <= 0:
+            job.exec_ms = job.elapsed * 1000
+
+        expected_total_sec = int((max(job.avg_ms, 60000) / 1000) * 2.5) + 120
+        job.deadline = max(job.deadline, min(job.started + expected_total_sec, job.hard_deadline))
+
+        if status in {"failed", "error", "cancelled", "canceled"}:
+            job.finish(None, None, _failure_message(data))
+            return
+
+        if status == "completed":
+            candidate_urls: list[str] = []
+            if isinstance(job.queue_download_url, str) and job.queue_download_url.startswith("http"):
+                candidate_urls.append(job.queue_download_url)
+            candidate_urls.extend(extract_urls_from_payload(data))
+            for media_url in dict.fromkeys(candidate_urls):
+                media, kind = await fetch_media_from_url(
+                    self.session(), media_url, headers, stem=job.queue_id
+                )
+                if media:
+                    job.finish(media, kind, None)
+                    return
+
+            job.finalize_attempts += 1
+            job.progress(max(job.last_percent, 98), "Finalizing file delivery...")
+            if job.finalize_attempts >= job.max_finalize:
+                job.finish(None, None, "Rendering finished, but no deliverable file was returned.")
+            return
+
+        target_ms = max(job.avg_ms, 120000)
+        percent = min(97, max(8, int((job.exec_ms / max(target_ms, 1)) * 100)))
+        if percent > job.last_percent:
+            job.progress(percent, "Rendering...")
+
+
+video_jobs = VideoJobTracker()
+
+
+# =================================================
+# QUEUE
+# =================================================
+def _extract_queue_id(payload: Any) -> Optional[str]:
+    if not isinstance(payload, dict):
+        return None
+    for key in ("queue_id", "id"):
+        v = payload.get(key)
+        if isinstance(v, str) and v:
+            return v
+    nested = payload.get("data")
+    if isinstance(nested, dict):
+        for key in ("queue_id", "id"):
+            v = nested.get(key)
+            if isinstance(v, str) and v:
+                return v
+    return None
+
+
+def resolution_for_model(model_id: str) -> str:
+    """Per-model resolution from the shared profile table, with env fallback."""
+    return get_model_resolution(model_id) or VENICE_VIDEO_RESOLUTION_FALLBACK
+
+
+def _resolve_aspect_ratio(model_id: str, source_aspect: str) -> Optional[str]:
+    """
+    For models that require aspect_ratio (e.g. LTX), pick the value from the
+    model's allowed list that best matches the source image's ratio. Returns
+    None for models that don't send an aspect_ratio field.
+    """
+    profile = get_video_profile(model_id)
+    if not profile.get("require_aspect_ratio"):
+        return None
+    allowed = profile.get("allowed_aspect_ratios") or []
+    if not allowed:
+        return None
+    return closest_aspect_ratio(source_aspect or "16:9", allowed)
+
+
+async def queue_i2v(
+    model_id: str,
+    prompt: str,
+    seconds: int,
+    aspect: str,
+    *,
+    image_url: Optional[str] = None,
+    image_bytes: Optional[bytes] = None,
+) -> tuple[Optional[str], Optional[dict[str, Any]], Optional[str], str]:
+    """
+    Submit an image-to-video render; returns (queue_id, response, error,
+    request_id). The caller must hold a venice_scheduler video ticket.
+    """
+    if not VENICE_VIDEO_QUEUE_URL:
+        return None, None, "VENICE_VIDEO_QUEUE_URL is missing.", "noid"
+    if not VENICE_API_KEY:
+        return None, None, "VENICE_API_KEY is missing.", "noid"
+
+    # Canonical field per Venice docs is 'image_url', which accepts both
+    # http URLs and data URLs. Strict validators (LTX) reject the legacy
+    # 'image' key, so we drop it entirely.
+    image_variants: list[dict[str, Any]] = []
+    if image_url and image_url.startswith("http"):
+        image_variants.append({"image_url": image_url})
+    if image_bytes and looks_like_image(image_bytes):
+        image_variants.append({"image_url": bytes_to_data_url(image_bytes)})
+
+    if not image_variants:
+        return None, None, "No usable source image (neither URL nor bytes).", "noid"
+
+    request_id = uuid.uuid4().hex[:8]
+    resolution = resolution_for_model(model_id)
+    base_payload: dict[str, Any] = {
+        "model": model_id,
+        "prompt": prompt,
+        "resolution": resolution,
+        "duration": f"{seconds}s",
+    }
+
+    # Some models (LTX) require aspect_ratio and restrict its allowed values.
+    aspect_for_payload = _resolve_aspect_ratio(model_id, aspect)
+    if aspect_for_payload:
+        base_payload["aspect_ratio"] = aspect_for_payload
+
+    timeout = aiohttp.ClientTimeout(total=45, connect=10, sock_read=40)
+    last_error = "Queue request failed."
+
+    for attempt in range(2):
+        for variant_idx, variant in enumerate(image_variants):
+            payload = {**base_payload, **variant}
+            try:
+                async with video_jobs.session().post(
+                    VENICE_VIDEO_QUEUE_URL, headers=_api_headers(), json=payload, timeout=timeout
+                ) as resp:
+                    text = await resp.text()
+                    logger.info(
+                        "[VID %s] queue status=%s attempt=%s variant=%s(%s) "
+                        "model=%s res=%s ar=%s",
+                        request_id, resp.status, attempt + 1,
+                        variant_idx, next(iter(variant)),
+                        model_id, resolution,
+                        base_payload.get("aspect_ratio", "-"),
+                    )
+
+                    if resp.status in (400, 415, 422):
+                        last_error = (
+                            f"Queue error ({resp.status}): {sanitize_error_text(text)}"
+                        )
+                        if variant_idx < len(image_variants) - 1:
+                            continue
+                        return None, {"raw": text}, last_error, request_id
+
+                    if resp.status in (401, 403, 404):
+                        return (
+                            None, {"raw": text},
+                            f"Queue error ({resp.status}): {sanitize_error_text(text)}",
+                            request_id,
+                        )
+
+                    if resp.status == 429:
+                        if "too many failed attempts" in (text or "").lower():
+                            return (
+                                None, {"raw": text},
+                                f"Provider rate limit: {sanitize_error_text(text)}",
+                                request_id,
+                            )
+                        await asyncio.sleep(venice_scheduler.rate_limited(model_id, resp.headers, text))
+                        continue
+
+                    if resp.status >= 500:
+                        last_error = f"Provider error ({resp.status})"
+                        await asyncio.sleep(2 + attempt * 2)
+                        continue
+
+                    try:
+                        data = json.loads(text) if text else {}
+                    except Exception:
+                        data = {"raw": text}
+
+                    queue_id = _extract_queue_id(data)
+                    if queue_id:
+                        return queue_id, data, None, request_id
+
+                    last_error = "Queue response did not include queue_id."
+            except asyncio.TimeoutError:
+                last_error = "Queue request timed out."
+            except Exception as e:
+                last_error = f"Queue request error: {e}"
+
+        await asyncio.sleep(1.2 + attempt)
+
+    return None, None, last_error, request_id
+
+
+# =================================================
+# DELIVERY
+# =================================================
+async def deliver_video(
+    channel: discord.abc.Messageable,
+    queue_id: str,
+    media_path: Path,
+    *,
+    filename: str = "AI_video.mp4",
+    **send_kwargs: Any,
+) -> tuple[Optional[discord.Message], Optional[str]]:
+    """
+    Post a spooled video, re-encoded by video_fitter if it is over the
+    channel's upload limit; returns (message, None) or (None, error text).
+    `send_kwargs` (content, embed, allowed_mentions, ...) go to channel.send.
+    """
+    upload_limit = channel_upload_limit_bytes(channel)
+    # A 413 despite fitting means the real limit is lower: fit tighter.
+    for scale in (1.00, 0.80, 0.60):
+        upload_path = await video_fitter.fit(queue_id, media_path, int(upload_limit * scale))
+        if upload_path is None:
+            break
+        try:
+            message = await channel.send(
+                file=discord.File(str(upload_path), filename=filename), **send_kwargs
+            )
+        except discord.HTTPException as e:
+            if e.status == 413 or getattr(e, "code", None) == 40005:
+                continue
+            raise
+        return message, None
+
+    return None, (
+        f"❌ Video too large for Discord upload limit "
+        f"({media_path.stat().st_size // (1024 * 1024)}MB > "
+        f"{upload_limit // (1024 * 1024)}MB) and could not be re-encoded to fit."
+    )
+
+
+# =================================================
+# JOB JOURNAL
+# =================================================
+class VideoJobJournal:
+    """
+    Durable record of queued renders, one JSON file per queue_id (written
+    atomically). A record is added as soon as the provider accepted the job
+    and removed once it was delivered or has really failed, so whatever is
+    left on startup was interrupted by a restart and can be resumed.
+    """
+
+    def __init__(self, root: Path = VIDEO_JOB_DIR):
+        self.root = Path(root)
+
+    def _path(self, queue_id: str) -> Path:
+        return self.root / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', queue_id)}.json"
+
+    def _add_sync(self, record: dict[str, Any]):
+        self.root.mkdir(parents=True, exist_ok=True)
+        p = self._path(str(record["queue_id"]))
+        tmp = p.with_name(f"{p.name}.{uuid.uuid4().hex[:8]}.tmp")
+        tmp.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, p)
+
+    def _pending_sync(self) -> list[dict[str, Any]]:
+        out: list[dict[str, Any]] = []
+        for p in sorted(self.root.glob("*.json")):
+            try:
+                record = json.loads(p.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning("Dropping unreadable video job %s: %s", p.name, e)
+                p.unlink(missing_ok=True)
+                continue
+            if isinstance(record, dict) and record.get("queue_id"):
+                out.append(record)
+        return out
+
+    async def add(self, record: dict[str, Any]):
+        try:
+            await asyncio.to_thread(self._add_sync, record)
+        except OSError as e:
+            logger.warning("Video job journal write failed for %s: %s", record.get("queue_id"), e)
+
+    async def remove(self, queue_id: str):
+        with contextlib.suppress(OSError):
+            await asyncio.to_thread(self._path(queue_id).unlink, True)
+
+    async def pending(self) -> list[dict[str, Any]]:
+        try:
+            return await asyncio.to_thread(self._pending_sync)
+        except OSError as e:
+            logger.warning("Video job journal read failed: %s", e)
+            return []
+
+
+video_journal = VideoJobJournal()